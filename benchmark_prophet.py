@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do Prophet:
+- predict: histórico completo + tail (modo antigo) contra predict só do horizonte,
+  com diferentes uncertainty_samples;
+- janela: curva precisão x latência do tamanho da janela de treino (base de JANELA_TREINO_PROPHET).
+
+Uso: python benchmark_prophet.py [repeticoes]
+     python benchmark_prophet.py janela TICKER INTERVALO [PERIODO]
+"""
+import sys
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+from prophet_forecaster import prever_horizonte, preparar_serie_previsao
+
+JANELAS_CANDIDATAS = [100, 200, 300, 500, 750, 1000, 1500, 2000]
+HORIZONTE_AVALIACAO = 20
+TOLERANCIA_MAPE = 0.05  # Aceita até 5% de MAPE relativo acima da melhor janela
+
+logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+logging.getLogger("prophet").setLevel(logging.WARNING)
+
+# (nome, candles, freq, períodos previstos) nos tamanhos usados pelas rotas
+CENARIOS = [
+    ("15min x 130", 130, "15min", 20),
+    ("1h x 500", 500, "1H", 30),
+    ("1d x 365", 365, "1D", 35),
+]
+AMOSTRAS = [1000, 200, 0]
+
+
+def _serie_sintetica(n, freq, semente=42):
+    rng = np.random.default_rng(semente)
+    ds = pd.date_range("2024-01-01", periods=n, freq=freq)
+    y = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"ds": ds, "y": y})
+
+
+def _cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return float(np.median(tempos))
+
+
+def _predict_historico_completo(modelo, periodos, freq):
+    futuro = modelo.make_future_dataframe(periods=periodos, freq=freq)
+    return modelo.predict(futuro).tail(periodos)
+
+
+def executar_benchmark(repeticoes=5):
+    linhas = []
+    for nome, n, freq, periodos in CENARIOS:
+        modelo = Prophet(changepoint_prior_scale=0.05, interval_width=0.90)
+        modelo.fit(_serie_sintetica(n, freq))
+
+        base = _cronometrar(lambda: _predict_historico_completo(modelo, periodos, freq), repeticoes)
+        linhas.append({"cenario": nome, "modo": "histórico + tail", "amostras": modelo.uncertainty_samples,
+                       "mediana_ms": round(base, 1), "ganho": 1.0})
+
+        for amostras in AMOSTRAS:
+            tempo = _cronometrar(
+                lambda: prever_horizonte(modelo, periodos, freq, amostras_incerteza=amostras),
+                repeticoes
+            )
+            linhas.append({"cenario": nome, "modo": "só horizonte", "amostras": amostras,
+                           "mediana_ms": round(tempo, 1), "ganho": round(base / tempo, 1)})
+
+    return pd.DataFrame(linhas)
+
+
+def curva_janela_treino(ticker, intervalo, periodo="1y", janelas=JANELAS_CANDIDATAS, horizonte=HORIZONTE_AVALIACAO):
+    """
+    Ajusta o Prophet logístico das rotas com as últimas N observações antes de um holdout fixo
+    e mede tempo de ajuste e MAPE no holdout. Retorna (curva, janela_recomendada).
+    """
+    from utils.dados_com_fallback import obter_dados_com_fallback
+
+    dados, _, intervalo_utilizado, _ = obter_dados_com_fallback(ticker, intervalo=intervalo, periodo=periodo, outputsize=5000)
+    serie, _, _, info = preparar_serie_previsao(dados, intervalo_utilizado or intervalo, ticker, limitar_janela=False)
+    if serie is None:
+        raise RuntimeError(info.get("erro_prophet", "Sem dados para o benchmark."))
+
+    treino, holdout = serie.iloc[:-horizonte], serie.iloc[-horizonte:]
+    teto = float(treino['y'].max()) * 1.2
+
+    linhas = []
+    for janela in [j for j in janelas if j <= len(treino)] or [len(treino)]:
+        recorte = treino.tail(janela).assign(cap=teto, floor=0)
+        modelo = Prophet(growth="logistic", changepoint_prior_scale=0.12, seasonality_mode="multiplicative",
+                         seasonality_prior_scale=10.0, interval_width=0.90)
+        inicio = time.perf_counter()
+        modelo.fit(recorte)
+        tempo_fit = (time.perf_counter() - inicio) * 1000
+
+        previsto = modelo.predict(holdout[['ds']].assign(cap=teto, floor=0))
+        mape = float(np.mean(np.abs((holdout['y'].values - previsto['yhat'].values) / holdout['y'].values)))
+        linhas.append({"janela": janela, "fit_ms": round(tempo_fit, 1), "mape": round(mape, 5)})
+
+    curva = pd.DataFrame(linhas)
+    aceitaveis = curva[curva["mape"] <= curva["mape"].min() * (1 + TOLERANCIA_MAPE)]
+    return curva, int(aceitaveis["janela"].min())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "janela":
+        ticker, intervalo = sys.argv[2], sys.argv[3]
+        periodo = sys.argv[4] if len(sys.argv) > 4 else "1y"
+        curva, recomendada = curva_janela_treino(ticker, intervalo, periodo)
+        print(curva.to_string(index=False))
+        print(f"\n✅ Menor janela dentro de {TOLERANCIA_MAPE:.0%} do melhor MAPE: {recomendada} candles")
+    else:
+        repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+        print(executar_benchmark(repeticoes).to_string(index=False))
@@ -36,10 +36,13 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # 🧠 Módulos internos do projeto
+from config import ATIVOS_MONITORADOS, HORARIO_BATCH_PREVISOES, HORARIO_TREINO_LSTM_GLOBAL, HORARIO_ATUALIZACAO_LSTM_TICKERS
 from logger import uso_logger, erro_logger
 from predict import prever_proximo_fechamento
 from model import analise_com_gpt, analise_fallback, ajustar_previsao_lstm
 from db import criar_tabela, listar_previsoes, salvar_previsao
+from previsao_batch import executar_batch_no_servidor, INTERVALO_BATCH
+from utils.cache_respostas import cache_respostas
 
 # 📁 Módulos internos em utils
 from utils.financeiro import obter_dados, obter_dados_binance
@@ -61,9 +64,10 @@ from utils.graficos import gerar_grafico
 from utils.dados_com_fallback import obter_dados_com_fallback
 
 # ✅ Novos imports estratégicos (para previsões Prophet e LSTM)
-from prophet_forecaster import executar_pipeline_completo
+from servico_previsao import servico_previsao
 from utils.forecast_evaluation import residuals_diagnostics, cv_summary, backtest_evaluate
 from lstm_forecaster import CriptoForecaster
+from utils.fila_treino import prever_lstm_sem_bloquear, status_treino, enfileirar_treino_global, atualizar_universo, STATUS_NA_FILA, STATUS_TREINANDO
 from utils.sinais import interpretar_sinais_tecnicos
 from utils.indicadores import gerar_microtendencia
 from avaliador_completo import executar_avaliacao_completa
@@ -73,7 +77,7 @@ def calcular_score_adaptativo(ticker, intervalo, periodo, dias=5):
     dados = obter_dados(ticker, intervalo, periodo)
 
     # Previsões dos modelos
-    previsao_prophet = executar_pipeline_completo(ticker, dados=dados, dias=dias)
+    previsao_prophet = servico_previsao.prever(dados, ticker, dias=dias, freq=intervalo).previsao
     previsao_lstm = prever_lstm(dados, janela=60, dias=dias)
 
     # Classifica as previsões
@@ -152,12 +156,7 @@ from flask import session
 app.secret_key = 'seu_segredo_seguro_aqui'  # necessário para usar sessions
 
 # Lista de ativos que serão monitorados pelo scheduler
-ativos_monitorados = [
-    "MRFG3", "SUZB3", "EGIE3", "CMIG4", "JBSS3", "BRFS3",
-    "WEGE3", "CSAN3", "POMO4", "COGN3", "CYRE3", "CSMG3",
-    "SPSP3", "PSSA3", "HAPV3", "BBAS3", "ABEV3", "SOL-USD",
-    "PENDLE-USD"
-]
+ativos_monitorados = list(ATIVOS_MONITORADOS)
 
 # =============================================================================
 # 2. Variáveis de controle para estratégias de curto prazo
@@ -260,128 +259,45 @@ def estrategia_curto_prazo(indicadores, ticker):
         bot.send_message(CHAT_ID, mensagem_lstm)
         ultima_previsao_lstm[ticker] = proximo_valor
 
-from scipy.stats import zscore
-import numpy as np
-import pandas as pd
-from prophet import Prophet
 from flask import session
 
-def prever(indicadores, dias=5, freq=None):
+def registrar_na_sessao(resultado):
     """
-    Previsão com Prophet ajustada para criptomoedas (sem fechamento diário).
-    Frequência detectada automaticamente para suportar períodos como 15min, 30min, 1h etc.
+    Copia avisos/limites da previsão para a sessão usada pelos templates.
     """
+    for chave, valor in resultado.info.items():
+        session[chave] = valor
 
-    try:
-        df_prophet = indicadores.reset_index()
-
-        # ✅ Ajuste robusto de data/hora
-        if 'Datetime' in df_prophet.columns:
-            df_prophet.rename(columns={'Datetime': 'ds'}, inplace=True)
-        elif 'Date' in df_prophet.columns:
-            df_prophet.rename(columns={'Date': 'ds'}, inplace=True)
-        elif 'index' in df_prophet.columns:
-            df_prophet.rename(columns={'index': 'ds'}, inplace=True)
-        else:
-            df_prophet['ds'] = indicadores.index
-
-        if 'Close' not in df_prophet.columns:
-            session["erro_prophet"] = "Coluna 'Close' ausente nos dados."
-            return pd.DataFrame(columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
-
-        df_prophet = df_prophet[['ds', 'Close']].dropna()
-        df_prophet.rename(columns={'Close': 'y'}, inplace=True)
-        df_prophet['ds'] = pd.to_datetime(df_prophet['ds'])
-
-        freq_multiplicadores = {
-            '15min': (4, '15min'),   # Próxima 1 hora (4 períodos)
-            '30min': (4, '30min'),   # Próximas 2 horas
-            '45min': (4, '45min'),   # Próximas 3 horas
-            '1h': (6, '1H'),         # Próximas 6 horas
-            '2h': (6, '2H'),         # Próximas 12 horas
-            '6h': (4, '6H'),         # Próximas 24 horas
-            '1d': (7, '1D'),         # Próximos 7 dias
-            '5d': (4, '5D'),         # Próximos 20 dias
-            '1m': (3, '30D')         # Próximos 90 dias (3 meses)
-        }
-
-        freq_detectada = pd.infer_freq(df_prophet['ds'].sort_values())
-
-        # ✅ Seleção robusta da frequência
-        if freq and freq.lower() in freq_multiplicadores:
-            multiplicador, freq_final = freq_multiplicadores[freq.lower()]
-        elif freq_detectada and freq_detectada.lower() in freq_multiplicadores:
-            multiplicador, freq_final = freq_multiplicadores[freq_detectada.lower()]
-        else:
-            multiplicador, freq_final = (6, '1H')  # Default mais curto e coerente
-
-        # ✅ Preencher série contínua
-        df_prophet = df_prophet.set_index('ds').asfreq(freq_final, method='pad').fillna(method='ffill').reset_index()
-
-        # ✅ Remoção leve de outliers
-        z = np.abs(zscore(df_prophet['y']))
-        df_temp = df_prophet[z < 3].copy()
-        if df_temp.shape[0] >= 2:
-            df_prophet = df_temp
-        else:
-            session["aviso_prophet"] = "Dados com outliers. Usando série completa."
-
-        if df_prophet.shape[0] < 2:
-            session["erro_prophet"] = "Dados insuficientes após filtragem."
-            return pd.DataFrame(columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
-
-        # ✅ Bollinger Bands
-        sma = indicadores['Close'].rolling(20).mean().dropna()
-        std = indicadores['Close'].rolling(20).std().dropna()
-        sma20 = float(sma.iloc[-1]) if not sma.empty else indicadores['Close'].mean()
-        std20 = float(std.iloc[-1]) if not std.empty else indicadores['Close'].std()
-        bollinger_sup = sma20 + 2 * std20
-        bollinger_inf = max(sma20 - 2 * std20, 0)
-
-        df_prophet['cap'] = bollinger_sup
-        df_prophet['floor'] = 0
-
-        # ✅ Modelo Prophet
-        modelo = Prophet(
-            growth='logistic',
-            changepoint_prior_scale=0.12,
-            seasonality_mode='multiplicative',
-            seasonality_prior_scale=10.0,
-            interval_width=0.90
-        )
-        modelo.fit(df_prophet)
-
-        total_periodos = dias * multiplicador
-
-        futuro = modelo.make_future_dataframe(periods=total_periodos, freq=freq_final)
-        futuro['cap'] = bollinger_sup
-        futuro['floor'] = 0
-
-        previsoes = modelo.predict(futuro)
-
-        if previsoes.shape[0] < 2:
-            session["erro_prophet"] = "Previsão insuficiente."
-            return pd.DataFrame(columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
-
-        # ✅ Suavização técnica
-        previsoes['yhat'] = previsoes['yhat'] * 0.8 + sma20 * 0.2
-        previsoes['yhat'] = previsoes['yhat'].clip(lower=bollinger_inf, upper=bollinger_sup)
+def prever_lstm_sem_sessao(ticker, dias=5, epochs=50):
+    """
+    LSTM sem treinar na requisição: usa o último modelo salvo ou agenda o treino.
+    Retorna (previsoes ou None, se o treino está em andamento).
+    """
+    previsoes, treino = prever_lstm_sem_bloquear(ticker, dias=dias, epochs=epochs)
+    em_treino = previsoes is None and bool(treino) and treino["status"] in (STATUS_NA_FILA, STATUS_TREINANDO)
+    return previsoes, em_treino
 
-        session['limite_minimo'] = round(bollinger_inf, 2)
-        session['limite_maximo'] = round(bollinger_sup, 2)
-        delta = previsoes['yhat'].iloc[-1] - previsoes['yhat'].iloc[0]
-        session['viés_tendência'] = (
-            "alta" if delta > sma20 * 0.01 else
-            "baixa" if delta < -sma20 * 0.01 else
-            "neutra"
-        )
-        session['ajuste_prophet'] = True
+def prever_lstm_rota(ticker, dias=5, epochs=50):
+    """Como prever_lstm_sem_sessao, marcando na sessão o treino em andamento (os templates avisam o usuário)."""
+    previsoes, session["lstm_em_treino"] = prever_lstm_sem_sessao(ticker, dias=dias, epochs=epochs)
+    return previsoes
 
-        return previsoes[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].reset_index(drop=True)
+def prever(indicadores, dias=5, freq=None, ticker=None, motor=None, orcamento_ms=None):
+    """
+    Previsão para as rotas via serviço único (cache + coalescência) e registro dos avisos na sessão.
+    """
+    resultado = servico_previsao.prever(indicadores, ticker, dias=dias, freq=freq,
+                                        motor=motor, orcamento_ms=orcamento_ms)
+    registrar_na_sessao(resultado)
+    return resultado.previsao
 
-    except Exception as e:
-        session["erro_prophet"] = f"Erro Prophet: {str(e)}"
-        return pd.DataFrame(columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
+def prever_precalculado(indicadores, ticker, dias=5):
+    """
+    Usa a previsão do batch noturno enquanto ela for válida; caso contrário, calcula na hora.
+    """
+    resultado = servico_previsao.prever(indicadores, ticker, dias=dias, precalculado_intervalo=INTERVALO_BATCH)
+    registrar_na_sessao(resultado)
+    return resultado.previsao
 
 def gerar_visao_leiga_simplificada(tendencia):
     tendencia = tendencia.lower()
@@ -497,24 +413,47 @@ def sentimento_noticias(texto):
 # =============================================================================
 # 8. Rotas da API Flask
 # =============================================================================
-@app.route('/analise')
-def analisar():
-    ticker = request.args.get('ticker')
-    if not ticker:
-        return jsonify({"erro": "Informe um ticker válido."}), 400
+def _cacheavel(resposta):
+    """
+    Só respostas completas vão para o cache; erros de dados e respostas montadas com o LSTM ainda
+    em treino (sem a previsão dele) são refeitos no próximo acesso.
+    """
+    return (
+        "erro" not in resposta
+        and not resposta.get("contexto", {}).get("erro_dados")
+        and not resposta.get("sessao", {}).get("lstm_em_treino")
+    )
 
+def _montar_analise(ticker):
+    """
+    Parte pesada de /analise (dados, indicadores, previsão, GPT e gráfico), sem request/session,
+    para o cache de respostas poder reconstruí-la em segundo plano.
+    """
     dados = obter_dados(ticker)
     indicadores = calcular_indicadores(dados)
 
     # ✅ Validação robusta imediata após cálculo
     if indicadores.empty or "Close" not in indicadores.columns:
         erro_logger.error(f"⚠️ Indicadores não calculados corretamente para {ticker}. Verifique candles insuficientes ou coluna 'Close' ausente.")
-        return jsonify({"erro": "Indicadores insuficientes ou coluna 'Close' ausente."}), 400
+        return {"erro": "Indicadores insuficientes ou coluna 'Close' ausente.", "status": 400}
 
-    previsao = prever(indicadores)
-    analise = analise_com_gpt(ticker, indicadores, previsao)
+    resultado = servico_previsao.prever(indicadores, ticker, dias=5, precalculado_intervalo=INTERVALO_BATCH)
+    analise = analise_com_gpt(ticker, indicadores, resultado.previsao)
     grafico = gerar_grafico(indicadores, ticker)
-    
+    return {"contexto": {"analise": analise, "grafico": grafico}, "sessao": dict(resultado.info)}
+
+@app.route('/analise')
+def analisar():
+    ticker = request.args.get('ticker')
+    if not ticker:
+        return jsonify({"erro": "Informe um ticker válido."}), 400
+
+    resposta = cache_respostas.obter(("analise", ticker, INTERVALO_BATCH), lambda: _montar_analise(ticker),
+                                     freq=INTERVALO_BATCH, ticker=ticker, cacheavel=_cacheavel)
+    if "erro" in resposta:
+        return jsonify({"erro": resposta["erro"]}), resposta["status"]
+    session.update(resposta["sessao"])
+
     recentes = session.get('recentes', [])
     if ticker not in recentes:
         recentes.insert(0, ticker)
@@ -523,7 +462,7 @@ def analisar():
         session['recentes'] = recentes
 
     uso_logger.info(f"Análise realizada para: {ticker} | IP: {request.remote_addr}")
-    return render_template('dashboard.html', ticker=ticker, analise=analise, grafico=grafico, recentes=recentes)
+    return render_template('dashboard.html', ticker=ticker, recentes=recentes, **resposta["contexto"])
 
 def interpretar_indicadores(rsi, sma20, preco_atual, upper, lower):
     insights = []
@@ -546,8 +485,19 @@ def interpretar_indicadores(rsi, sma20, preco_atual, upper, lower):
 
     return insights
 
-@app.route("/previsao_custom")
-def previsao_custom():
+# Intervalo de candles usado por /previsao_custom para cada período pedido
+PERIODOS_INTERVALO_CUSTOM = {
+    "1d": "1day", "2d": "1day", "3d": "1day", "5d": "1day", "7d": "1day",
+    "15min": "15min", "30min": "30min", "45min": "30min",
+    "1h": "1h", "2h": "1h", "6h": "1h",
+    "1m": "1day", "3m": "1day", "6m": "1day", "1y": "1day"
+}
+
+def _montar_previsao_custom(ticker, periodo):
+    """
+    Parte pesada de /previsao_custom (dados, indicadores, previsões, GPT, estratégia e gráfico),
+    sem request/session: os avisos para a sessão voltam em "sessao" e a rota aplica e renderiza.
+    """
     from datetime import datetime
     from utils.mensagem_estrategia import gerar_explicacao_estrategia, gerar_conclusao_dinamica
     from utils.indicadores_avancados import calcular_adx, calcular_cci, calcular_vwap, calcular_atr
@@ -566,19 +516,8 @@ def previsao_custom():
         except Exception:
             return 0.0
 
-    # Parâmetros da URL
-    ticker = request.args.get("ticker")
-    periodo = request.args.get("periodo", "5d")
-
-    # Intervalos
-    periodos_map = {
-        "1d": "1day", "2d": "1day", "3d": "1day", "5d": "1day", "7d": "1day",
-        "15min": "15min", "30min": "30min", "45min": "30min",
-        "1h": "1h", "2h": "1h", "6h": "1h",
-        "1m": "1day", "3m": "1day", "6m": "1day", "1y": "1day"
-    }
-
-    intervalo_api = periodos_map.get(periodo, "1day")
+    sessao = {}
+    intervalo_api = PERIODOS_INTERVALO_CUSTOM.get(periodo, "1day")
     # ✅ Inclusão exata para obter dados da Binance caso ticker termine com "-USD"
     if ticker.endswith("-USD"):
         symbol = ticker.replace("-USD", "USDT")
@@ -604,13 +543,13 @@ def previsao_custom():
             f"Quantidade de valores válidos em 'Close': {dados['Close'].dropna().shape[0]}, "
             f"Mensagem do fallback: {mensagem_intervalo}."
         )
-        return jsonify({
+        return {"erro": {
             "erro": "Dados insuficientes ou coluna 'Close' ausente.",
             "colunas_recebidas": dados.columns.tolist(),
             "tamanho_dos_dados": len(dados),
             "valores_validos_close": dados['Close'].dropna().shape[0],
             "mensagem_fallback": mensagem_intervalo
-        }), 400
+        }, "status": 400}
 
     else:
         # caso geral, usar o método original
@@ -624,7 +563,7 @@ def previsao_custom():
     # Validação imediata e robusta da coluna "Close"
     if dados.empty or "Close" not in dados.columns:
         erro_logger.error(f"⚠️ Dados insuficientes ou coluna 'Close' ausente para {ticker}. Colunas obtidas: {dados.columns.tolist()}")
-        return jsonify({"erro": "Dados insuficientes ou coluna 'Close' ausente."}), 400
+        return {"erro": {"erro": "Dados insuficientes ou coluna 'Close' ausente."}, "status": 400}
 
     quantidade_candles = len(dados)
 
@@ -634,14 +573,14 @@ def previsao_custom():
     dias = dias_map.get(intervalo_utilizado or intervalo_api, 5)
 
     if dados.empty:
-        return render_template("relatorio_custom.html",
+        return {"contexto": dict(
             modo="html", erro_dados=True, ticker=ticker, periodo=periodo,
             quantidade_candles=quantidade_candles,
             datahora=datetime.now().strftime('%d/%m/%Y %H:%M'),
             aviso="", grafico=None, cenarios="", analise="", conclusao_final="",
             mensagem_intervalo=mensagem_intervalo,
             fibonacci={} 
-        )
+        ), "sessao": sessao}
 
     try:
         indicadores = calcular_indicadores(dados, intervalo=intervalo_utilizado)
@@ -655,19 +594,17 @@ def previsao_custom():
                 f"Colunas obtidas: {indicadores.columns.tolist()}, "
                 f"Valores válidos em 'Close': {indicadores['Close'].dropna().shape[0] if 'Close' in indicadores.columns else 'Coluna ausente'}"
             )
-            return jsonify({
+            return {"erro": {
                 "erro": "Indicadores insuficientes ou coluna 'Close' ausente após cálculo dos indicadores.",
                 "indicadores_vazio": indicadores.empty,
                 "colunas_recebidas": indicadores.columns.tolist(),
                 "valores_validos_close": indicadores['Close'].dropna().shape[0] if 'Close' in indicadores.columns else 'Coluna ausente'
-            }), 400
+            }, "status": 400}
 
-        previsao = executar_pipeline_completo(
-            ticker=ticker,
-            dados=indicadores,
-            dias=dias,
-            freq=intervalo_utilizado
-        )
+        # Mesmo serviço das demais rotas: motor por intervalo, cache e coalescência compartilhados
+        resultado = servico_previsao.prever(indicadores, ticker, dias=dias, freq=intervalo_utilizado)
+        sessao.update(resultado.info)
+        previsao = resultado.horizonte(dias)
 
         adx = seguro(calcular_adx, dados)
         cci = seguro(calcular_cci, dados)
@@ -807,13 +744,8 @@ def previsao_custom():
                 contexto = "sem confirmação técnica"
 
         try:
-            forecaster = CriptoForecaster(ticker, janela=60, epochs=100)
-            if forecaster.modelo_existente():
-                forecaster.carregar_modelo_treinado()
-            else:
-                forecaster.carregar_dados()
-                forecaster.treinar()
-            previsoes_lstm = forecaster.prever(dias=dias)
+            # Sem modelo salvo, o treino vai para a fila e o relatório sai sem LSTM
+            previsoes_lstm, sessao["lstm_em_treino"] = prever_lstm_sem_sessao(ticker, dias=dias, epochs=100)
         except Exception as e:
             previsoes_lstm = None
 
@@ -908,7 +840,7 @@ def previsao_custom():
         # Conversão final para dict (para template)
         dados_fluxo_intraday_dict = dados_fluxo_intraday.to_dict(orient='records')
 
-        return render_template("relatorio_custom.html",
+        return {"contexto": dict(
             ticker=ticker, periodo=periodo,
             datahora=datetime.now().strftime('%d/%m/%Y %H:%M'),
             rsi=rsi, sma20=sma20, sma50=sma50,
@@ -941,21 +873,56 @@ def previsao_custom():
             conclusao_final=conclusao_final,
             analise=analise.get("indicadores", ""),
             aviso=analise.get("aviso", ""),
-            limite_minimo=session.get("limite_minimo", 0),
-            limite_maximo=session.get("limite_maximo", 0),
-            ajuste_prophet=session.get("ajuste_prophet", False),
-            alerta_estabilidade=session.get("alerta_estabilidade", False),
-            ia_falhou=session.get("ia_falhou", False),
             modo="html",
             fonte=fonte,
             intervalo_utilizado=intervalo_utilizado,
             dados_fluxo_intraday=dados_fluxo_intraday_dict,
             pressao=pressao 
-        )
+        ), "sessao": sessao}
 
     except Exception as e:
         erro_logger.error(f"Erro em /previsao_custom para {ticker}: {str(e)}")
-        return jsonify({"erro": str(e)}), 500
+        return {"erro": {"erro": str(e)}, "status": 500}
+
+@app.route("/previsao_custom")
+def previsao_custom():
+    # Parâmetros da URL
+    ticker = request.args.get("ticker")
+    periodo = request.args.get("periodo", "5d")
+
+    resposta = cache_respostas.obter(
+        ("previsao_custom", ticker, periodo), lambda: _montar_previsao_custom(ticker, periodo),
+        freq=PERIODOS_INTERVALO_CUSTOM.get(periodo, "1day"), ticker=ticker, cacheavel=_cacheavel
+    )
+    if "erro" in resposta:
+        return jsonify(resposta["erro"]), resposta["status"]
+    session.update(resposta["sessao"])
+
+    return render_template("relatorio_custom.html",
+        limite_minimo=session.get("limite_minimo", 0),
+        limite_maximo=session.get("limite_maximo", 0),
+        ajuste_prophet=session.get("ajuste_prophet", False),
+        alerta_estabilidade=session.get("alerta_estabilidade", False),
+        ia_falhou=session.get("ia_falhou", False),
+        **resposta["contexto"]
+    )
+
+def _montar_analise_json(ticker):
+    dados = obter_dados(ticker)
+    indicadores = calcular_indicadores(dados)
+    resultado = servico_previsao.prever(indicadores, ticker, dias=5)
+
+    # Análise com IA
+    analise = analise_com_gpt(ticker, indicadores, resultado.previsao)
+
+    # Gera gráfico Plotly (modo HTML ou JSON)
+    grafico_fig = gerar_grafico(indicadores, ticker, modo='plotly')
+    grafico_plotly_json = grafico_fig.to_json()
+
+    return {
+        "payload": {"ticker": ticker, "analise": analise, "grafico_plotly": grafico_plotly_json},
+        "sessao": dict(resultado.info)
+    }
 
 @app.route('/analise_json')
 def analise_json():
@@ -964,22 +931,10 @@ def analise_json():
         return jsonify({"erro": "Informe um ticker válido."}), 400
 
     try:
-        dados = obter_dados(ticker)
-        indicadores = calcular_indicadores(dados)
-        previsao = prever(indicadores)
-
-        # Análise com IA
-        analise = analise_com_gpt(ticker, indicadores, previsao)
-
-        # Gera gráfico Plotly (modo HTML ou JSON)
-        grafico_fig = gerar_grafico(indicadores, ticker, modo='plotly')
-        grafico_plotly_json = grafico_fig.to_json()
-
-        return jsonify({
-            "ticker": ticker,
-            "analise": analise,
-            "grafico_plotly": grafico_plotly_json
-        })
+        resposta = cache_respostas.obter(("analise_json", ticker, "1day"), lambda: _montar_analise_json(ticker),
+                                         freq="1day", ticker=ticker)
+        session.update(resposta["sessao"])
+        return jsonify(resposta["payload"])
     except Exception as e:
         erro_logger.error(f"Erro em /analise_json para {ticker}: {str(e)}")
         return jsonify({"erro": str(e)}), 500
@@ -1083,7 +1038,7 @@ def exportar_pdf():
     try:
         dados = obter_dados(ticker)
         indicadores = calcular_indicadores(dados)
-        previsao_df = prever(indicadores)
+        previsao_df = prever(indicadores, ticker=ticker)
 
         try:
             analise = analise_com_gpt(ticker, indicadores, previsao_df)
@@ -1122,16 +1077,13 @@ def exportar_pdf():
         valores_filtrados = [max(0, v) for v in valores_previstos_raw]
         valores_html = "<ul>" + "".join([f"<li>R$ {v:.2f}</li>" for v in valores_filtrados]) + "</ul>"
 
-        from lstm_forecaster import CriptoForecaster
         if "previsoes_lstm_cache" in session and ticker in session["previsoes_lstm_cache"]:
             previsoes_lstm = session["previsoes_lstm_cache"][ticker]
         else:
-            forecaster = CriptoForecaster(ticker, janela=60, epochs=50)
-            forecaster.carregar_dados()
-            forecaster.treinar()
-            previsoes_lstm = forecaster.prever(dias=5)
-            previsoes_lstm = [float(v) for v in previsoes_lstm]  # 🔐 Conversão segura
-            session.setdefault("previsoes_lstm_cache", {})[ticker] = previsoes_lstm
+            previsoes_lstm = prever_lstm_rota(ticker, dias=5, epochs=50)
+            if previsoes_lstm is not None:
+                previsoes_lstm = [float(p["valor"]) for p in previsoes_lstm]  # 🔐 Conversão segura
+                session.setdefault("previsoes_lstm_cache", {})[ticker] = previsoes_lstm
 
         # Histórico condicional por plano
         usuario = session.get("usuario")
@@ -1222,7 +1174,7 @@ def exportar_pdf_custom():
     try:
         dados = obter_dados(ticker, intervalo=periodo)
         indicadores = calcular_indicadores(dados)
-        previsao = prever(indicadores, dias=dias)
+        previsao = prever(indicadores, dias=dias, ticker=ticker)
 
         analise = analise_com_gpt(ticker, indicadores, previsao)
         grafico = gerar_grafico(indicadores, ticker, modo="base64")
@@ -1246,11 +1198,9 @@ def exportar_pdf_custom():
             estrategia = calcular_estrategia_longa(preco_atual, cenarios=cenarios_dict)
 
         try:
-            forecaster = CriptoForecaster(ticker, janela=60, epochs=50)
-            forecaster.carregar_dados()
-            forecaster.treinar()
-            previsoes_lstm = forecaster.prever(dias=5)
-            previsoes_lstm = [float(v) for v in previsoes_lstm]
+            previsoes_lstm = prever_lstm_rota(ticker, dias=5, epochs=50)
+            if previsoes_lstm is not None:
+                previsoes_lstm = [float(p["valor"]) for p in previsoes_lstm]
         except:
             previsoes_lstm = None
 
@@ -1299,6 +1249,17 @@ def home():
     <h2>Bot Trader Ativo ✅</h2>
     <p>Use <code>/analise?ticker=WEGE3</code> para acessar uma análise completa.</p>
     '''
+
+@app.route('/status_treino')
+def rota_status_treino():
+    """
+    Situação dos treinos LSTM em segundo plano (?ticker=X para um ativo).
+    """
+    ticker = request.args.get('ticker')
+    status = status_treino(ticker)
+    if ticker and status is None:
+        return jsonify({"ticker": ticker, "status": "sem_treino"}), 404
+    return jsonify({"ticker": ticker, **status} if ticker else status)
 # =============================================================================
 # 10. Configuração do Scheduler (tarefas agendadas)
 # =============================================================================
@@ -1309,22 +1270,48 @@ scheduler = BackgroundScheduler()
 # Exemplo (opcional): agendamento de relatório diário
 # scheduler.add_job(func=relatorio_periodico, trigger="cron", hour=9, minute=30)
 
-scheduler.start()
+# Batch noturno: previsões Prophet de todos os ativos monitorados, lidas por /analise e /relatorio
+scheduler.add_job(
+    func=executar_batch_no_servidor,
+    kwargs={"tickers": ativos_monitorados},
+    trigger="cron",
+    id="batch_previsoes",
+    replace_existing=True,
+    **HORARIO_BATCH_PREVISOES
+)
 
-@app.route("/relatorio")
-def relatorio():
-    from datetime import datetime
+# Treino noturno do LSTM global (um job para todo o universo, na fila de treino)
+scheduler.add_job(
+    func=enfileirar_treino_global,
+    kwargs={"tickers": ativos_monitorados},
+    trigger="cron",
+    id="treino_lstm_global",
+    replace_existing=True,
+    **HORARIO_TREINO_LSTM_GLOBAL
+)
 
-    ticker = request.args.get("ticker")
-    usuario = session.get("usuario")
+# Fine-tuning noturno dos modelos LSTM por ticker já salvos (mesma fila, depois do global)
+scheduler.add_job(
+    func=atualizar_universo,
+    trigger="cron",
+    id="atualizacao_lstm_tickers",
+    replace_existing=True,
+    **HORARIO_ATUALIZACAO_LSTM_TICKERS
+)
 
-    if not ticker:
-        return jsonify({"erro": "Informe um ticker válido."}), 400
+scheduler.start()
+
+def _montar_relatorio(ticker):
+    """
+    Parte pesada de /relatorio (dados, previsão, GPT, gráfico e cenários), sem request/session.
+    O histórico do usuário e a LSTM continuam por requisição na rota.
+    """
+    from datetime import datetime
 
     try:
         dados = obter_dados(ticker)
     except ValueError as e:
-        return render_template("erro.html", mensagem=str(e))
+        return {"erro": str(e)}
 
     indicadores = calcular_indicadores(dados)
 
@@ -1333,18 +1320,20 @@ def relatorio():
         sma20 = round(indicadores["SMA20"].iloc[-1], 2)
         sma50 = round(indicadores["SMA50"].iloc[-1], 2)
 
-    previsao_df = prever(indicadores)
+    resultado = servico_previsao.prever(indicadores, ticker, dias=5, precalculado_intervalo=INTERVALO_BATCH)
+    previsao_df = resultado.previsao
+    sessao = dict(resultado.info)
 
     try:
         analise = analise_com_gpt(ticker, indicadores, previsao_df)
         if not all(analise.get(k) for k in ["indicadores", "tendencia", "previsao", "estrategia", "risco"]):
-            session["ia_falhou"] = True
+            sessao["ia_falhou"] = True
             raise ValueError("IA retornou resposta incompleta.")
         else:
-            session.pop("ia_falhou", None)
+            sessao["ia_falhou"] = False
     except Exception as e:
         print(f"[ERRO GPT] {e}")
-        session["ia_falhou"] = True
+        sessao["ia_falhou"] = True
         analise = analise_fallback()
 
     def extrair(df, col):
@@ -1385,6 +1374,44 @@ def relatorio():
     valores_filtrados = [max(0, v) for v in valores_previstos_raw]
     valores_html = "<ul>" + "".join([f"<li>R$ {v:.2f}</li>" for v in valores_filtrados]) + "</ul>"
 
+    contexto = dict(
+        rsi=rsi,
+        sma20=sma20,
+        sma50=sma50,
+        upper_band=upper,
+        lower_band=lower,
+        volume_medio=volume_medio,
+        tendencia=analise.get("tendencia", "-"),
+        previsao=analise.get("previsao", "-"),
+        estrategia=analise.get("estrategia", "-"),
+        stop=stop,
+        alvo=alvo,
+        grafico=grafico,
+        analise=analise,
+        aviso=analise.get("aviso", ""),
+        cenarios=Markup(cenarios_html),
+        datahora=datetime.now().strftime('%d/%m/%Y %H:%M'),
+        valores_previstos=Markup(valores_html),
+        visao_leiga=analise.get("visao_leiga", None),
+        insights_tecnicos=interpretar_indicadores(rsi, sma20, preco_atual, upper, lower),
+        conclusao_final=conclusao_final
+    )
+    return {"contexto": contexto, "sessao": sessao}
+
+@app.route("/relatorio")
+def relatorio():
+    ticker = request.args.get("ticker")
+    usuario = session.get("usuario")
+
+    if not ticker:
+        return jsonify({"erro": "Informe um ticker válido."}), 400
+
+    resposta = cache_respostas.obter(("relatorio", ticker, INTERVALO_BATCH), lambda: _montar_relatorio(ticker),
+                                     freq=INTERVALO_BATCH, ticker=ticker, cacheavel=_cacheavel)
+    if "erro" in resposta:
+        return render_template("erro.html", mensagem=resposta["erro"])
+    session.update(resposta["sessao"])
+
     historico_html = ""
     if usuario:
         if usuario.get("plano") == "premium":
@@ -1400,18 +1427,15 @@ def relatorio():
         historico_html = "<tr><td colspan='5'>Histórico disponível após login.</td></tr>"
 
     # ✅ Previsão LSTM com cache por ticker
-    from lstm_forecaster import CriptoForecaster
     if "previsoes_lstm_cache" in session and ticker in session["previsoes_lstm_cache"]:
         previsoes_lstm = session["previsoes_lstm_cache"][ticker]
     else:
         try:
-            forecaster = CriptoForecaster(ticker, janela=60, epochs=50)
-            forecaster.carregar_dados()
-            forecaster.treinar()
-            previsoes_lstm = forecaster.prever(dias=5)
-            # Converte os valores para float (tipo nativo Python) antes de salvar na sessão
-            previsoes_lstm = [float(v) for v in previsoes_lstm]
-            session.setdefault("previsoes_lstm_cache", {})[ticker] = previsoes_lstm
+            previsoes_lstm = prever_lstm_rota(ticker, dias=5, epochs=50)
+            if previsoes_lstm is not None:
+                # Converte os valores para float (tipo nativo Python) antes de salvar na sessão
+                previsoes_lstm = [float(p["valor"]) for p in previsoes_lstm]
+                session.setdefault("previsoes_lstm_cache", {})[ticker] = previsoes_lstm
 
         except Exception as e:
             print(f"[LSTM ERRO] {e}")
@@ -1420,27 +1444,8 @@ def relatorio():
     session.pop("lstm_credito_usado", None)
     uso_logger.info(f"Relatório premium gerado para: {ticker} | IP: {request.remote_addr}")
 
-    datahora = datetime.now().strftime('%d/%m/%Y %H:%M')
-
     return render_template("relatorio_premium.html",
         ticker=ticker,
-        rsi=rsi,
-        sma20=sma20,
-        sma50=sma50,
-        upper_band=upper,
-        lower_band=lower,
-        volume_medio=volume_medio,
-        tendencia=analise.get("tendencia", "-"),
-        previsao=analise.get("previsao", "-"),
-        estrategia=analise.get("estrategia", "-"),
-        stop=stop,
-        alvo=alvo,
-        grafico=grafico,
-        analise=analise,
-        aviso=analise.get("aviso", ""),
-        cenarios=Markup(cenarios_html),
-        datahora=datahora,
-        valores_previstos=Markup(valores_html),
         historico_tabela=Markup(historico_html),
         ajuste_lstm=session.get("ajuste_lstm", False),
         ajuste_prophet=session.get("ajuste_prophet", False),
@@ -1454,9 +1459,7 @@ def relatorio():
         viés_tendência=session.get("viés_tendência", "-"),
         mensagem_prophet=session.get("mensagem_prophet", ""),
         aviso_sma20=session.get("aviso_sma20", None),
-        visao_leiga=analise.get("visao_leiga", None),
-        insights_tecnicos=interpretar_indicadores(rsi, sma20, preco_atual, upper, lower),
-        conclusao_final=conclusao_final
+        **resposta["contexto"]
     )
 
 @app.route("/login_simulado")
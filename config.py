@@ -2,10 +2,78 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
-print("KEY:", os.getenv("TWELVE_DATA_API_KEY"))  # Deve imprimir sua chave
-
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")
-TWELVE_DATA_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
\ No newline at end of file
+TWELVE_DATA_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
+
+# Ativos monitorados pelo scheduler e pelo batch noturno
+ATIVOS_MONITORADOS = [
+    "MRFG3", "SUZB3", "EGIE3", "CMIG4", "JBSS3", "BRFS3",
+    "WEGE3", "CSAN3", "POMO4", "COGN3", "CYRE3", "CSMG3",
+    "SPSP3", "PSSA3", "HAPV3", "BBAS3", "ABEV3", "SOL-USD",
+    "PENDLE-USD"
+]
+
+# Batch noturno de previsões Prophet (após o fechamento da B3 e do candle diário cripto)
+HORARIO_BATCH_PREVISOES = {"hour": 21, "minute": 30}
+VALIDADE_PREVISAO_BATCH_HORAS = 24
+# Quando o batch roda no scheduler do servidor Flask, poucos processos para não tirar CPU das rotas;
+# sozinho (python previsao_batch.py, ex.: via cron) usa todos os núcleos
+FRACAO_NUCLEOS_BATCH_NO_SERVIDOR = 0.25
+
+# Motor de previsão por intervalo (os demais usam Prophet); ver motores_previsao.MOTORES
+MOTOR_PREVISAO_POR_INTERVALO = {"15min": "holt", "30min": "holt", "45min": "holt"}
+
+# Amostras da simulação de incerteza do Prophet no predict (padrão do Prophet: 1000; 0 pula os intervalos)
+AMOSTRAS_INCERTEZA_PROPHET = 1000
+
+# Janela de treino dos modelos de previsão, em candles, por frequência (ver benchmark_prophet.py janela).
+# Pregão da B3 = 32 candles de 15min: 15min ≈ 15 pregões (5 dias de cripto); 30min e 45min ≈ 30 pregões
+# (10 dias de cripto); 1h ≈ 3 e 2h ≈ 6 meses de pregão; diário ≈ 2 anos. Nenhum ajuste passa do teto.
+JANELA_TREINO_PROPHET = {
+    "15min": 480, "30min": 480, "45min": 320,
+    "1h": 500, "2h": 500, "6h": 360,
+    "1d": 500, "5d": 260, "1m": 120
+}
+MAX_PONTOS_TREINO_PROPHET = 1000
+
+# Memória máxima (estimada) dos modelos LSTM/scalers mantidos carregados por processo
+ORCAMENTO_MEMORIA_MODELOS_MB = 512
+
+# Fine-tuning incremental dos LSTMs (CriptoForecaster.atualizar): poucas épocas sobre as janelas mais
+# recentes, com peso decaindo pela idade, em vez de treinar do zero a cada candle novo
+EPOCHS_FINE_TUNE_LSTM = 3
+JANELAS_FINE_TUNE_LSTM = 120
+MEIA_VIDA_FINE_TUNE_LSTM = 30        # Em janelas: a de 30 candles atrás pesa metade da mais recente
+TAXA_APRENDIZADO_FINE_TUNE_LSTM = 1e-4
+MARGEM_SCALER_LSTM = 0.2             # Folga ao alargar o intervalo do scaler, para não alargar a cada candle
+
+# LSTM global (lstm_global.py): um modelo para todo o universo em vez de um arquivo por ticker.
+# As rotas usam o global para os tickers que ele cobre; os demais seguem no modelo por ticker.
+USAR_LSTM_GLOBAL = True
+JANELA_LSTM_GLOBAL = 60
+DIM_EMBEDDING_TICKER = 8
+HORARIO_TREINO_LSTM_GLOBAL = {"hour": 22, "minute": 30}
+HORARIO_ATUALIZACAO_LSTM_TICKERS = {"hour": 22, "minute": 35}  # Fine-tuning dos modelos por ticker (atualizar_universo)
+
+# Treino LSTM guiado por relógio (CriptoForecaster.treinar(orcamento_s=...)): validação nas últimas
+# janelas em ordem cronológica, EarlyStopping em val_loss e parada antes de estourar o orçamento
+ORCAMENTO_TREINO_LSTM_S = 300
+FRACAO_VALIDACAO_LSTM = 0.15
+PACIENCIA_VALIDACAO_LSTM = 5
+
+# Fila de treino LSTM (utils/fila_treino.py): após uma falha, o ticker só volta à fila depois da espera,
+# senão um ticker sem dados seria reenfileirado a cada requisição e ocuparia o worker indefinidamente
+ESPERA_APOS_FALHA_TREINO_LSTM_S = 1800
+
+# Variante quantizada do TFLite para servir em CPU (quantizar_lstm.py): None desliga, "int8" ou "float16".
+# Só é promovida se o MAPE no holdout não piorar mais que a tolerância relativa.
+QUANTIZACAO_LSTM = None
+TOLERANCIA_MAPE_QUANTIZACAO = 0.05
+JANELAS_HOLDOUT_QUANTIZACAO = 60
+
+# Cache de respostas das rotas de análise (utils/cache_respostas.py): validade até o fechamento do candle
+MAX_RESPOSTAS_CACHE = 128
+WORKERS_ATUALIZACAO_RESPOSTAS = 2
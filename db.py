@@ -1,7 +1,9 @@
 # db.py
 import sqlite3
-from datetime import datetime
+import json
+from datetime import datetime, timedelta
 import os
+import pandas as pd
 
 # Garante que a pasta de dados exista
 os.makedirs("dados", exist_ok=True)
@@ -25,6 +27,75 @@ def criar_tabela():
         data_hora DATETIME DEFAULT CURRENT_TIMESTAMP
     )
     """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS diagnosticos_prophet (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticker TEXT NOT NULL,
+        freq TEXT,
+        escala REAL,
+        rmse REAL,
+        mape REAL,
+        cv_rmse REAL,
+        cv_mape REAL,
+        residuo_media REAL,
+        residuo_desvio REAL,
+        residuo_autocorr REAL,
+        graficos TEXT,
+        data_hora DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS execucoes_batch (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticker TEXT NOT NULL,
+        intervalo TEXT NOT NULL,
+        dias INTEGER,
+        status TEXT NOT NULL,
+        erro TEXT,
+        duracao_s REAL,
+        info TEXT,
+        gerado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_execucoes_batch_ticker
+    ON execucoes_batch (ticker, intervalo, status, gerado_em)
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS previsoes_batch (
+        execucao_id INTEGER NOT NULL REFERENCES execucoes_batch(id),
+        ds DATETIME NOT NULL,
+        yhat REAL,
+        yhat_lower REAL,
+        yhat_upper REAL
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_previsoes_batch_execucao
+    ON previsoes_batch (execucao_id, ds)
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS sweep_lstm (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticker TEXT NOT NULL,
+        janela INTEGER NOT NULL,
+        arquitetura TEXT NOT NULL,
+        epochs INTEGER NOT NULL,
+        dias INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        rmse REAL,
+        mae REAL,
+        mape REAL,
+        duracao_s REAL,
+        erro TEXT,
+        modelo_path TEXT,
+        gerado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_sweep_lstm_config
+    ON sweep_lstm (ticker, janela, arquitetura, epochs, dias, status)
+    """)
     conn.commit()
     conn.close()
 
@@ -56,4 +127,143 @@ def listar_previsoes(user_id, limit=20):
     """, (user_id, limit))
     resultados = cursor.fetchall()
     conn.close()
-    return resultados
\ No newline at end of file
+    return resultados
+
+def salvar_diagnostico_prophet(ticker, freq, escala, metricas, graficos=None):
+    """
+    Registra as métricas calculadas em segundo plano para um ajuste Prophet.
+    """
+    conn = conectar()
+    cursor = conn.cursor()
+    cursor.execute("""
+    INSERT INTO diagnosticos_prophet (
+        ticker, freq, escala, rmse, mape, cv_rmse, cv_mape,
+        residuo_media, residuo_desvio, residuo_autocorr, graficos, data_hora
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        ticker, freq, escala,
+        metricas.get("RMSE"), metricas.get("MAPE"),
+        metricas.get("CV_RMSE"), metricas.get("CV_MAPE"),
+        metricas.get("residuo_media"), metricas.get("residuo_desvio"), metricas.get("residuo_autocorr"),
+        ";".join(graficos or []), datetime.now()
+    ))
+    conn.commit()
+    conn.close()
+
+def obter_ultimo_diagnostico(ticker, freq):
+    """
+    Retorna o diagnóstico mais recente (dict) de um ticker/frequência, ou None.
+    """
+    conn = conectar()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute("""
+    SELECT * FROM diagnosticos_prophet
+    WHERE ticker = ? AND freq = ?
+    ORDER BY data_hora DESC
+    LIMIT 1
+    """, (ticker, freq))
+    linha = cursor.fetchone()
+    conn.close()
+    return dict(linha) if linha else None
+
+def salvar_execucao_batch(ticker, intervalo, dias, duracao_s, previsao_df=None, info=None, erro=None):
+    """
+    Registra o resultado de um ticker no batch de previsões (tempo, falha e pontos previstos).
+    """
+    status = "ok" if erro is None and previsao_df is not None and not previsao_df.empty else "falha"
+    conn = conectar()
+    cursor = conn.cursor()
+    cursor.execute("""
+    INSERT INTO execucoes_batch (ticker, intervalo, dias, status, erro, duracao_s, info, gerado_em)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (ticker, intervalo, dias, status, erro, duracao_s, json.dumps(info or {}, default=str), datetime.now()))
+    execucao_id = cursor.lastrowid
+
+    if status == "ok":
+        linhas = [
+            (execucao_id, str(row.ds), row.yhat, row.yhat_lower, row.yhat_upper)
+            for row in previsao_df[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].itertuples(index=False)
+        ]
+        cursor.executemany("""
+        INSERT INTO previsoes_batch (execucao_id, ds, yhat, yhat_lower, yhat_upper)
+        VALUES (?, ?, ?, ?, ?)
+        """, linhas)
+
+    conn.commit()
+    conn.close()
+    return execucao_id
+
+def obter_previsao_batch(ticker, intervalo, dias, validade_horas=24):
+    """
+    Retorna (previsao_df, info) da execução bem-sucedida mais recente dentro da validade,
+    ou None se não houver previsão pré-calculada utilizável.
+    """
+    limite = datetime.now() - timedelta(hours=validade_horas)
+    conn = conectar()
+    cursor = conn.cursor()
+    cursor.execute("""
+    SELECT id, info FROM execucoes_batch
+    WHERE ticker = ? AND intervalo = ? AND dias = ? AND status = 'ok' AND gerado_em >= ?
+    ORDER BY gerado_em DESC
+    LIMIT 1
+    """, (ticker, intervalo, dias, limite))
+    linha = cursor.fetchone()
+    if not linha:
+        conn.close()
+        return None
+
+    previsao_df = pd.read_sql(
+        "SELECT ds, yhat, yhat_lower, yhat_upper FROM previsoes_batch WHERE execucao_id = ? ORDER BY ds",
+        conn, params=(linha[0],), parse_dates=["ds"]
+    )
+    conn.close()
+    return previsao_df, json.loads(linha[1] or "{}")
+
+def salvar_resultado_sweep(ticker, janela, arquitetura, epochs, dias, duracao_s, metricas=None, erro=None, modelo_path=None):
+    """
+    Registra um job do sweep de LSTM (sweep_lstm.py): métricas no holdout ou a falha.
+    """
+    metricas = metricas or {}
+    conn = conectar()
+    cursor = conn.cursor()
+    cursor.execute("""
+    INSERT INTO sweep_lstm (ticker, janela, arquitetura, epochs, dias, status, rmse, mae, mape,
+                            duracao_s, erro, modelo_path, gerado_em)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (ticker, janela, arquitetura, epochs, dias, "ok" if erro is None else "falha",
+          metricas.get("rmse"), metricas.get("mae"), metricas.get("mape"),
+          duracao_s, erro, modelo_path, datetime.now()))
+    conn.commit()
+    conn.close()
+
+def listar_configs_sweep_concluidas(dias):
+    """
+    Conjunto de (ticker, janela, arquitetura, epochs) já concluídos com sucesso, para retomar o sweep.
+    """
+    conn = conectar()
+    cursor = conn.cursor()
+    cursor.execute("""
+    SELECT DISTINCT ticker, janela, arquitetura, epochs FROM sweep_lstm
+    WHERE dias = ? AND status = 'ok'
+    """, (dias,))
+    concluidas = set(cursor.fetchall())
+    conn.close()
+    return concluidas
+
+def obter_resultados_sweep(ticker=None):
+    """
+    Último resultado bem-sucedido de cada configuração, do menor MAPE para o maior.
+    """
+    conn = conectar()
+    filtro = "AND ticker = ?" if ticker else ""
+    resultados = pd.read_sql(f"""
+    SELECT ticker, janela, arquitetura, epochs, dias, rmse, mae, mape, duracao_s, modelo_path, MAX(gerado_em) AS gerado_em
+    FROM sweep_lstm
+    WHERE status = 'ok' {filtro}
+    GROUP BY ticker, janela, arquitetura, epochs, dias
+    ORDER BY ticker, mape
+    """, conn, params=(ticker,) if ticker else ())
+    conn.close()
+    return resultados
@@ -1,5 +1,35 @@
+import time
+
 from tensorflow.keras.callbacks import Callback
 
 class LoggerDePerda(Callback):
     def on_epoch_end(self, epoch, logs=None):
-        print(f"🔁 Época {epoch + 1}: perda = {logs.get('loss'):.5f}")
\ No newline at end of file
+        validacao = f", validação = {logs['val_loss']:.5f}" if "val_loss" in logs else ""
+        print(f"🔁 Época {epoch + 1}: perda = {logs.get('loss'):.5f}{validacao}")
+
+class OrcamentoDeTempo(Callback):
+    """
+    Registra a duração de cada época (tempos_epoca) e, com orcamento_s, encerra o treino
+    quando a próxima época (estimada pela mais lenta até agora) não cabe no tempo restante.
+    """
+    def __init__(self, orcamento_s=None):
+        super().__init__()
+        self.orcamento_s = orcamento_s
+        self.tempos_epoca = []
+        self.estourou = False
+
+    def on_train_begin(self, logs=None):
+        self._inicio = time.monotonic()
+        self.tempos_epoca = []
+        self.estourou = False
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._inicio_epoca = time.monotonic()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.tempos_epoca.append(time.monotonic() - self._inicio_epoca)
+        if self.orcamento_s is None:
+            return
+        if time.monotonic() - self._inicio + max(self.tempos_epoca) > self.orcamento_s:
+            self.estourou = True
+            self.model.stop_training = True
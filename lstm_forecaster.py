@@ -1,50 +1,221 @@
 import os
+import json
+import time
+import threading
+import weakref
+from datetime import datetime
 import numpy as np
 import pandas as pd
 import yfinance as yf
 import joblib
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import LSTM, Dense
-from tensorflow.keras.callbacks import EarlyStopping
 from sklearn.preprocessing import MinMaxScaler
-from logger_perda import LoggerDePerda
-from utils.dados_com_fallback import obter_dados_com_fallback
+from logger import uso_logger
+from config import (EPOCHS_FINE_TUNE_LSTM, JANELAS_FINE_TUNE_LSTM, MEIA_VIDA_FINE_TUNE_LSTM,
+                    TAXA_APRENDIZADO_FINE_TUNE_LSTM, MARGEM_SCALER_LSTM, FRACAO_VALIDACAO_LSTM,
+                    PACIENCIA_VALIDACAO_LSTM, QUANTIZACAO_LSTM)
+from utils.cache_dataset import obter_dataset, scaler_do_dataset, fechamentos_reais
+from utils.registro_modelos import registro_modelos
+from utils.calendario import FUSO_B3, usa_calendario_b3, proximo_fechamento
+from utils.janelas_lstm import janelas_deslizantes, dataset_janelas, MAX_JANELAS_EM_MEMORIA
+from utils.inferencia_lite import ModeloLite, carregar_modelo_inferencia, exportar_tflite
+
+# TensorFlow só é importado para treinar ou quando não há artefato TFLite (ver utils/inferencia_lite.py)
+
+LIMITE_VARIACAO_PASSO = 0.03  # Variação máxima entre passos consecutivos da previsão
+TENTATIVAS_PAR_ARTEFATO = 3    # Leituras de modelo + scaler enquanto salvar_modelo troca os arquivos
+ESPERA_PAR_ARTEFATO_S = 0.05
+
+_compiladas = weakref.WeakKeyDictionary()  # modelo Keras -> (inferir, prever_recursivo)
+_compiladas_lock = threading.Lock()
+
+
+def _funcoes_compiladas(modelo):
+    """
+    (tf, inferir, prever_recursivo) do modelo, compilados com tf.function na primeira previsão dele.
+    Cada modelo tem as próprias funções (com o modelo como argumento, cada instância retraçaria a
+    mesma função), que só o referenciam por weakref: quando o registro descarta o modelo, a
+    entrada e os grafos traçados saem junto.
+    """
+    import tensorflow as tf
+
+    with _compiladas_lock:
+        funcoes = _compiladas.get(modelo)
+        if funcoes is None:
+            referencia = weakref.ref(modelo)
+
+            @tf.function(reduce_retracing=True)
+            def inferir(entrada):
+                return referencia()(entrada, training=False)
+
+            @tf.function(reduce_retracing=True)
+            def prever_recursivo(janela_inicial, passos):
+                # Loop recursivo (cada passo realimenta a janela) em um único grafo:
+                # um tf.function por previsão em vez de um model.predict por passo.
+                rede = referencia()
+                saidas = tf.TensorArray(tf.float32, size=passos)
+                janela = janela_inicial
+                anterior = tf.constant(0.0)
+                for i in tf.range(passos):
+                    proximo = rede(janela, training=False)[0, 0]
+                    if i > 0:
+                        limites = tf.stack([anterior * (1 - LIMITE_VARIACAO_PASSO), anterior * (1 + LIMITE_VARIACAO_PASSO)])
+                        proximo = tf.clip_by_value(proximo, tf.reduce_min(limites), tf.reduce_max(limites))
+                    saidas = saidas.write(i, proximo)
+                    anterior = proximo
+                    janela = tf.concat([janela[:, 1:, :], tf.reshape(proximo, (1, 1, 1))], axis=1)
+                return saidas.stack()
+
+            funcoes = _compiladas[modelo] = (inferir, prever_recursivo)
+    return (tf, *funcoes)
+
+
+def _limitar_passo(proximo, anterior):
+    return float(np.clip(proximo, *sorted((anterior * (1 - LIMITE_VARIACAO_PASSO), anterior * (1 + LIMITE_VARIACAO_PASSO)))))
+
+
+def _limitar_variacao(valores):
+    """Mesmo limite de ±3% por passo do modo recursivo, aplicado à saída do modo direto."""
+    limitados = [float(valores[0])]
+    for valor in valores[1:]:
+        limitados.append(_limitar_passo(valor, limitados[-1]))
+    return np.array(limitados)
+
+
+def _como_fechamentos(dados):
+    """DataFrame com "Close" ou sequência de fechamentos → array (n, 1) sem NaN."""
+    if isinstance(dados, pd.DataFrame):
+        dados = dados["Close"]
+    serie = pd.Series(np.asarray(dados, dtype=float).reshape(-1)).dropna()
+    return serie.values.reshape(-1, 1)
+
+
+def _estender_scaler(scaler, close, margem=MARGEM_SCALER_LSTM):
+    """
+    Mantém o intervalo do scaler salvo (a escala que o modelo aprendeu) e só o alarga quando os
+    fechamentos novos saem dele, com folga. Dentro do intervalo nada muda. Retorna True se alargou.
+    """
+    minimo, maximo = float(scaler.data_min_[0]), float(scaler.data_max_[0])
+    novo_min, novo_max = float(close.min()), float(close.max())
+    if novo_min >= minimo and novo_max <= maximo:
+        return False
+
+    folga = (max(maximo, novo_max) - min(minimo, novo_min)) * margem
+    if novo_min < minimo:
+        minimo = max(novo_min - folga, 0.0)
+    if novo_max > maximo:
+        maximo = novo_max + folga
+    scaler.fit(np.array([[minimo], [maximo]]))
+    return True
+
+
+def _data_iso(valor):
+    try:
+        return pd.Timestamp(valor).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def _gravar_json_atomico(caminho, conteudo):
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(conteudo, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def janela_defasada(ticker, ultima_data):
+    """
+    True se já fechou um candle diário depois de ultima_data: a janela guardada no meta ficou
+    para trás (o artefato só a avança quando é retreinado ou atualizado).
+    """
+    if not ultima_data:
+        return True
+    try:
+        fuso = FUSO_B3 if usa_calendario_b3(ticker) else "UTC"
+        ultima = pd.Timestamp(ultima_data)
+        ultima = ultima.tz_localize(fuso) if ultima.tz is None else ultima.tz_convert(fuso)
+        fechamento_seguinte = proximo_fechamento("1d", ticker, agora=proximo_fechamento("1d", ticker, agora=ultima))
+    except (TypeError, ValueError) as e:
+        uso_logger.warning(f"⚠️ ultima_data inválida no meta de {ticker} ({ultima_data}): {e}")
+        return True
+    return pd.Timestamp.now(tz=fuso) >= fechamento_seguinte
+
 
 class CriptoForecaster:
-    def __init__(self, ticker, janela=60, epochs=100, modelo_path=None):
+    def __init__(self, ticker, janela=60, epochs=100, modelo_path=None, horizonte=1, scaler_path=None):
+        """
+        horizonte > 1 treina/carrega um modelo multi-horizonte (Dense(horizonte)) que devolve
+        todos os passos em uma única passada; horizonte=1 mantém o modelo recursivo.
+        modelo_path/scaler_path separados (ex.: sweep_lstm.py) não tocam nos artefatos de produção.
+        """
         self.ticker = ticker
         self.janela = janela
         self.epochs = epochs
-        self.modelo_path = modelo_path or f"modelos_lstm/{ticker}_modelo.keras"
-        self.scaler_path = f"modelos_lstm/{ticker}_scaler.pkl"
+        self.horizonte = horizonte
+        sufixo = "" if horizonte == 1 else f"_h{horizonte}"
+        self.modelo_path = modelo_path or f"modelos_lstm/{ticker}_modelo{sufixo}.keras"
+        self.scaler_path = scaler_path or f"modelos_lstm/{ticker}_scaler.pkl"
+        self.meta_path = f"{os.path.splitext(self.modelo_path)[0]}_meta.json"
         self.modelo = None
         self.scaler = MinMaxScaler()
         self.dados_treinamento = None
+        self.ultima_data = None
+        self.fonte = None
+        self.historico_treino = None
 
     def modelo_existente(self):
         return os.path.exists(self.modelo_path) and os.path.exists(self.scaler_path)
 
-    def carregar_dados(self, preferencia="auto"):
+    def carregar_dados(self, preferencia="auto", ajustar_scaler=True, usar_cache=True):
+        """
+        ~1 ano de fechamentos diários, normalizados. Vêm do cache em disco (utils/cache_dataset.py),
+        aberto com mmap e compartilhado entre processos; só baixa se o cache faltar ou vencer.
+        ajustar_scaler=False usa o scaler já carregado (o do treino), sem reajustá-lo aos dados atuais.
+        """
         try:
-            df, fonte, intervalo_usado, msg = obter_dados_com_fallback(
-                self.ticker, intervalo="1d", periodo="1y", outputsize=365, preferencia=preferencia
+            serie, meta, _ = obter_dataset(
+                self.ticker, intervalo="1d", periodo="1y", outputsize=365, preferencia=preferencia,
+                forcar_download=not usar_cache
             )
+            if len(serie) < self.janela + self.horizonte:
+                raise ValueError(f"⚠️ Dados insuficientes para {self.ticker} (len={len(serie)})")
 
-            if df.empty or "Close" not in df.columns or df["Close"].dropna().empty:
-                raise ValueError(f"❌ Sem dados válidos para {self.ticker}")
-
-            close = df["Close"].dropna().values.reshape(-1, 1)
-            if len(close) < self.janela + 1:
-                raise ValueError(f"⚠️ Dados insuficientes para {self.ticker} (len={len(close)})")
-
-            self.dados_treinamento = self.scaler.fit_transform(close).flatten()
-            print(f"📥 Dados carregados via {fonte} – {len(close)} pontos (intervalo: {intervalo_usado})")
+            if ajustar_scaler:
+                # A normalização do cache é a mesma de um fit_transform na série: usa o mmap direto
+                self.scaler = scaler_do_dataset(meta)
+                self.dados_treinamento = serie
+            else:
+                self.dados_treinamento = self.scaler.transform(fechamentos_reais(serie, meta)).flatten()
+            self.ultima_data = meta["ultima_data"]
+            self.fonte = meta["fonte"]
+            print(f"📥 Dados carregados via {self.fonte} – {len(serie)} pontos (cache de {meta['gerado_em']})")
 
         except Exception as e:
             raise RuntimeError(f"Erro ao carregar dados para {self.ticker}: {e}")
 
-    def treinar(self, callbacks=None, arquitetura="simples"):
+    def treinar(self, callbacks=None, arquitetura="simples", orcamento_s=None, fracao_validacao=None):
+        """
+        Com orcamento_s (segundos), o treino é guiado por relógio: as últimas `fracao_validacao`
+        janelas, em ordem cronológica, viram validação; o EarlyStopping monitora val_loss e o
+        treino para quando a paciência acaba ou a próxima época não cabe no orçamento.
+        self.epochs continua sendo o teto. Duração das épocas e motivo da parada ficam em
+        self.historico_treino (e no meta do artefato).
+        """
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense
+        from tensorflow.keras.callbacks import EarlyStopping
+        from logger_perda import LoggerDePerda, OrcamentoDeTempo
+
+        if fracao_validacao is None and orcamento_s is not None:
+            fracao_validacao = FRACAO_VALIDACAO_LSTM
+
         X, y = self._preparar_dados_para_treino(self.dados_treinamento)
+        n_validacao = int(len(X) * (fracao_validacao or 0))
+        if n_validacao >= len(X):
+            n_validacao = 0
+        n_treino = len(X) - n_validacao
+        validacao = (X[n_treino:], y[n_treino:]) if n_validacao else None
+        # Históricos longos vão em lotes via tf.data; os curtos seguem como arrays (cópia única no fit)
+        em_lotes = n_treino > MAX_JANELAS_EM_MEMORIA
 
         self.modelo = Sequential()
 
@@ -54,61 +225,242 @@ class CriptoForecaster:
         else:
             self.modelo.add(LSTM(64, return_sequences=False, input_shape=(X.shape[1], 1)))
 
-        self.modelo.add(Dense(1))
+        self.modelo.add(Dense(self.horizonte))
         self.modelo.compile(optimizer="adam", loss="mse")
 
+        es = None
         if callbacks is None:
-            es = EarlyStopping(monitor='loss', patience=3, restore_best_weights=True)
-            log = LoggerDePerda()
-            callbacks = [es, log]
+            if validacao:
+                es = EarlyStopping(monitor='val_loss', patience=PACIENCIA_VALIDACAO_LSTM, restore_best_weights=True)
+            else:
+                es = EarlyStopping(monitor='loss', patience=3, restore_best_weights=True)
+            callbacks = [es, LoggerDePerda()]
+        relogio = OrcamentoDeTempo(orcamento_s)
+        callbacks = list(callbacks) + [relogio]
+
+        if em_lotes:
+            # Só as janelas de treino: a série é cortada onde começam os alvos da validação
+            serie_treino = self.dados_treinamento[:n_treino + self.janela + self.horizonte - 1]
+            dados = dataset_janelas(serie_treino, self.janela, self.horizonte, batch_size=16)
+            historico = self.modelo.fit(dados, epochs=self.epochs, verbose=1, callbacks=callbacks,
+                                        validation_data=validacao)
+        else:
+            historico = self.modelo.fit(X[:n_treino], y[:n_treino], epochs=self.epochs, batch_size=16, verbose=1,
+                                        callbacks=callbacks, validation_data=validacao)
+
+        # Parada pelo orçamento não passa pelo EarlyStopping: restaura a melhor época aqui
+        if es is not None and es.stopped_epoch == 0 and es.best_weights is not None:
+            self.modelo.set_weights(es.best_weights)
+
+        perdas_validacao = historico.history.get("val_loss")
+        self.historico_treino = {
+            "epocas": len(relogio.tempos_epoca),
+            "tempo_total_s": round(sum(relogio.tempos_epoca), 2),
+            "tempo_por_epoca_s": round(float(np.mean(relogio.tempos_epoca)), 3) if relogio.tempos_epoca else None,
+            "orcamento_s": orcamento_s,
+            "parou_por": "orcamento" if relogio.estourou else ("paciencia" if es is not None and es.stopped_epoch > 0 else "epochs"),
+            "janelas_validacao": n_validacao,
+            "melhor_val_loss": float(min(perdas_validacao)) if perdas_validacao else None,
+        }
+        uso_logger.info(
+            f"🧠 LSTM de {self.ticker}: {self.historico_treino['epocas']} épocas em "
+            f"{self.historico_treino['tempo_total_s']}s (parada: {self.historico_treino['parou_por']})"
+        )
+        self.salvar_modelo()
+
+    def atualizar(self, novos_dados=None, epochs=EPOCHS_FINE_TUNE_LSTM):
+        """
+        Fine-tuning do modelo salvo com os candles mais recentes, em vez de treinar do zero.
+        novos_dados: fechamentos recentes (DataFrame com "Close" ou array), com pelo menos
+        janela + horizonte pontos; sem eles, baixa a série como carregar_dados.
+        Sem modelo salvo, faz o treino completo.
+        """
+        existente = self.modelo_existente()
+        if existente:
+            self.scaler = joblib.load(self.scaler_path)
+
+        if novos_dados is None:
+            self.carregar_dados(ajustar_scaler=not existente)
+            close = self.scaler.inverse_transform(self.dados_treinamento.reshape(-1, 1))
+        else:
+            close = _como_fechamentos(novos_dados)
+            if isinstance(novos_dados, pd.DataFrame) and isinstance(novos_dados.index, pd.DatetimeIndex):
+                self.ultima_data = _data_iso(novos_dados.index[-1])
+            if len(close) < self.janela + self.horizonte:
+                raise ValueError(f"⚠️ Dados insuficientes para atualizar {self.ticker} (len={len(close)})")
+
+        if not existente:
+            uso_logger.info(f"🧠 {self.ticker} sem modelo salvo: treino completo")
+            self.dados_treinamento = self.scaler.fit_transform(close).flatten()
+            self.treinar()
+            return
+
+        from tensorflow.keras.models import load_model
+        from tensorflow.keras.optimizers import Adam
+
+        if _estender_scaler(self.scaler, close):
+            uso_logger.info(f"📏 Scaler de {self.ticker} alargado para {self.scaler.data_min_[0]:.4f}–{self.scaler.data_max_[0]:.4f}")
+        self.dados_treinamento = self.scaler.transform(close).flatten()
 
-        self.modelo.fit(X, y, epochs=self.epochs, batch_size=16, verbose=1, callbacks=callbacks)
+        recentes = self.dados_treinamento[-(JANELAS_FINE_TUNE_LSTM + self.janela + self.horizonte - 1):]
+        X, y = janelas_deslizantes(recentes, self.janela, self.horizonte)
+        idade = np.arange(len(X))[::-1]
+        pesos = 0.5 ** (idade / MEIA_VIDA_FINE_TUNE_LSTM)
+
+        # Carga própria: o modelo do registro é compartilhado com as previsões em andamento
+        self.modelo = load_model(self.modelo_path)
+        if self.modelo.output_shape[-1] != self.horizonte:
+            raise ValueError(f"Modelo salvo de {self.ticker} tem saída {self.modelo.output_shape[-1]}, esperado {self.horizonte}")
+        self.modelo.compile(optimizer=Adam(learning_rate=TAXA_APRENDIZADO_FINE_TUNE_LSTM), loss="mse")
+        self.modelo.fit(X, y, sample_weight=pesos, epochs=epochs, batch_size=16, verbose=0)
         self.salvar_modelo()
+        uso_logger.info(f"🔁 LSTM de {self.ticker} atualizado: {epochs} epochs em {len(X)} janelas recentes")
 
     def salvar_modelo(self):
+        """
+        Grava modelo e scaler em temporários e troca com os.replace: o registro e as outras
+        requisições nunca leem um arquivo pela metade. A troca é modelo → scaler → meta, e o meta
+        registra o mtime dos dois: entre as trocas o par em disco não bate com o meta e
+        carregar_modelo_treinado espera, em vez de juntar o scaler novo com o modelo antigo.
+        """
         os.makedirs(os.path.dirname(self.modelo_path), exist_ok=True)
-        self.modelo.save(self.modelo_path)
-        joblib.dump(self.scaler, self.scaler_path)
+        raiz, extensao = os.path.splitext(self.modelo_path)
+        modelo_tmp = f"{raiz}.tmp{extensao}"
+        scaler_tmp = f"{self.scaler_path}.tmp"
+
+        self.modelo.save(modelo_tmp)
+        joblib.dump(self.scaler, scaler_tmp)
+        os.replace(modelo_tmp, self.modelo_path)
+        os.replace(scaler_tmp, self.scaler_path)
+        campos = {"treinado_em": datetime.now().isoformat(timespec="seconds"), "arquivos": self._mtimes_artefato()}
+        if self.historico_treino:
+            campos["treino"] = self.historico_treino
+        self._salvar_meta(**campos)
+
+        # Artefato TFLite para servir sem TensorFlow (só é gravado se bater com o Keras)
+        try:
+            exportado = exportar_tflite(self.modelo_path, modelo=self.modelo)
+        except Exception as e:
+            exportado = False
+            uso_logger.warning(f"⚠️ Exportação TFLite de {self.ticker} falhou: {e}")
+
+        # Variante quantizada opcional, promovida só se passar no limite de MAPE
+        if exportado and QUANTIZACAO_LSTM:
+            from quantizar_lstm import quantizar_e_promover
+            try:
+                quantizar_e_promover(self, QUANTIZACAO_LSTM)
+            except Exception as e:
+                uso_logger.warning(f"⚠️ Quantização {QUANTIZACAO_LSTM} de {self.ticker} falhou: {e}")
+
+    def _salvar_meta(self, **campos):
+        """
+        Metadados do artefato + últimas `janela` entradas normalizadas: com eles a previsão
+        não precisa baixar a série de novo enquanto não fechar outro candle (ver carregar_modelo_treinado).
+        """
+        meta = self._ler_meta() or {}
+        meta.update({
+            "ticker": self.ticker,
+            "janela": self.janela,
+            "horizonte": self.horizonte,
+            "epochs": self.epochs,
+            "fonte": self.fonte,
+            "ultima_data": self.ultima_data,
+            "ultima_janela": [float(v) for v in self.dados_treinamento[-self.janela:]],
+            "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+        })
+        meta.update(campos)
+        _gravar_json_atomico(self.meta_path, meta)
+
+    def _ler_meta(self):
+        if not os.path.exists(self.meta_path):
+            return None
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            uso_logger.warning(f"⚠️ Metadados ilegíveis em {self.meta_path}: {e}")
+            return None
+
+    def _mtimes_artefato(self):
+        return {"modelo": os.path.getmtime(self.modelo_path), "scaler": os.path.getmtime(self.scaler_path)}
+
+    def _par_em_troca(self, meta):
+        """True se modelo e scaler em disco não são o par registrado no meta (salvar_modelo no meio da troca)."""
+        registrados = (meta or {}).get("arquivos")
+        return bool(registrados) and registrados != self._mtimes_artefato()
 
     def carregar_modelo_treinado(self):
+        """
+        Carga local: modelo, scaler e última janela saem do artefato salvo.
+        Se já fechou um candle depois da janela guardada, ela vem da série atual (cache em disco,
+        normalizada pelo scaler do artefato); artefatos antigos, sem metadados ou de outra janela, idem.
+        """
         if os.path.exists(self.modelo_path):
-            self.modelo = load_model(self.modelo_path)
-            self.scaler = joblib.load(self.scaler_path)
-            self.carregar_dados()
+            for _ in range(TENTATIVAS_PAR_ARTEFATO):
+                meta = self._ler_meta()
+                if not self._par_em_troca(meta):
+                    self.modelo = carregar_modelo_inferencia(self.modelo_path)
+                    # Escala do treino/fine-tuning: o scaler do registro só é lido, nunca reajustado
+                    self.scaler = registro_modelos.obter_scaler(self.scaler_path)
+                    if not self._par_em_troca(meta):
+                        break  # Nenhuma troca começou durante a carga
+                time.sleep(ESPERA_PAR_ARTEFATO_S)
+            else:
+                raise RuntimeError(f"Modelo e scaler de {self.ticker} sendo regravados; tente novamente")
+
+            if meta and meta.get("janela") == self.janela and len(meta.get("ultima_janela", [])) == self.janela:
+                self.dados_treinamento = np.asarray(meta["ultima_janela"], dtype=np.float32)
+                self.ultima_data = meta.get("ultima_data")
+                self.fonte = meta.get("fonte")
+                if self._janela_defasada():
+                    try:
+                        self.carregar_dados(ajustar_scaler=False)
+                    except RuntimeError as e:
+                        uso_logger.warning(f"⚠️ {self.ticker}: usando a janela do artefato ({self.ultima_data}): {e}")
+            else:
+                self.carregar_dados(ajustar_scaler=False)
         else:
             raise FileNotFoundError(f"Modelo não encontrado para {self.ticker}")
 
+    def _janela_defasada(self):
+        return janela_defasada(self.ticker, self.ultima_data)
+
     def prever(self, dias=5):
         if not self.modelo:
             raise RuntimeError("Modelo ainda não carregado.")
 
-        ultimos_dados = self.dados_treinamento[-self.janela:].copy()
-        previsoes = []
-
-        for _ in range(dias):
-            entrada = np.array(ultimos_dados).reshape(1, self.janela, 1)
-            proximo = self.modelo.predict(entrada, verbose=0)[0][0]
+        entrada = self.dados_treinamento[-self.janela:].reshape(1, self.janela, 1).astype(np.float32)
 
-            if len(previsoes) >= 1:
-                anterior = previsoes[-1]
-                variacao = (proximo - anterior) / anterior
-                if variacao > 0.03:
-                    proximo = anterior * 1.03
-                elif variacao < -0.03:
-                    proximo = anterior * 0.97
-
-            previsoes.append(proximo)
-            ultimos_dados = np.append(ultimos_dados[1:], proximo)
+        if isinstance(self.modelo, ModeloLite):
+            previsoes = self._prever_lite(entrada, dias)
+        else:
+            tf, inferir, prever_recursivo = _funcoes_compiladas(self.modelo)
+            if self.modelo.output_shape[-1] >= dias > 1:
+                # Modo direto: todos os passos em uma passada
+                previsoes = _limitar_variacao(inferir(entrada).numpy()[0][:dias])
+            else:
+                previsoes = prever_recursivo(tf.constant(entrada), tf.constant(dias)).numpy()
 
         previsoes = np.array(previsoes).reshape(-1, 1)
         previsoes_reais = self.scaler.inverse_transform(previsoes).flatten()
         return [{"valor": round(v, 2)} for v in previsoes_reais]
 
+    def _prever_lite(self, entrada, dias):
+        """
+        Mesmo cálculo do caminho Keras (direto ou recursivo com limite por passo) no runtime TFLite.
+        """
+        if self.modelo.largura_saida >= dias > 1:
+            return _limitar_variacao(self.modelo(entrada)[0][:dias])
+
+        janela = entrada.copy()
+        previsoes = []
+        for _ in range(dias):
+            proximo = float(self.modelo(janela)[0][0])
+            if previsoes:
+                proximo = _limitar_passo(proximo, previsoes[-1])
+            previsoes.append(proximo)
+            janela = np.concatenate([janela[:, 1:, :], [[[proximo]]]], axis=1).astype(np.float32)
+        return np.array(previsoes)
+
     def _preparar_dados_para_treino(self, dados):
-        X, y = [], []
-        for i in range(len(dados) - self.janela):
-            X.append(dados[i:i + self.janela])
-            y.append(dados[i + self.janela])
-        X = np.array(X).reshape(-1, self.janela, 1)
-        y = np.array(y).reshape(-1, 1)
-        return X, y
+        return janelas_deslizantes(dados, self.janela, self.horizonte)
@@ -0,0 +1,228 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from config import JANELA_LSTM_GLOBAL, DIM_EMBEDDING_TICKER
+from logger import uso_logger, erro_logger
+from lstm_forecaster import _limitar_passo, _limitar_variacao, _gravar_json_atomico, janela_defasada
+from utils.registro_modelos import registro_modelos
+from utils.janelas_lstm import janelas_deslizantes
+from utils.cache_dataset import obter_dataset, fechamentos_reais
+from utils.inferencia_lite import ModeloLite, carregar_modelo_inferencia, lite_atualizado
+
+# Um único modelo para todo o universo: cada ticker é normalizado pelo próprio min/max
+# (guardado no meta, sem um scaler por arquivo) e, opcionalmente, identificado por um embedding.
+MODELO_GLOBAL_PATH = "modelos_lstm/global_modelo.keras"
+META_GLOBAL_PATH = "modelos_lstm/global_meta.json"
+
+_meta_cache = {}
+_meta_lock = threading.Lock()
+_avisos_keras = set()  # treinado_em dos modelos já avisados (um aviso por modelo, não por requisição)
+
+
+def _desnormalizar(valores, minimo, maximo):
+    return np.asarray(valores, dtype=float) * ((maximo - minimo) or 1.0) + minimo
+
+
+def _criar_modelo(janela, horizonte, n_tickers, com_embedding):
+    """
+    LSTM(64) → Dense(horizonte). Com embedding, o id do ticker (0 = desconhecido) vira um vetor
+    repetido em cada passo e concatenado à série antes da LSTM.
+    """
+    from tensorflow.keras import layers, Model
+
+    serie = layers.Input(shape=(janela, 1), name="serie")
+    entradas, x = [serie], serie
+    if com_embedding:
+        ticker_id = layers.Input(shape=(), dtype="int32", name="ticker_id")
+        vetor = layers.Embedding(n_tickers + 1, DIM_EMBEDDING_TICKER)(ticker_id)
+        x = layers.Concatenate()([serie, layers.RepeatVector(janela)(vetor)])
+        entradas.append(ticker_id)
+
+    x = layers.LSTM(64)(x)
+    saida = layers.Dense(horizonte)(x)
+    modelo = Model(entradas, saida)
+    modelo.compile(optimizer="adam", loss="mse")
+    return modelo
+
+
+def treinar_modelo_global(tickers, janela=JANELA_LSTM_GLOBAL, horizonte=1, epochs=50, com_embedding=False, callbacks=None):
+    """
+    Treina o modelo global com as janelas de todos os tickers, cada um normalizado pela própria faixa.
+    Sem embedding (padrão) o modelo tem uma entrada só e é servido pelo TFLite; com embedding,
+    pelo Keras completo.
+    Grava modelo e meta (faixa, id e última janela de cada ticker) atomicamente. Retorna o meta.
+    """
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    series, meta_tickers = [], {}
+    for ticker in tickers:
+        try:
+            # Mesma normalização por ticker do cache em disco: a série já vem pronta (mmap)
+            normalizados, dataset, _ = obter_dataset(ticker)
+        except Exception as e:
+            erro_logger.error(f"[LSTM global] ❌ {ticker}: {e}")
+            continue
+        if len(normalizados) < janela + horizonte:
+            uso_logger.warning(f"[LSTM global] ⚠️ {ticker} ignorado: só {len(normalizados)} candles")
+            continue
+
+        meta_tickers[ticker] = {
+            "id": len(meta_tickers) + 1,
+            "min": dataset["min"],
+            "max": dataset["max"],
+            "ultima_data": dataset["ultima_data"],
+            "ultima_janela": [float(v) for v in normalizados[-janela:]],
+        }
+        series.append((normalizados, meta_tickers[ticker]["id"]))
+
+    if not series:
+        raise RuntimeError("Nenhum ticker com dados suficientes para o modelo global.")
+
+    blocos = [janelas_deslizantes(normalizados, janela, horizonte) for normalizados, _ in series]
+    X = np.concatenate([x for x, _ in blocos])
+    y = np.concatenate([y for _, y in blocos])
+    ids = np.concatenate([np.full(len(x), id_, dtype=np.int32) for (x, _), (_, id_) in zip(blocos, series)])
+
+    modelo = _criar_modelo(janela, horizonte, len(meta_tickers), com_embedding)
+    callbacks = callbacks or [EarlyStopping(monitor="loss", patience=3, restore_best_weights=True)]
+    entradas = [X, ids] if com_embedding else X
+    modelo.fit(entradas, y, epochs=epochs, batch_size=64, shuffle=True, verbose=1, callbacks=callbacks)
+
+    os.makedirs(os.path.dirname(MODELO_GLOBAL_PATH), exist_ok=True)
+    raiz, extensao = os.path.splitext(MODELO_GLOBAL_PATH)
+    modelo_tmp = f"{raiz}.tmp{extensao}"
+    modelo.save(modelo_tmp)
+    os.replace(modelo_tmp, MODELO_GLOBAL_PATH)
+
+    meta = {
+        "janela": janela,
+        "horizonte": horizonte,
+        "com_embedding": com_embedding,
+        "epochs": epochs,
+        "treinado_em": datetime.now().isoformat(timespec="seconds"),
+        "tickers": meta_tickers,
+    }
+    _gravar_json_atomico(META_GLOBAL_PATH, meta)
+
+    if not com_embedding:
+        # Uma entrada só: exporta também o artefato TFLite (ver utils/inferencia_lite.py)
+        from utils.inferencia_lite import exportar_tflite
+        try:
+            exportar_tflite(MODELO_GLOBAL_PATH, modelo=modelo)
+        except Exception as e:
+            uso_logger.warning(f"⚠️ Exportação TFLite do modelo global falhou: {e}")
+
+    uso_logger.info(f"🌐 LSTM global treinado: {len(meta_tickers)} tickers, {len(X)} janelas")
+    return meta
+
+
+def modelo_global_existente():
+    return os.path.exists(MODELO_GLOBAL_PATH) and os.path.exists(META_GLOBAL_PATH)
+
+
+def carregar_meta_global():
+    """Meta do modelo global, relido só quando o arquivo muda (mesma regra do registro de modelos)."""
+    mtime = os.path.getmtime(META_GLOBAL_PATH)
+    with _meta_lock:
+        if _meta_cache.get("mtime") != mtime:
+            with open(META_GLOBAL_PATH, encoding="utf-8") as f:
+                _meta_cache.update(meta=json.load(f), mtime=mtime)
+        return _meta_cache["meta"]
+
+
+def _carregar_modelo(meta):
+    com_embedding = bool(meta.get("com_embedding"))
+    if (com_embedding or not lite_atualizado(MODELO_GLOBAL_PATH)) and meta.get("treinado_em") not in _avisos_keras:
+        _avisos_keras.add(meta.get("treinado_em"))
+        motivo = "treinado com embedding (duas entradas)" if com_embedding else "sem artefato TFLite em dia"
+        uso_logger.warning(f"⚠️ LSTM global {motivo}: servindo pelo Keras completo")
+    if com_embedding:
+        return registro_modelos.obter_modelo(MODELO_GLOBAL_PATH)
+    return carregar_modelo_inferencia(MODELO_GLOBAL_PATH)
+
+
+def _inferir(modelo, entrada, ids, com_embedding):
+    if isinstance(modelo, ModeloLite):
+        return modelo(entrada)
+    entradas = [entrada, ids] if com_embedding else entrada
+    return np.asarray(modelo(entradas, training=False))
+
+
+def _janela_atual(ticker, info, janela):
+    """
+    Janela normalizada mais recente do ticker: a do meta enquanto nenhum candle diário fechou
+    depois do treino; senão, os últimos fechamentos do cache de datasets, normalizados pela
+    faixa do treino (a mesma que o modelo viu). Se o cache falhar, fica a janela do meta.
+    """
+    if not janela_defasada(ticker, info.get("ultima_data")):
+        return info["ultima_janela"]
+    try:
+        serie, dataset, _ = obter_dataset(ticker)
+        if len(serie) < janela:
+            raise ValueError(f"só {len(serie)} candles")
+        fechamentos = fechamentos_reais(serie[-janela:], dataset).flatten()
+        return (fechamentos - info["min"]) / ((info["max"] - info["min"]) or 1.0)
+    except Exception as e:
+        uso_logger.warning(f"⚠️ [LSTM global] {ticker}: usando a janela do meta ({info.get('ultima_data')}): {e}")
+        return info["ultima_janela"]
+
+
+def cobre_ticker(ticker):
+    return modelo_global_existente() and ticker in carregar_meta_global()["tickers"]
+
+
+def prever_global_lote(tickers, dias=5):
+    """
+    Previsão de vários tickers com os mesmos pesos e uma chamada ao modelo por passo para o lote inteiro.
+    A janela de cada ticker é a do meta ou, se já fechou candle depois do treino, a atualizada
+    pelo cache de datasets (_janela_atual). Tickers fora do modelo são ignorados.
+    Retorna {ticker: [{"valor": float}]}.
+    """
+    meta = carregar_meta_global()
+    conhecidos = [t for t in dict.fromkeys(tickers) if t in meta["tickers"]]
+    if not conhecidos:
+        return {}
+
+    modelo = _carregar_modelo(meta)
+    com_embedding = bool(meta.get("com_embedding"))
+    janela = meta["janela"]
+    info = [meta["tickers"][t] for t in conhecidos]
+    janelas = [_janela_atual(t, i, janela) for t, i in zip(conhecidos, info)]
+    entrada = np.array(janelas, dtype=np.float32).reshape(len(info), janela, 1)
+    ids = np.array([i["id"] for i in info], dtype=np.int32)
+
+    if meta["horizonte"] >= dias > 1:
+        saida = _inferir(modelo, entrada, ids, com_embedding)[:, :dias]
+        normalizadas = np.array([_limitar_variacao(linha) for linha in saida])
+    else:
+        normalizadas = np.zeros((len(info), dias), dtype=np.float32)
+        for passo in range(dias):
+            proximos = _inferir(modelo, entrada, ids, com_embedding)[:, 0]
+            if passo > 0:
+                proximos = np.array([_limitar_passo(p, a) for p, a in zip(proximos, normalizadas[:, passo - 1])])
+            normalizadas[:, passo] = proximos
+            entrada = np.concatenate([entrada[:, 1:, :], proximos.reshape(-1, 1, 1)], axis=1).astype(np.float32)
+
+    return {
+        ticker: [{"valor": round(float(v), 2)} for v in _desnormalizar(linha, i["min"], i["max"])]
+        for ticker, linha, i in zip(conhecidos, normalizadas, info)
+    }
+
+
+def prever_global(ticker, dias=5):
+    """Previsão de um ticker pelo modelo global, ou None se ele não faz parte do modelo."""
+    if not cobre_ticker(ticker):
+        return None
+    return prever_global_lote([ticker], dias=dias).get(ticker)
+
+
+if __name__ == "__main__":
+    from config import ATIVOS_MONITORADOS
+
+    treinar_modelo_global(ATIVOS_MONITORADOS)
+    for ticker, previsoes in prever_global_lote(ATIVOS_MONITORADOS).items():
+        print(f"{ticker}: {[p['valor'] for p in previsoes]}")
@@ -107,12 +107,11 @@ def ajustar_previsao_lstm(valor_original, indicadores, ticker=None):
     # =============================================================================
 # Criação do modelo LSTM para treinamento (usado em train_cripto.py)
 # =============================================================================
-import tensorflow as tf
-Sequential = tf.keras.models.Sequential
-LSTM = tf.keras.layers.LSTM
-Dense = tf.keras.layers.Dense
-
 def criar_modelo(janela: int, saida: int):
+    # TensorFlow só é importado no treino (as rotas usam este módulo para a análise GPT)
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense
+
     modelo = Sequential()
     modelo.add(LSTM(50, return_sequences=True, input_shape=(janela, 1)))
     modelo.add(LSTM(50))
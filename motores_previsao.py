@@ -0,0 +1,171 @@
+import time
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from config import MOTOR_PREVISAO_POR_INTERVALO
+from logger import uso_logger
+from utils.calendario import proximos_horarios
+from prophet_forecaster import (
+    APELIDOS_FREQ,
+    prever_prophet_logistico,
+    preparar_serie_previsao,
+    pos_processar_previsao,
+)
+
+# Grade do Holt com tendência amortecida (forma de correção de erro)
+ALFAS_HOLT = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+BETAS_HOLT = np.array([0.01, 0.05, 0.1, 0.3])
+PHIS_HOLT = np.array([0.8, 0.9, 0.95, 0.98])
+NIVEL_CONFIANCA = 0.90
+N_SIMULACOES_HOLT = 500
+
+# Latência típica por motor em séries de ~130 candles (ms), usada com orcamento_ms
+LATENCIA_ESTIMADA_MS = {"holt": 50, "prophet": 3000}
+
+
+def _filtrar_holt(y, alfas, betas, phis):
+    """
+    Passa todas as combinações da grade pela série de uma vez (vetorizado por combinação).
+    Retorna (ajustados[n, g], nivel[g], tendencia[g]) com a previsão um passo à frente.
+    """
+    nivel = np.full(alfas.shape, y[0], dtype=float)
+    tendencia = np.full(alfas.shape, y[1] - y[0] if len(y) > 1 else 0.0, dtype=float)
+    ajustados = np.empty((len(y), len(alfas)))
+
+    for t, valor in enumerate(y):
+        previsto = nivel + phis * tendencia
+        ajustados[t] = previsto
+        erro = valor - previsto
+        nivel = previsto + alfas * erro
+        tendencia = phis * tendencia + alfas * betas * erro
+
+    return ajustados, nivel, tendencia
+
+
+def ajustar_holt_amortecido(y):
+    """
+    Escolhe (alfa, beta, phi) pelo menor erro quadrático um passo à frente.
+    Retorna dict com parâmetros, estado final, valores ajustados e resíduos.
+    """
+    y = np.asarray(y, dtype=float)
+    grade = np.array(list(itertools.product(ALFAS_HOLT, BETAS_HOLT, PHIS_HOLT)))
+    alfas, betas, phis = grade[:, 0], grade[:, 1], grade[:, 2]
+
+    ajustados, nivel, tendencia = _filtrar_holt(y, alfas, betas, phis)
+    # O primeiro ponto é a própria inicialização; fica fora do critério
+    sse = np.sum((y[1:, None] - ajustados[1:]) ** 2, axis=0)
+    melhor = int(np.argmin(sse))
+
+    return {
+        "alfa": float(alfas[melhor]),
+        "beta": float(betas[melhor]),
+        "phi": float(phis[melhor]),
+        "nivel": float(nivel[melhor]),
+        "tendencia": float(tendencia[melhor]),
+        "ajustados": ajustados[:, melhor],
+        "residuos": y[1:] - ajustados[1:, melhor],
+    }
+
+
+def simular_holt(ajuste, periodos, n_simulacoes=N_SIMULACOES_HOLT, semente=42):
+    """
+    Caminhos futuros por bootstrap dos resíduos (matriz n_simulacoes x periodos).
+    """
+    rng = np.random.default_rng(semente)
+    residuos = ajuste["residuos"]
+    if len(residuos) == 0:
+        residuos = np.zeros(1)
+    choques = rng.choice(residuos, size=(n_simulacoes, periodos), replace=True)
+
+    alfa, beta, phi = ajuste["alfa"], ajuste["beta"], ajuste["phi"]
+    nivel = np.full(n_simulacoes, ajuste["nivel"])
+    tendencia = np.full(n_simulacoes, ajuste["tendencia"])
+    caminhos = np.empty((n_simulacoes, periodos))
+
+    for h in range(periodos):
+        previsto = nivel + phi * tendencia
+        caminhos[:, h] = previsto + choques[:, h]
+        nivel = previsto + alfa * choques[:, h]
+        tendencia = phi * tendencia + alfa * beta * choques[:, h]
+
+    return caminhos
+
+
+def prever_holt(indicadores, dias=5, freq=None, ticker=None):
+    """
+    Holt com tendência amortecida em NumPy puro, com intervalos por bootstrap dos resíduos.
+    Mesma preparação, pós-processamento e retorno (previsao_df, info) de prever_prophet_logistico.
+    """
+    vazio = pd.DataFrame(columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
+
+    try:
+        df_serie, multiplicador, freq_final, info = preparar_serie_previsao(indicadores, freq, ticker)
+        if df_serie is None:
+            return vazio, info
+
+        y = df_serie['y'].to_numpy(dtype=float)
+        ajuste = ajustar_holt_amortecido(y)
+        total_periodos = dias * multiplicador
+
+        # Futuro: ponto central determinístico (soma amortecida) + quantis das simulações
+        pesos = np.cumsum(ajuste["phi"] ** np.arange(1, total_periodos + 1))
+        central = ajuste["nivel"] + pesos * ajuste["tendencia"]
+        caminhos = simular_holt(ajuste, total_periodos)
+        cauda = (1 - NIVEL_CONFIANCA) / 2
+        inferior, superior = np.quantile(caminhos, [cauda, 1 - cauda], axis=0)
+
+        # Só o horizonte (horários de negociação do ativo), como o predict do Prophet
+        datas_futuras = proximos_horarios(df_serie['ds'].iloc[-1], total_periodos, freq_final, ticker)
+        previsoes = pd.DataFrame({
+            'ds': datas_futuras,
+            'yhat': central,
+            'yhat_lower': np.minimum(inferior, central),
+            'yhat_upper': np.maximum(superior, central),
+        })
+
+        if previsoes.shape[0] < 2:
+            info["erro_prophet"] = "Previsão insuficiente."
+            return vazio, info
+
+        return pos_processar_previsao(previsoes, indicadores, info), info
+
+    except Exception as e:
+        return vazio, {"erro_prophet": f"Erro Holt: {str(e)}"}
+
+
+# Todos os motores recebem (indicadores, dias, freq, ticker) e devolvem (previsao_df, info)
+MOTORES = {
+    "prophet": prever_prophet_logistico,
+    "holt": prever_holt,
+}
+
+
+def selecionar_motor(freq=None, orcamento_ms=None):
+    """
+    Motor configurado para o intervalo (MOTOR_PREVISAO_POR_INTERVALO, padrão Prophet).
+    Com orcamento_ms, troca para o motor mais rápido se o escolhido não couber no orçamento.
+    """
+    chave = APELIDOS_FREQ.get(str(freq).lower(), str(freq).lower()) if freq else None
+    motor = MOTOR_PREVISAO_POR_INTERVALO.get(chave, "prophet")
+
+    if orcamento_ms is not None and LATENCIA_ESTIMADA_MS.get(motor, 0) > orcamento_ms:
+        motor = min(LATENCIA_ESTIMADA_MS, key=LATENCIA_ESTIMADA_MS.get)
+    return motor
+
+
+def prever_com_motor(indicadores, dias=5, freq=None, ticker=None, motor=None, orcamento_ms=None):
+    """
+    Executa a previsão com o motor pedido (ou o selecionado para o intervalo/orçamento).
+    Retorna (previsao_df, info); info["motor_previsao"] indica qual motor respondeu.
+    """
+    motor = motor or selecionar_motor(freq, orcamento_ms)
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de previsão desconhecido: {motor}")
+
+    inicio = time.monotonic()
+    previsoes, info = MOTORES[motor](indicadores, dias=dias, freq=freq, ticker=ticker)
+    info["motor_previsao"] = motor
+    uso_logger.info(f"🔮 Previsão {motor} para {ticker} ({freq or 'auto'}) em {(time.monotonic() - inicio) * 1000:.0f} ms")
+    return previsoes, info
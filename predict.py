@@ -1,60 +1,101 @@
 import numpy as np
 import os
-from tensorflow.keras.models import load_model
 import yfinance as yf
 from sklearn.preprocessing import MinMaxScaler
 from db import salvar_previsao
+from utils.inferencia_lite import carregar_modelo_inferencia, inferir
 import pandas as pd
 
 def calcular_sma(dados, janela=20):
     """Calcula a média móvel simples (SMA)."""
     return pd.Series(dados.flatten()).rolling(window=janela).mean().iloc[-1]
 
-def prever_proximo_fechamento(ticker, janela=60, period='1y', ajustar_com_sma=True, peso_sma=0.3):
+def caminho_modelo_compartilhado(ticker):
+    """Modelo LSTM compartilhado: um para cripto e outro para ações."""
+    return "models/modelo_lstm_criptos.h5" if "-USD" in ticker else "models/modelo_lstm.h5"
+
+def _baixar_fechamentos(tickers, period):
     """
-    Previsão do próximo preço com LSTM, ajustado por SMA20 com peso opcional.
+    Fechamentos de vários tickers em um único download ({ticker: array (n, 1)}).
     """
-    try:
-        is_cripto = "-USD" in ticker
-        modelo_path = f"models/modelo_lstm{'_cripto' if is_cripto else ''}.h5"
-
-        if not os.path.exists(modelo_path):
-            print(f"❌ Modelo não encontrado: {modelo_path}")
-            return None
-
-        modelo = load_model(modelo_path)
-
-        dados_brutos = yf.download(ticker, period=period, progress=False)['Close'].dropna().values.reshape(-1, 1)
-
-        if len(dados_brutos) < janela:
-            print(f"⚠️ Dados insuficientes para {ticker} ({len(dados_brutos)} pontos).")
-            return None
-
-        scaler = MinMaxScaler()
-        dados_norm = scaler.fit_transform(dados_brutos)
-        dados_recentes = np.reshape(dados_norm[-janela:], (1, janela, 1))
-
-        previsao_norm = modelo.predict(dados_recentes)
-        previsao_norm = np.clip(previsao_norm, a_min=0, a_max=None)
-
-        previsao = scaler.inverse_transform(previsao_norm)[0][0]
+    fechamentos = yf.download(list(tickers), period=period, progress=False)['Close']
+    if isinstance(fechamentos, pd.Series):
+        fechamentos = fechamentos.to_frame(name=tickers[0])
+    return {
+        ticker: fechamentos[ticker].dropna().values.reshape(-1, 1)
+        for ticker in tickers if ticker in fechamentos.columns
+    }
+
+def _ajustar_com_sma(previsao, dados_brutos, peso_sma):
+    sma20 = calcular_sma(dados_brutos, janela=20)
+    if np.isnan(sma20):
+        print("⚠️ SMA20 resultou em NaN, ajuste não realizado.")
+        return previsao
+    previsao_ajustada = previsao * (1 - peso_sma) + sma20 * peso_sma
+    print(f"🔄 Previsão ajustada pela SMA20: {previsao:.2f} → {previsao_ajustada:.2f}")
+    return previsao_ajustada
 
-        # Prints adicionais para debug visual
-        print(f"[DEBUG] Valor normalizado previsto: {previsao_norm[0][0]}")
-        print(f"[DEBUG] Valor invertido (original): {previsao:.2f}")
+def prever_lote(tickers, janela=60, period='1y', ajustar_com_sma=True, peso_sma=0.3):
+    """
+    Previsão do próximo fechamento para vários tickers de uma vez.
+    As janelas normalizadas dos tickers que usam o mesmo modelo são empilhadas em um único
+    tensor (n_tickers, janela, 1) e avaliadas com uma só chamada ao modelo.
+    Retorna {ticker: previsão ou None}.
+    """
+    resultados = {ticker: None for ticker in tickers}
 
-        if ajustar_com_sma:
-            sma20 = calcular_sma(dados_brutos, janela=20)
-            if not np.isnan(sma20):
-                previsao_ajustada = previsao * (1 - peso_sma) + sma20 * peso_sma
-                print(f"[DEBUG] SMA20: {sma20:.2f}")
-                print(f"🔄 Previsão ajustada pela SMA20: {previsao:.2f} → {previsao_ajustada:.2f}")
-                previsao = previsao_ajustada
-            else:
-                print("⚠️ SMA20 resultou em NaN, ajuste não realizado.")
+    grupos = {}
+    for ticker in tickers:
+        grupos.setdefault(caminho_modelo_compartilhado(ticker), []).append(ticker)
 
-        return previsao
+    for modelo_path, grupo in grupos.items():
+        if not os.path.exists(modelo_path):
+            print(f"❌ Modelo não encontrado: {modelo_path}")
+            continue
+
+        try:
+            modelo = carregar_modelo_inferencia(modelo_path)  # TFLite quando exportado; uma carga por processo
+            fechamentos = _baixar_fechamentos(grupo, period)
+        except Exception as e:
+            print(f"🚨 Erro ao preparar lote {modelo_path}: {str(e)}")
+            continue
+
+        validos, janelas, scalers = [], [], []
+        for ticker in grupo:
+            dados_brutos = fechamentos.get(ticker)
+            if dados_brutos is None or len(dados_brutos) < janela:
+                print(f"⚠️ Dados insuficientes para {ticker} ({0 if dados_brutos is None else len(dados_brutos)} pontos).")
+                continue
+            scaler = MinMaxScaler()
+            janelas.append(scaler.fit_transform(dados_brutos)[-janela:])
+            scalers.append(scaler)
+            validos.append(ticker)
+
+        if not validos:
+            continue
+
+        try:
+            entrada = np.stack(janelas).astype(np.float32)  # (n_tickers, janela, 1)
+            previsoes_norm = np.clip(inferir(modelo, entrada), a_min=0, a_max=None)
+        except Exception as e:
+            print(f"🚨 Erro na inferência em lote {modelo_path}: {str(e)}")
+            continue
+
+        for ticker, scaler, previsao_norm in zip(validos, scalers, previsoes_norm):
+            previsao = scaler.inverse_transform(previsao_norm[:1].reshape(1, -1))[0][0]
+            if ajustar_com_sma:
+                previsao = _ajustar_com_sma(previsao, fechamentos[ticker], peso_sma)
+            resultados[ticker] = previsao
+
+    return resultados
 
+def prever_proximo_fechamento(ticker, janela=60, period='1y', ajustar_com_sma=True, peso_sma=0.3):
+    """
+    Previsão do próximo preço com LSTM, ajustado por SMA20 com peso opcional.
+    """
+    try:
+        return prever_lote([ticker], janela=janela, period=period,
+                           ajustar_com_sma=ajustar_com_sma, peso_sma=peso_sma)[ticker]
     except Exception as e:
         print(f"🚨 Erro ao prever {ticker}: {str(e)}")
         return None
@@ -67,10 +108,12 @@ if __name__ == "__main__":
         "SOL-USD", "PENDLE-USD"
     ]
 
-    for ticker in tickers:
-        ticker_yf = ticker if "-USD" in ticker else f"{ticker}.SA"
+    tickers_yf = {ticker: ticker if "-USD" in ticker else f"{ticker}.SA" for ticker in tickers}
+    previsoes = prever_lote(list(tickers_yf.values()), janela=20, period="6mo", ajustar_com_sma=True)
+
+    for ticker, ticker_yf in tickers_yf.items():
         nome_amigavel = ticker.replace("-USD", "").replace(".SA", "")
-        valor = prever_proximo_fechamento(ticker_yf, janela=20, period="6mo", ajustar_com_sma=True)
+        valor = previsoes.get(ticker_yf)
 
         if valor:
             moeda = "US$" if "-USD" in ticker else "R$"
@@ -0,0 +1,80 @@
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import ATIVOS_MONITORADOS, FRACAO_NUCLEOS_BATCH_NO_SERVIDOR
+from db import criar_tabela, salvar_execucao_batch
+from logger import uso_logger, erro_logger
+
+INTERVALO_BATCH = "1day"  # mesmo intervalo padrão de obter_dados usado por /analise e /relatorio
+DIAS_BATCH = 5
+
+
+def _prever_ticker(ticker, dias=DIAS_BATCH, intervalo=INTERVALO_BATCH):
+    """
+    Executado em um processo do pool: baixa os candles, calcula indicadores e roda o motor de previsão do intervalo.
+    Nunca levanta exceção; a falha volta no retorno para ser registrada pelo processo principal.
+    """
+    from utils.financeiro import obter_dados
+    from utils.indicadores import calcular_indicadores
+    from motores_previsao import prever_com_motor
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    inicio = time.monotonic()
+    try:
+        dados = obter_dados(ticker, intervalo=intervalo)
+        indicadores = calcular_indicadores(dados)
+        if indicadores.empty or "Close" not in indicadores.columns:
+            raise ValueError("Indicadores insuficientes ou coluna 'Close' ausente.")
+
+        previsao, info = prever_com_motor(indicadores, dias=dias, freq=intervalo, ticker=ticker)
+        if previsao.empty:
+            raise RuntimeError(info.get("erro_prophet", "Previsão vazia."))
+        return ticker, previsao, info, time.monotonic() - inicio, None
+    except Exception as e:
+        return ticker, None, None, time.monotonic() - inicio, str(e)
+
+
+def executar_batch(tickers=None, dias=DIAS_BATCH, intervalo=INTERVALO_BATCH, max_workers=None):
+    """
+    Gera as previsões de todo o universo em paralelo (um processo por núcleo) e grava no
+    banco de previsões. Retorna {ticker: {"status", "duracao_s", "erro"}}.
+    """
+    tickers = list(tickers or ATIVOS_MONITORADOS)
+    criar_tabela()
+
+    inicio = time.monotonic()
+    resumo = {}
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        futuros = [pool.submit(_prever_ticker, ticker, dias, intervalo) for ticker in tickers]
+        for futuro in as_completed(futuros):
+            ticker, previsao, info, duracao, erro = futuro.result()
+            salvar_execucao_batch(ticker, intervalo, dias, duracao, previsao, info, erro)
+            resumo[ticker] = {"status": "ok" if erro is None else "falha", "duracao_s": round(duracao, 2), "erro": erro}
+
+            if erro is None:
+                uso_logger.info(f"[Batch] ✅ {ticker}: previsão gerada em {duracao:.1f}s")
+            else:
+                erro_logger.error(f"[Batch] ❌ {ticker}: {erro} ({duracao:.1f}s)")
+
+    falhas = sum(1 for r in resumo.values() if r["status"] != "ok")
+    uso_logger.info(
+        f"[Batch] Concluído em {time.monotonic() - inicio:.1f}s: "
+        f"{len(resumo) - falhas} ok, {falhas} falha(s) de {len(tickers)} ativos"
+    )
+    return resumo
+
+
+def executar_batch_no_servidor(tickers=None, dias=DIAS_BATCH, intervalo=INTERVALO_BATCH):
+    """
+    Batch chamado pelo scheduler do servidor web: mesmo trabalho com o pool limitado a
+    FRACAO_NUCLEOS_BATCH_NO_SERVIDOR dos núcleos, deixando o resto para as requisições.
+    """
+    workers = max(1, int((os.cpu_count() or 1) * FRACAO_NUCLEOS_BATCH_NO_SERVIDOR))
+    return executar_batch(tickers, dias=dias, intervalo=intervalo, max_workers=workers)
+
+
+if __name__ == "__main__":
+    for ticker, resultado in executar_batch().items():
+        print(f"{ticker}: {resultado}")
@@ -1,37 +1,220 @@
 import os
 import csv
+import copy
+import time
 import logging
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from prophet import Prophet
-from prophet.diagnostics import cross_validation, performance_metrics
 from datetime import datetime
+from scipy.stats import zscore
 from utils.dados_utils import preparar_dados_prophet
 from utils.previsao_utils import preencher_volume_futuro
-from utils.forecast_evaluation import residuals_diagnostics, cv_summary, backtest_evaluate
+from utils.diagnosticos_prophet import enfileirar_diagnostico
 from utils.indicadores import calcular_indicadores
-from sklearn.metrics import mean_absolute_error
+from utils.cache_prophet import cache_modelos, chave_modelo, fingerprint_serie
+from utils.calendario import horarios_negociacao, proximos_horarios
+from config import AMOSTRAS_INCERTEZA_PROPHET, JANELA_TREINO_PROPHET, MAX_PONTOS_TREINO_PROPHET
+from sklearn.metrics import mean_squared_error, mean_absolute_error, mean_absolute_percentage_error
 
-def ajustar_changepoint_dinamico(df, escalas=[0.01, 0.05, 0.1, 0.15]):
-    melhores_metricas = []
-    for esc in escalas:
-        try:
-            m = Prophet(
-                changepoint_prior_scale=esc,
-                seasonality_mode='multiplicative'
-            )
-            df['cap'] = df['y'].max() * 1.1
-            df['floor'] = df['y'].min() * 0.9
-            m.fit(df)
-            previsto = m.predict(df)
-            erro = mean_absolute_error(df['y'], previsto['yhat'])
-            melhores_metricas.append((esc, erro))
-        except Exception as e:
-            logging.warning(f"Erro ao testar escala {esc}: {e}")
-    if not melhores_metricas:
+# Busca de changepoint_prior_scale
+ESCALAS_CHANGEPOINT = [0.01, 0.05, 0.1, 0.15]
+ESCALA_PADRAO = 0.05
+FRACAO_HOLDOUT = 0.2
+ORCAMENTO_BUSCA_SEGUNDOS = 20
+
+def _abrir_pool_busca(n_escalas):
+    """
+    Pool de processos próprio de cada busca: ao estourar o orçamento os workers são encerrados
+    (_encerrar_pool_busca), então ajustes abandonados não ocupam o pool das próximas requisições.
+    """
+    return ProcessPoolExecutor(max_workers=max(1, min(n_escalas, os.cpu_count() or 1)))
+
+def _encerrar_pool_busca(pool, abandonar):
+    """Fecha o pool; com abandonar=True cancela o que não começou e mata os ajustes em andamento."""
+    if not abandonar:
+        pool.shutdown(wait=True)
+        return
+    processos = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for processo in processos:
+        if processo.is_alive():
+            processo.terminate()
+
+def criar_modelo_prophet(escala, freq='D', usar_volume=True, growth='linear', interval_width=0.80):
+    """
+    Modelo Prophet padrão (mesma configuração na busca e no ajuste final).
+    growth='logistic' exige as colunas cap/floor na série e no futuro.
+    """
+    sazonal_diaria = freq not in ["15min", "30min", "1h"]
+    modelo = Prophet(
+        growth=growth,
+        changepoint_prior_scale=escala,
+        seasonality_mode='multiplicative',
+        daily_seasonality=sazonal_diaria,
+        weekly_seasonality=True,
+        yearly_seasonality=False,
+        interval_width=interval_width
+    )
+    if usar_volume:
+        modelo.add_regressor('Volume')
+    return modelo
+
+def dividir_holdout(df, frac_holdout=FRACAO_HOLDOUT):
+    """
+    Separa os últimos frac_holdout% dos pontos (ordem cronológica) para validação.
+    """
+    corte = int(len(df) * (1 - frac_holdout))
+    return df.iloc[:corte].copy(), df.iloc[corte:].copy()
+
+def _avaliar_escala(escala, treino, holdout, freq, usar_volume, growth='linear'):
+    """
+    Executado nos processos do pool: ajusta no treino e mede o erro no holdout compartilhado.
+    """
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    modelo = criar_modelo_prophet(escala, freq=freq, usar_volume=usar_volume, growth=growth)
+    modelo.fit(treino)
+    modelo.uncertainty_samples = 0  # Só o yhat entra nas métricas
+    previsto = modelo.predict(holdout.drop(columns=['y']))
+    mse = mean_squared_error(holdout['y'], previsto['yhat'])
+    metricas = {
+        "MSE": mse,
+        "RMSE": mse ** 0.5,
+        "MAE": mean_absolute_error(holdout['y'], previsto['yhat']),
+        "MAPE": mean_absolute_percentage_error(holdout['y'], previsto['yhat'])
+    }
+    return escala, metricas
+
+def buscar_changepoint_paralelo(df, escalas=None, freq='D', frac_holdout=FRACAO_HOLDOUT,
+                                orcamento_segundos=ORCAMENTO_BUSCA_SEGUNDOS, growth='linear'):
+    """
+    Avalia as escalas em paralelo, todas no mesmo holdout cronológico.
+    Se o orçamento de tempo estourar, devolve a melhor escala encontrada até ali.
+    Retorna (melhor_escala, metricas_holdout_da_melhor).
+    """
+    escalas = list(escalas or ESCALAS_CHANGEPOINT)
+    treino, holdout = dividir_holdout(df, frac_holdout)
+    usar_volume = 'Volume' in df.columns
+
+    pool = _abrir_pool_busca(len(escalas))
+    inicio = time.monotonic()
+    pendentes = {
+        pool.submit(_avaliar_escala, esc, treino, holdout, freq, usar_volume, growth): esc
+        for esc in escalas
+    }
+    resultados = {}
+
+    while pendentes:
+        restante = None
+        if orcamento_segundos is not None:
+            restante = orcamento_segundos - (time.monotonic() - inicio)
+            if restante <= 0:
+                break
+        concluidos, _ = wait(pendentes, timeout=restante, return_when=FIRST_COMPLETED)
+        if not concluidos:
+            break
+        for futuro in concluidos:
+            esc = pendentes.pop(futuro)
+            try:
+                _, metricas = futuro.result()
+                resultados[esc] = metricas
+            except Exception as e:
+                logging.warning(f"Erro ao testar escala {esc}: {e}")
+
+    _encerrar_pool_busca(pool, abandonar=bool(pendentes))
+    if pendentes:
+        logging.warning(
+            f"⏱️ Orçamento de {orcamento_segundos}s esgotado na busca de changepoint; "
+            f"{len(pendentes)} escala(s) descartada(s)."
+        )
+        if not resultados:
+            logging.warning(f"⚠️ Nenhuma escala concluída a tempo. Usando padrão {ESCALA_PADRAO}.")
+            return ESCALA_PADRAO, None
+
+    if not resultados:
         raise RuntimeError("Nenhuma escala válida encontrada para o modelo.")
-    melhor_escala = min(melhores_metricas, key=lambda x: x[1])[0]
+
+    melhor_escala = min(resultados, key=lambda esc: resultados[esc]["MAE"])
+    logging.info(f"Busca de changepoint em {time.monotonic() - inicio:.1f}s: {resultados}")
+    return melhor_escala, resultados[melhor_escala]
+
+def ajustar_changepoint_dinamico(df, escalas=ESCALAS_CHANGEPOINT, freq='D'):
+    melhor_escala, _ = buscar_changepoint_paralelo(df, escalas=escalas, freq=freq)
     return melhor_escala
 
+# Warm start: limite de piora aceitável no sigma_obs antes de refazer do zero
+FATOR_SIGMA_WARM_START = 2.0
+
+def parametros_warm_start(modelo):
+    """
+    Extrai k, m, sigma_obs, delta e beta de um ajuste MAP para servir de init ao próximo.
+    """
+    init = {nome: float(modelo.params[nome][0][0]) for nome in ['k', 'm', 'sigma_obs']}
+    for nome in ['delta', 'beta']:
+        init[nome] = np.asarray(modelo.params[nome][0], dtype=float)
+    return init
+
+def _warm_start_suspeito(modelo, anterior):
+    valores = np.concatenate([
+        np.ravel(np.asarray(modelo.params[nome], dtype=float))
+        for nome in ['k', 'm', 'sigma_obs', 'delta', 'beta']
+    ])
+    if not np.all(np.isfinite(valores)):
+        return True
+    sigma = float(modelo.params['sigma_obs'][0][0])
+    sigma_anterior = float(anterior.params['sigma_obs'][0][0])
+    return sigma > FATOR_SIGMA_WARM_START * sigma_anterior
+
+def ajustar_com_warm_start(criar_modelo, df, anterior=None):
+    """
+    Ajusta um modelo novo (criado por `criar_modelo`) partindo dos parâmetros do
+    ajuste anterior. Se o warm start falhar ou não parecer ter convergido, refaz do zero.
+    """
+    if anterior is not None and getattr(anterior, 'params', None) and anterior.mcmc_samples == 0:
+        inicio = time.monotonic()
+        try:
+            modelo = criar_modelo()
+            modelo.fit(df, init=parametros_warm_start(anterior))
+            if not _warm_start_suspeito(modelo, anterior):
+                logging.info(f"🔥 Prophet ajustado com warm start em {time.monotonic() - inicio:.2f}s")
+                return modelo
+            logging.warning("⚠️ Warm start Prophet com convergência suspeita. Refazendo do zero.")
+        except Exception as e:
+            logging.warning(f"⚠️ Warm start Prophet falhou ({e}). Refazendo do zero.")
+
+    inicio = time.monotonic()
+    modelo = criar_modelo()
+    modelo.fit(df)
+    logging.info(f"🧊 Prophet ajustado do zero em {time.monotonic() - inicio:.2f}s")
+    return modelo
+
+def prever_horizonte(modelo, periodos, freq, amostras_incerteza=None, incluir_historico=False, colunas=None,
+                     datas_futuras=None):
+    """
+    Predict só dos `periodos` futuros (sem reprocessar o histórico).
+    amostras_incerteza substitui o uncertainty_samples do modelo nesta chamada; com 0 a simulação
+    de intervalos é pulada e yhat_lower/yhat_upper repetem o yhat.
+    datas_futuras (ex.: horários de pregão do calendário) substitui a grade regular do Prophet.
+    """
+    if datas_futuras is not None and not incluir_historico:
+        futuro = pd.DataFrame({'ds': pd.DatetimeIndex(datas_futuras)[:periodos]})
+    else:
+        futuro = modelo.make_future_dataframe(periods=periodos, freq=freq, include_history=incluir_historico)
+    for coluna, valor in (colunas or {}).items():
+        futuro[coluna] = valor(futuro) if callable(valor) else valor
+
+    if amostras_incerteza is not None and amostras_incerteza != modelo.uncertainty_samples:
+        # Cópia rasa: o modelo em cache é compartilhado entre threads
+        modelo = copy.copy(modelo)
+        modelo.uncertainty_samples = amostras_incerteza
+
+    previsoes = modelo.predict(futuro)
+    for coluna in ('yhat_lower', 'yhat_upper'):
+        if coluna not in previsoes.columns:
+            previsoes[coluna] = previsoes['yhat']
+    return previsoes, futuro
+
 def ajustar_previsao_com_bollinger(previsao_df, indicadores_df, margem_pct=0.5):
     """
     Ajusta a previsão Prophet para se manter dentro de uma margem técnica segura:
@@ -61,7 +244,215 @@ def ajustar_previsao_com_bollinger(previsao_df, indicadores_df, margem_pct=0.5):
         logging.warning(f"⚠️ Erro no ajuste com Bollinger: {e}")
         return previsao_df
 
-def executar_pipeline_completo(ticker: str, dados: pd.DataFrame, dias: int = 5, changepoint_scale: float = 0.05, freq: str = 'D') -> pd.DataFrame:
+FREQ_MULTIPLICADORES = {
+    '15min': (4, '15min'),   # Próxima 1 hora (4 períodos)
+    '30min': (4, '30min'),   # Próximas 2 horas
+    '45min': (4, '45min'),   # Próximas 3 horas
+    '1h': (6, '1H'),         # Próximas 6 horas
+    '2h': (6, '2H'),         # Próximas 12 horas
+    '6h': (4, '6H'),         # Próximas 24 horas
+    '1d': (7, '1D'),         # Próximos 7 dias
+    '5d': (4, '5D'),         # Próximos 20 dias
+    '1m': (3, '30D')         # Próximos 90 dias (3 meses)
+}
+
+# Apelidos devolvidos por pd.infer_freq / usados pelas APIs de dados
+APELIDOS_FREQ = {'15t': '15min', '30t': '30min', '45t': '45min', 'h': '1h', '1day': '1d', 'd': '1d', 'b': '1d'}
+
+def resolver_frequencia(ds, freq=None):
+    """
+    Retorna (chave, multiplicador, freq_final) a partir da frequência pedida ou detectada em `ds`.
+    """
+    for candidata in (freq, pd.infer_freq(pd.Series(pd.to_datetime(ds)).sort_values())):
+        if candidata:
+            chave = APELIDOS_FREQ.get(candidata.lower(), candidata.lower())
+            if chave in FREQ_MULTIPLICADORES:
+                return (chave, *FREQ_MULTIPLICADORES[chave])
+    return ('1h', 6, '1H')  # Default mais curto e coerente
+
+def limitar_janela_treino(df, chave_freq):
+    """
+    Mantém só os últimos pontos da janela de treino da frequência (JANELA_TREINO_PROPHET),
+    nunca acima de MAX_PONTOS_TREINO_PROPHET, para o tempo de ajuste não depender do histórico disponível.
+    """
+    janela = min(JANELA_TREINO_PROPHET.get(chave_freq, MAX_PONTOS_TREINO_PROPHET), MAX_PONTOS_TREINO_PROPHET)
+    return df.tail(janela).reset_index(drop=True)
+
+def preparar_serie_previsao(indicadores, freq=None, ticker=None, limitar_janela=True, com_volume=False):
+    """
+    Série (ds, y) contínua no calendário do ativo e sem outliers grosseiros, comum a todos os motores de previsão.
+    Com limitar_janela, fica só a janela de treino configurada para a frequência.
+    com_volume mantém a coluna Volume (regressor do Prophet) quando ela vem completa nos dados.
+    Retorna (df_serie, multiplicador, freq_final, info); df_serie é None se não houver dados.
+    """
+    info = {}
+    df_prophet = indicadores.reset_index()
+
+    # ✅ Ajuste robusto de data/hora
+    if 'Datetime' in df_prophet.columns:
+        df_prophet.rename(columns={'Datetime': 'ds'}, inplace=True)
+    elif 'Date' in df_prophet.columns:
+        df_prophet.rename(columns={'Date': 'ds'}, inplace=True)
+    elif 'index' in df_prophet.columns:
+        df_prophet.rename(columns={'index': 'ds'}, inplace=True)
+    else:
+        df_prophet['ds'] = indicadores.index
+
+    if 'Close' not in df_prophet.columns:
+        info["erro_prophet"] = "Coluna 'Close' ausente nos dados."
+        return None, None, None, info
+
+    colunas = ['ds', 'Close'] + (['Volume'] if com_volume and 'Volume' in df_prophet.columns else [])
+    df_prophet = df_prophet[colunas].dropna(subset=['Close'])
+    df_prophet.rename(columns={'Close': 'y'}, inplace=True)
+    df_prophet['ds'] = pd.to_datetime(df_prophet['ds'])
+
+    # ✅ Seleção robusta da frequência
+    chave_freq, multiplicador, freq_final = resolver_frequencia(df_prophet['ds'], freq)
+
+    # ✅ Preencher série contínua só nos horários de negociação (B3) ou 24/7 (cripto)
+    serie = df_prophet.set_index('ds').sort_index()
+    grade = horarios_negociacao(serie.index.min(), serie.index.max(), freq_final, ticker)
+    df_prophet = serie.reindex(grade, method='pad').fillna(method='ffill').rename_axis('ds').reset_index()
+
+    # ✅ Janela de treino limitada (latência previsível)
+    if limitar_janela:
+        df_prophet = limitar_janela_treino(df_prophet, chave_freq)
+
+    # ✅ Volume zerado/ausente vira NaN nos indicadores: completa ou desiste do regressor
+    if 'Volume' in df_prophet.columns:
+        df_prophet['Volume'] = pd.to_numeric(df_prophet['Volume'], errors='coerce').ffill().bfill()
+        if df_prophet['Volume'].isna().any():
+            df_prophet = df_prophet.drop(columns=['Volume'])
+
+    # ✅ Remoção leve de outliers
+    z = np.abs(zscore(df_prophet['y']))
+    df_temp = df_prophet[z < 3].copy()
+    if df_temp.shape[0] >= 2:
+        df_prophet = df_temp
+    else:
+        info["aviso_prophet"] = "Dados com outliers. Usando série completa."
+
+    if df_prophet.shape[0] < 2:
+        info["erro_prophet"] = "Dados insuficientes após filtragem."
+        return None, None, None, info
+
+    return df_prophet, multiplicador, freq_final, info
+
+def limites_bollinger(indicadores):
+    """
+    Retorna (sma20, bollinger_inf, bollinger_sup) do último candle.
+    """
+    sma = indicadores['Close'].rolling(20).mean().dropna()
+    std = indicadores['Close'].rolling(20).std().dropna()
+    sma20 = float(sma.iloc[-1]) if not sma.empty else indicadores['Close'].mean()
+    std20 = float(std.iloc[-1]) if not std.empty else indicadores['Close'].std()
+    return sma20, max(sma20 - 2 * std20, 0), sma20 + 2 * std20
+
+def pos_processar_previsao(previsoes, indicadores, info):
+    """
+    Suavização técnica (SMA20 + Bollinger) e registro de limites/viés em `info`.
+    """
+    sma20, bollinger_inf, bollinger_sup = limites_bollinger(indicadores)
+
+    # ✅ Suavização técnica
+    previsoes['yhat'] = previsoes['yhat'] * 0.8 + sma20 * 0.2
+    previsoes['yhat'] = previsoes['yhat'].clip(lower=bollinger_inf, upper=bollinger_sup)
+
+    info['limite_minimo'] = round(bollinger_inf, 2)
+    info['limite_maximo'] = round(bollinger_sup, 2)
+    delta = previsoes['yhat'].iloc[-1] - previsoes['yhat'].iloc[0]
+    info['viés_tendência'] = (
+        "alta" if delta > sma20 * 0.01 else
+        "baixa" if delta < -sma20 * 0.01 else
+        "neutra"
+    )
+    info['ajuste_prophet'] = True
+
+    return previsoes[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].reset_index(drop=True)
+
+def prever_prophet_logistico(indicadores, dias=5, freq=None, ticker=None, amostras_incerteza=AMOSTRAS_INCERTEZA_PROPHET):
+    """
+    Pipeline Prophet das rotas, do batch e do score adaptativo (motor "prophet" de motores_previsao):
+    crescimento logístico (cap na Bollinger superior, floor 0), Volume como regressor quando vier nos dados,
+    changepoint_prior_scale escolhido pela busca paralela no holdout, warm start a partir do último
+    ajuste e diagnósticos (CV e resíduos) enfileirados fora da requisição.
+    O modelo ajustado fica em cache enquanto não chegar candle novo; o predict cobre só o horizonte.
+    Não depende de Flask: retorna (previsao_df, info) e quem chama decide o que fazer com info.
+    """
+    vazio = pd.DataFrame(columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
+
+    try:
+        df_prophet, multiplicador, freq_final, info = preparar_serie_previsao(indicadores, freq, ticker, com_volume=True)
+        if df_prophet is None:
+            return vazio, info
+        chave_freq = resolver_frequencia(df_prophet['ds'], freq)[0]
+        usar_volume = 'Volume' in df_prophet.columns
+
+        # ✅ Bollinger Bands
+        _, _, bollinger_sup = limites_bollinger(indicadores)
+        df_prophet['cap'] = bollinger_sup
+        df_prophet['floor'] = 0
+
+        # ✅ Modelo Prophet (reaproveitado do cache se a série não mudou)
+        hiperparametros = {
+            "growth": "logistic",
+            "escalas": ESCALAS_CHANGEPOINT,
+            "frac_holdout": FRACAO_HOLDOUT,
+            "seasonality_mode": "multiplicative",
+            "interval_width": 0.90,
+            "volume": usar_volume
+        }
+        chave = chave_modelo(ticker, freq_final, hiperparametros, fingerprint_serie(df_prophet))
+        em_cache = cache_modelos.obter(chave)
+        if em_cache is not None:
+            modelo, meta = em_cache
+            escala, metricas_holdout = meta.get("escala"), meta.get("metricas")
+        else:
+            # Ajuste dinâmico do changepoint_prior_scale (holdout compartilhado, em paralelo)
+            escala, metricas_holdout = buscar_changepoint_paralelo(df_prophet, freq=chave_freq, growth="logistic")
+            anterior = cache_modelos.obter_ultimo(chave)
+            modelo = ajustar_com_warm_start(
+                lambda: criar_modelo_prophet(escala, freq=chave_freq, usar_volume=usar_volume,
+                                             growth="logistic", interval_width=0.90),
+                df_prophet,
+                anterior[0] if anterior else None
+            )
+            cache_modelos.salvar(chave, modelo, {"escala": escala, "metricas": metricas_holdout})
+
+        colunas = {'cap': bollinger_sup, 'floor': 0}
+        if usar_volume:
+            colunas['Volume'] = lambda f: preencher_volume_futuro(df_prophet, f, dias=len(f))['Volume']
+        previsoes, _ = prever_horizonte(
+            modelo,
+            dias * multiplicador,
+            freq_final,
+            amostras_incerteza=amostras_incerteza,
+            colunas=colunas,
+            datas_futuras=proximos_horarios(df_prophet['ds'].iloc[-1], dias * multiplicador, freq_final, ticker)
+        )
+
+        if previsoes.shape[0] < 2:
+            info["erro_prophet"] = "Previsão insuficiente."
+            return vazio, info
+
+        resultado = pos_processar_previsao(previsoes, indicadores, info)
+
+        # 🧪 Diagnósticos só para modelo recém-ajustado, fora do caminho da requisição
+        if em_cache is None:
+            enfileirar_diagnostico(
+                ticker, chave_freq, modelo, df_prophet, escala,
+                metricas_holdout=metricas_holdout,
+                previsao_inicio=resultado['ds'].min(),
+                previsao_fim=resultado['ds'].max()
+            )
+        return resultado, info
+
+    except Exception as e:
+        return vazio, {"erro_prophet": f"Erro Prophet: {str(e)}"}
+
+def executar_pipeline_completo(ticker: str, dados: pd.DataFrame, dias: int = 5, changepoint_scale: float = 0.05, freq: str = 'D',
+                               amostras_incerteza: int = AMOSTRAS_INCERTEZA_PROPHET) -> pd.DataFrame:
     """
     Executa a pipeline Prophet com validação, ajuste técnico com Bollinger, regressão de volume, e salva CSV + métricas.
     """
@@ -73,52 +464,56 @@ def executar_pipeline_completo(ticker: str, dados: pd.DataFrame, dias: int = 5,
         logging.error(f"❌ Erro ao preparar dados para Prophet: {e}")
         raise RuntimeError(f"Dados insuficientes para o ativo {ticker}.")
 
-    # Ajuste dinâmico do changepoint_prior_scale
-    changepoint_scale = ajustar_changepoint_dinamico(df_prophet)
+    df_prophet = limitar_janela_treino(df_prophet, resolver_frequencia(df_prophet['ds'], freq)[0])
 
-    # Define sazonalidades padrão
-    sazonal_diaria = freq not in ["15min", "30min", "1h"]
-    sazonal_semanal = True
-    logging.info(f"Melhor escala selecionada: {changepoint_scale}")
-
-    modelo = Prophet(
-        changepoint_prior_scale=changepoint_scale,
-        seasonality_mode='multiplicative',
-        daily_seasonality=sazonal_diaria,
-        weekly_seasonality=sazonal_semanal,
-        yearly_seasonality=False
-    )
+    # ♻️ Modelo já ajustado para exatamente esta série? Vai direto ao predict.
+    hiperparametros = {
+        "pipeline": "completo",
+        "escalas": ESCALAS_CHANGEPOINT,
+        "frac_holdout": FRACAO_HOLDOUT,
+        "volume": 'Volume' in df_prophet.columns
+    }
+    chave = chave_modelo(ticker, freq, hiperparametros, fingerprint_serie(df_prophet))
+    em_cache = cache_modelos.obter(chave)
+    modelo_novo = em_cache is None
 
-    if 'Volume' in df_prophet.columns:
-        modelo.add_regressor('Volume')
+    if not modelo_novo:
+        modelo, meta = em_cache
+        changepoint_scale = meta.get("escala", changepoint_scale)
+        logging.info(f"♻️ Modelo Prophet em cache para {ticker} ({freq}), escala {changepoint_scale}")
+    else:
+        # Ajuste dinâmico do changepoint_prior_scale (holdout compartilhado, em paralelo)
+        changepoint_scale, metrics_bt = buscar_changepoint_paralelo(df_prophet, freq=freq)
+        logging.info(f"Melhor escala selecionada: {changepoint_scale}")
 
-    modelo.fit(df_prophet)
+        anterior = cache_modelos.obter_ultimo(chave)
+        modelo = ajustar_com_warm_start(
+            lambda: criar_modelo_prophet(
+                changepoint_scale,
+                freq=freq,
+                usar_volume='Volume' in df_prophet.columns
+            ),
+            df_prophet,
+            anterior[0] if anterior else None
+        )
 
-    # Validações
-    try:
-        metrics_bt, _ = backtest_evaluate(df_prophet, changepoint_scale, test_frac=0.2, freq=freq)
+        # Métricas do holdout da busca substituem o backtest (evita mais um ajuste)
         logging.info(f"Backtest metrics: {metrics_bt}")
-    except Exception as e:
-        logging.warning(f"⚠️ Erro ao calcular métricas Prophet: {e}")
-        metrics_bt = {"RMSE": 0, "MAPE": 0}
-
-    try:
-        cv_summary(modelo, initial='60 days', period='15 days', horizon='5 days')
-    except Exception as e:
-        logging.warning(f"⚠️ CV Prophet falhou: {e}")
+        cache_modelos.salvar(chave, modelo, {"escala": changepoint_scale, "metricas": metrics_bt})
 
-    residuals_diagnostics(modelo, df_prophet)
-
-    # Geração futura
-    futuro = modelo.make_future_dataframe(periods=dias, freq=freq)
+    # Geração futura (só o horizonte; o histórico seria descartado pelo tail)
+    previsao, futuro = prever_horizonte(
+        modelo,
+        dias,
+        freq,
+        amostras_incerteza=amostras_incerteza,
+        colunas={'Volume': lambda f: preencher_volume_futuro(df_prophet, f, dias=len(f))['Volume']},
+        datas_futuras=proximos_horarios(df_prophet['ds'].max(), dias, freq, ticker)
+    )
     if futuro.empty or len(futuro) < dias:
         raise RuntimeError("❌ DataFrame futuro inválido.")
-
-    futuro = preencher_volume_futuro(df_prophet, futuro)
     if "Volume" in futuro.columns and futuro["Volume"].isnull().all():
         raise RuntimeError("❌ Volume futuro ausente.")
-
-    previsao = modelo.predict(futuro)
     if previsao.empty or "yhat" not in previsao.columns:
         raise RuntimeError(f"❌ Previsão Prophet malformada para {ticker}.")
 
@@ -145,15 +540,14 @@ def executar_pipeline_completo(ticker: str, dados: pd.DataFrame, dias: int = 5,
     nome_arquivo = f"previsoes_prophet/prophet_{ticker.replace('-', '').replace('/', '')}.csv"
     df_exportar.to_csv(nome_arquivo, index=False)
 
-    # Salve métrica
-    salvar_metrica(
-        ticker,
-        metrics_bt["RMSE"],
-        metrics_bt["MAPE"],
-        changepoint_scale,
-        df_exportar["ds"].min(),
-        df_exportar["ds"].max()
-    )
+    # 🧪 Diagnósticos (backtest, CV, resíduos e métricas) saem do caminho da requisição
+    if modelo_novo:
+        enfileirar_diagnostico(
+            ticker, freq, modelo, df_prophet, changepoint_scale,
+            metricas_holdout=metrics_bt,
+            previsao_inicio=df_exportar["ds"].min(),
+            previsao_fim=df_exportar["ds"].max()
+        )
 
     # ✅ Retorne DataFrame seguro para o main.py (sem desalinhamentos!)
     return df_exportar[["ds", "yhat", "yhat_lower", "yhat_upper"]]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Variante quantizada (int8 ou float16) do TFLite de um CriptoForecaster, com benchmark contra o modelo
+float no mesmo holdout: latência mediana por previsão e MAPE na escala de preço.
+A variante só substitui o artefato servido (<modelo>.tflite) se a perda de MAPE ficar dentro da tolerância.
+
+Uso: python quantizar_lstm.py TICKER [int8|float16]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from config import QUANTIZACAO_LSTM, TOLERANCIA_MAPE_QUANTIZACAO, JANELAS_HOLDOUT_QUANTIZACAO
+from logger import uso_logger
+from utils.inferencia_lite import ModeloLite, caminho_tflite, converter_tflite, inferir
+from utils.janelas_lstm import janelas_deslizantes
+
+REPETICOES_LATENCIA = 50
+JANELAS_CALIBRACAO = 100  # Janelas anteriores ao holdout usadas na calibração int8
+
+
+def caminho_variante(modelo_path, quantizacao):
+    return f"{os.path.splitext(modelo_path)[0]}_{quantizacao}.tflite"
+
+
+def _holdout(forecaster, n_janelas):
+    """
+    Últimas janelas em ordem cronológica (as de validação do treino, quando houve) e,
+    para a calibração, as janelas imediatamente anteriores a elas.
+    """
+    validacao = (forecaster.historico_treino or {}).get("janelas_validacao")
+    X, y = janelas_deslizantes(forecaster.dados_treinamento, forecaster.janela, forecaster.horizonte)
+    n = min(validacao or n_janelas, len(X))
+    calibracao = X[max(0, len(X) - n - JANELAS_CALIBRACAO):len(X) - n]
+    return np.ascontiguousarray(X[-n:]), np.ascontiguousarray(y[-n:]), np.ascontiguousarray(calibracao)
+
+
+def _medir(modelo, X, y, scaler):
+    previsto = inferir(modelo, X)[:, :y.shape[1]]
+    real = scaler.inverse_transform(y.reshape(-1, 1)).flatten()
+    previsto = scaler.inverse_transform(previsto.reshape(-1, 1)).flatten()
+    mape = float(np.mean(np.abs((real - previsto) / real)))
+
+    tempos = []
+    for i in range(REPETICOES_LATENCIA):
+        janela = X[i % len(X)][np.newaxis]
+        inicio = time.perf_counter()
+        inferir(modelo, janela)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {"mape": round(mape, 5), "latencia_ms": round(float(np.median(tempos)), 3)}
+
+
+def avaliar_quantizacao(forecaster, quantizacao="int8", n_janelas=JANELAS_HOLDOUT_QUANTIZACAO):
+    """
+    Converte a variante, grava em <modelo>_<quantizacao>.tflite e compara com o modelo float
+    (Keras de forecaster.modelo) no holdout. Retorna o relatório {float, quantizado, perda_relativa_mape, ...}.
+    """
+    X, y, calibracao = _holdout(forecaster, n_janelas)
+    destino = caminho_variante(forecaster.modelo_path, quantizacao)
+    with open(destino, "wb") as f:
+        f.write(converter_tflite(forecaster.modelo, quantizacao, representativos=calibracao if len(calibracao) else X))
+
+    referencia = _medir(forecaster.modelo, X, y, forecaster.scaler)
+    if os.path.exists(caminho_tflite(forecaster.modelo_path)):
+        # Mesmo runtime nos dois lados: a latência compara só o efeito da quantização
+        referencia = {**_medir(ModeloLite(caminho_tflite(forecaster.modelo_path)), X, y, forecaster.scaler),
+                      "latencia_keras_ms": referencia["latencia_ms"]}
+    quantizado = _medir(ModeloLite(destino), X, y, forecaster.scaler)
+
+    return {
+        "quantizacao": quantizacao,
+        "janelas_holdout": len(X),
+        "float": referencia,
+        "quantizado": quantizado,
+        "perda_relativa_mape": round(quantizado["mape"] / referencia["mape"] - 1, 4) if referencia["mape"] else 0.0,
+        "tamanho_kb": round(os.path.getsize(destino) / 1024, 1),
+        "caminho": destino,
+    }
+
+
+def quantizar_e_promover(forecaster, quantizacao=QUANTIZACAO_LSTM, tolerancia=TOLERANCIA_MAPE_QUANTIZACAO):
+    """
+    Gera e avalia a variante; se o MAPE piorar no máximo `tolerancia` (relativo), ela passa a ser
+    o <modelo>.tflite servido por carregar_modelo_inferencia. O relatório vai para o meta do artefato.
+    """
+    relatorio = avaliar_quantizacao(forecaster, quantizacao)
+    relatorio["promovido"] = relatorio["perda_relativa_mape"] <= tolerancia
+
+    if relatorio["promovido"]:
+        temporario = f"{caminho_tflite(forecaster.modelo_path)}.tmp"
+        with open(relatorio["caminho"], "rb") as origem, open(temporario, "wb") as f:
+            f.write(origem.read())
+        os.replace(temporario, caminho_tflite(forecaster.modelo_path))
+        uso_logger.info(
+            f"✅ {forecaster.ticker}: TFLite {quantizacao} promovido "
+            f"(MAPE {relatorio['float']['mape']:.4f} → {relatorio['quantizado']['mape']:.4f}, "
+            f"{relatorio['float']['latencia_ms']:.2f} → {relatorio['quantizado']['latencia_ms']:.2f} ms)"
+        )
+    else:
+        uso_logger.warning(
+            f"⚠️ {forecaster.ticker}: TFLite {quantizacao} descartado, MAPE piora "
+            f"{relatorio['perda_relativa_mape']:.1%} (tolerância {tolerancia:.0%})"
+        )
+
+    forecaster._salvar_meta(quantizacao=relatorio)
+    return relatorio
+
+
+if __name__ == "__main__":
+    from lstm_forecaster import CriptoForecaster
+    from utils.registro_modelos import registro_modelos
+    from utils.inferencia_lite import exportar_tflite
+
+    ticker = sys.argv[1]
+    quantizacao = sys.argv[2] if len(sys.argv) > 2 else "int8"
+
+    forecaster = CriptoForecaster(ticker)
+    forecaster.scaler = registro_modelos.obter_scaler(forecaster.scaler_path)
+    forecaster.carregar_dados(ajustar_scaler=False)
+    forecaster.modelo = registro_modelos.obter_modelo(forecaster.modelo_path)
+    exportar_tflite(forecaster.modelo_path, modelo=forecaster.modelo)  # referência float atualizada
+
+    relatorio = quantizar_e_promover(forecaster, quantizacao)
+    for chave, valor in relatorio.items():
+        print(f"{chave}: {valor}")
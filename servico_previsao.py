@@ -0,0 +1,172 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+
+import pandas as pd
+
+from config import VALIDADE_PREVISAO_BATCH_HORAS
+from db import obter_previsao_batch
+from logger import uso_logger, erro_logger
+from motores_previsao import MOTORES, prever_com_motor, selecionar_motor
+
+MAX_RESULTADOS_MEMORIA = 64
+
+
+@dataclass
+class ResultadoPrevisao:
+    """
+    Resultado de uma previsão: frame ds/yhat/yhat_lower/yhat_upper (histórico + horizonte)
+    e os avisos/limites que as rotas exibem (antes gravados direto na sessão).
+    """
+    ticker: str
+    freq: str
+    motor: str
+    dias: int
+    previsao: pd.DataFrame
+    info: dict = field(default_factory=dict)
+    ultimo_historico: pd.Timestamp = None
+    origem: str = "calculado"  # calculado | cache | batch
+    duracao_s: float = 0.0
+    gerado_em: datetime = field(default_factory=datetime.now)
+
+    @property
+    def erro(self):
+        return self.info.get("erro_prophet")
+
+    def horizonte(self, periodos=None):
+        """
+        Só as linhas futuras (após o último candle usado no ajuste).
+        """
+        futuro = self.previsao
+        if self.ultimo_historico is not None and not futuro.empty:
+            futuro = futuro[futuro['ds'] > self.ultimo_historico]
+        if periodos is not None:
+            futuro = futuro.head(periodos)
+        return futuro.reset_index(drop=True)
+
+
+def _copiar(resultado, origem):
+    """
+    Cópia independente para quem reaproveita um resultado (as rotas alteram o DataFrame).
+    """
+    return replace(resultado, previsao=resultado.previsao.copy(), info=dict(resultado.info), origem=origem)
+
+
+def _fingerprint_indicadores(indicadores):
+    """
+    Hash dos fechamentos (com o índice de datas); muda a cada candle novo.
+    """
+    hashes = pd.util.hash_pandas_object(indicadores['Close'], index=True).values
+    return hashlib.sha256(hashes.tobytes()).hexdigest()[:16]
+
+
+class ServicoPrevisao:
+    """
+    Ponto único de previsão das rotas, do scheduler e do batch:
+    - cache LRU de resultados por (ticker, intervalo, motor, dias, série);
+    - coalescência: pedidos iguais simultâneos esperam o mesmo cálculo em vez de ajustar de novo;
+    - leitura opcional das previsões pré-calculadas pelo batch noturno.
+    """
+
+    def __init__(self, max_memoria=MAX_RESULTADOS_MEMORIA):
+        self.max_memoria = max_memoria
+        self._resultados = OrderedDict()
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+
+    def prever(self, indicadores, ticker, dias=5, freq=None, motor=None, orcamento_ms=None, precalculado_intervalo=None):
+        """
+        Retorna um ResultadoPrevisao. Com precalculado_intervalo, usa o batch noturno
+        daquele intervalo enquanto ele for válido; sem freq explícita, o cálculo na hora usa
+        o mesmo intervalo do batch (freq=None deixaria o motor inferir outra frequência em
+        séries com lacunas, e a previsão ao vivo não bateria com a pré-calculada).
+        """
+        if precalculado_intervalo:
+            freq = freq or precalculado_intervalo
+            resultado = self._ler_batch(ticker, precalculado_intervalo, dias)
+            if resultado is not None:
+                return resultado
+
+        motor = motor or selecionar_motor(freq, orcamento_ms)
+        if motor not in MOTORES:
+            raise ValueError(f"Motor de previsão desconhecido: {motor}")
+        chave = (ticker, freq, motor, dias, _fingerprint_indicadores(indicadores))
+
+        with self._lock:
+            if chave in self._resultados:
+                self._resultados.move_to_end(chave)
+                return _copiar(self._resultados[chave], "cache")
+
+            futuro = self._em_andamento.get(chave)
+            calcular = futuro is None
+            if calcular:
+                futuro = Future()
+                self._em_andamento[chave] = futuro
+
+        if not calcular:
+            uso_logger.info(f"⏳ Previsão de {ticker} ({freq or 'auto'}) já em cálculo; aguardando o resultado")
+            return _copiar(futuro.result(), "cache")
+
+        try:
+            resultado = self._calcular(indicadores, ticker, dias, freq, motor)
+            futuro.set_result(resultado)
+        except Exception as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+
+        if resultado.erro is None:
+            with self._lock:
+                self._resultados[chave] = resultado
+                while len(self._resultados) > self.max_memoria:
+                    self._resultados.popitem(last=False)
+        return _copiar(resultado, resultado.origem)
+
+    def _calcular(self, indicadores, ticker, dias, freq, motor):
+        inicio = time.monotonic()
+        previsao, info = prever_com_motor(indicadores, dias=dias, freq=freq, ticker=ticker, motor=motor)
+        duracao = time.monotonic() - inicio
+
+        return ResultadoPrevisao(
+            ticker=ticker,
+            freq=freq,
+            motor=motor,
+            dias=dias,
+            previsao=previsao,
+            info=info,
+            ultimo_historico=pd.to_datetime(indicadores.index.max()),
+            duracao_s=duracao,
+        )
+
+    def _ler_batch(self, ticker, intervalo, dias):
+        try:
+            armazenada = obter_previsao_batch(ticker, intervalo, dias, VALIDADE_PREVISAO_BATCH_HORAS)
+        except Exception as e:
+            erro_logger.error(f"Erro ao ler previsão pré-calculada de {ticker}: {e}")
+            return None
+        if armazenada is None:
+            return None
+
+        previsao, info = armazenada
+        return ResultadoPrevisao(
+            ticker=ticker,
+            freq=intervalo,
+            motor=info.get("motor_previsao", "prophet"),
+            dias=dias,
+            previsao=previsao,
+            info=info,
+            origem="batch",
+        )
+
+    def limpar(self):
+        with self._lock:
+            self._resultados.clear()
+
+
+servico_previsao = ServicoPrevisao()
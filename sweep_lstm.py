@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Sweep de LSTM: grade de (ticker, janela, arquitetura, epochs) treinada em paralelo, um processo por
+bloco de núcleos, com métricas no holdout gravadas na tabela sweep_lstm (db.py).
+Configurações já concluídas são puladas, então um sweep interrompido continua de onde parou.
+
+Uso: python sweep_lstm.py [TICKER ...]
+"""
+import os
+import sys
+import time
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from db import criar_tabela, salvar_resultado_sweep, listar_configs_sweep_concluidas, obter_resultados_sweep
+from logger import uso_logger, erro_logger
+from utils.cache_dataset import obter_dataset
+
+JANELAS_SWEEP = [30, 60, 90]
+ARQUITETURAS_SWEEP = ["simples", "empilhada"]
+EPOCHS_SWEEP = [100]
+DIAS_HOLDOUT = 5
+THREADS_TF_POR_WORKER = 2  # intra-op por processo; workers = núcleos // threads
+PASTA_SWEEP = "resultados_lstm/sweep"
+
+
+def _inicializar_worker(threads):
+    """
+    Fixa os pools de threads do TensorFlow antes do primeiro import em cada processo:
+    sem isso cada worker abre um pool do tamanho da máquina e eles disputam os mesmos núcleos.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _caminhos_job(ticker, janela, arquitetura, epochs):
+    base = f"{PASTA_SWEEP}/{ticker}_j{janela}_{arquitetura}_e{epochs}"
+    return f"{base}.keras", f"{base}_scaler.pkl"
+
+
+def caminho_previsao_job(modelo_path):
+    """CSV (Dia, Real, Previsto) do holdout gravado ao lado do modelo de cada job."""
+    return modelo_path.replace(".keras", "_previsao.csv")
+
+
+def _treinar_job(ticker, janela, arquitetura, epochs, dias):
+    """
+    Executado em um processo do pool: treina sem os últimos `dias` candles e mede o erro neles.
+    A série vem do cache em disco via mmap, compartilhada entre os workers pelo page cache; o scaler
+    é reajustado só no trecho de treino (a normalização do cache usa a faixa da série inteira,
+    holdout incluído, e vazaria o holdout para a avaliação que ordena as configurações).
+    O EarlyStopping é o mesmo do treino de produção: val_loss nas últimas FRACAO_VALIDACAO_LSTM janelas.
+    Nunca levanta exceção; a falha volta no retorno para ser registrada pelo processo principal.
+    """
+    import pandas as pd
+    from sklearn.preprocessing import MinMaxScaler
+    from config import FRACAO_VALIDACAO_LSTM
+    from lstm_forecaster import CriptoForecaster
+    from utils.cache_dataset import carregar_dataset, fechamentos_reais
+
+    inicio = time.monotonic()
+    modelo_path, scaler_path = _caminhos_job(ticker, janela, arquitetura, epochs)
+    try:
+        serie, meta, _ = carregar_dataset(ticker, aceitar_vencido=True)
+        treino = fechamentos_reais(serie[:-dias], meta)
+        real = fechamentos_reais(serie[-dias:], meta).flatten()
+        if len(treino) < janela + 1:
+            raise ValueError(f"Dados insuficientes para janela={janela} (len={len(treino)})")
+
+        forecaster = CriptoForecaster(ticker, janela=janela, epochs=epochs,
+                                      modelo_path=modelo_path, scaler_path=scaler_path)
+        forecaster.scaler = MinMaxScaler()
+        forecaster.dados_treinamento = forecaster.scaler.fit_transform(treino).flatten()
+        forecaster.treinar(arquitetura=arquitetura, fracao_validacao=FRACAO_VALIDACAO_LSTM)
+        previsto = np.array([p["valor"] for p in forecaster.prever(dias=dias)])
+        pd.DataFrame({
+            "Dia": [f"D{i+1}" for i in range(dias)],
+            "Real": real,
+            "Previsto": previsto
+        }).to_csv(caminho_previsao_job(modelo_path), index=False)
+
+        erro_abs = np.abs(real - previsto)
+        metricas = {
+            "rmse": float(np.sqrt(np.mean(erro_abs ** 2))),
+            "mae": float(np.mean(erro_abs)),
+            "mape": float(np.mean(erro_abs / np.abs(real))),
+        }
+        return metricas, modelo_path, time.monotonic() - inicio, None
+    except Exception as e:
+        return None, modelo_path, time.monotonic() - inicio, str(e)
+
+
+def executar_sweep(tickers, janelas=JANELAS_SWEEP, arquiteturas=ARQUITETURAS_SWEEP, epochs=EPOCHS_SWEEP,
+                   dias=DIAS_HOLDOUT, threads_por_worker=THREADS_TF_POR_WORKER, max_workers=None):
+    """
+    Roda a grade em paralelo e grava cada job em sweep_lstm. O processo principal garante o dataset
+    de cada ticker no cache em disco; os workers só o abrem (mmap), sem receber cópias pelo pool.
+    Retorna obter_resultados_sweep() (melhor MAPE primeiro por ticker).
+    """
+    criar_tabela()
+    os.makedirs(PASTA_SWEEP, exist_ok=True)
+
+    concluidas = listar_configs_sweep_concluidas(dias)
+    grade = [c for c in itertools.product(tickers, janelas, arquiteturas, epochs) if c not in concluidas]
+    if len(grade) < len(tickers) * len(janelas) * len(arquiteturas) * len(epochs):
+        uso_logger.info(f"[Sweep] Retomando: {len(grade)} job(s) pendente(s)")
+    if not grade:
+        return obter_resultados_sweep()
+
+    disponiveis = set()
+    for ticker in sorted({c[0] for c in grade}):
+        try:
+            obter_dataset(ticker, preferencia="yahoo")
+            disponiveis.add(ticker)
+        except Exception as e:
+            erro_logger.error(f"[Sweep] ❌ {ticker}: {e}")
+
+    workers = max_workers or max(1, (os.cpu_count() or 1) // threads_por_worker)
+    inicio = time.monotonic()
+    # spawn: o TensorFlow não é seguro após fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_inicializar_worker, initargs=(threads_por_worker,)) as pool:
+        futuros = {
+            pool.submit(_treinar_job, ticker, janela, arquitetura, ep, dias): (ticker, janela, arquitetura, ep)
+            for ticker, janela, arquitetura, ep in grade if ticker in disponiveis
+        }
+        for futuro in as_completed(futuros):
+            ticker, janela, arquitetura, ep = futuros[futuro]
+            metricas, modelo_path, duracao, erro = futuro.result()
+            salvar_resultado_sweep(ticker, janela, arquitetura, ep, dias, duracao, metricas, erro, modelo_path)
+
+            if erro is None:
+                uso_logger.info(f"[Sweep] ✅ {ticker} j={janela} {arquitetura} e={ep}: MAPE={metricas['mape']:.4f} ({duracao:.1f}s)")
+            else:
+                erro_logger.error(f"[Sweep] ❌ {ticker} j={janela} {arquitetura} e={ep}: {erro} ({duracao:.1f}s)")
+
+    uso_logger.info(f"[Sweep] {len(futuros)} job(s) em {time.monotonic() - inicio:.1f}s com {workers} worker(s)")
+    return obter_resultados_sweep()
+
+
+if __name__ == "__main__":
+    from config import ATIVOS_MONITORADOS
+
+    resultados = executar_sweep(sys.argv[1:] or ATIVOS_MONITORADOS)
+    print(resultados.to_string(index=False))
@@ -1,13 +1,9 @@
 # pyright: reportMissingImports=false
 import os
-import numpy as np
 import pandas as pd
-import time
 import matplotlib.pyplot as plt
-from lstm_forecaster import CriptoForecaster
-from logger_perda import LoggerDePerda
-from tensorflow.keras.callbacks import EarlyStopping
-from sklearn.metrics import mean_squared_error, mean_absolute_error, mean_absolute_percentage_error
+
+from sweep_lstm import executar_sweep, caminho_previsao_job
 
 # Ativos para testar
 tickers = ["PENDLE-USD", "BTC-USD"]
@@ -17,57 +13,36 @@ janela = 60
 dias = 5
 epochs = 100
 
-# Diretórios
-os.makedirs("resultados_lstm", exist_ok=True)
-metrics_path = "resultados_lstm/lstm_metrics.csv"
-if not os.path.exists(metrics_path):
-    with open(metrics_path, "w") as f:
-        f.write("Ticker,RMSE,MAE,MAPE\n")
-
-# Loop por ticker
-for ticker in tickers:
-    try:
-        print(f"\n🚀 Treinando LSTM para {ticker}...")
-
-        forecaster = CriptoForecaster(ticker, janela=janela, epochs=epochs)
-        forecaster.carregar_dados()  # usa preferencia="yahoo" internamente
-
-        early = EarlyStopping(monitor='loss', patience=5, restore_best_weights=True)
-        forecaster.treinar(callbacks=[early, LoggerDePerda()])
-
-        previsoes = forecaster.prever(dias=dias)
-        valores_previstos = np.array([p["valor"] for p in previsoes])
-
-        serie_real = forecaster.scaler.inverse_transform(
-            forecaster.dados_treinamento[-(dias + janela):].reshape(-1, 1)
-        ).flatten()[-dias:]
-
-        rmse = mean_squared_error(serie_real, valores_previstos, squared=False)
-        mae = mean_absolute_error(serie_real, valores_previstos)
-        mape = mean_absolute_percentage_error(serie_real, valores_previstos)
-
-        print(f"✅ {ticker}: RMSE={rmse:.2f}, MAE={mae:.2f}, MAPE={mape:.4f}")
-
-        df = pd.DataFrame({
-            "Dia": [f"D{i+1}" for i in range(dias)],
-            "Real": serie_real,
-            "Previsto": valores_previstos
-        })
-        nome_curto = ticker.replace("-", "").replace(".", "")
+# Guarda obrigatória: o pool usa spawn e reimporta este módulo nos workers
+if __name__ == "__main__":
+    # Treino em paralelo via sweep_lstm (grade de um ponto: mesma janela/epochs de antes);
+    # o LoggerDePerda continua imprimindo as perdas de cada época nos workers
+    resultados = executar_sweep(tickers, janelas=[janela], arquiteturas=["simples"], epochs=[epochs], dias=dias)
+
+    os.makedirs("resultados_lstm", exist_ok=True)
+    metrics_path = "resultados_lstm/lstm_metrics.csv"
+    selecionados = resultados[resultados["ticker"].isin(tickers) & (resultados["janela"] == janela)
+                              & (resultados["arquitetura"] == "simples") & (resultados["epochs"] == epochs)]
+    selecionados[["ticker", "rmse", "mae", "mape"]].rename(
+        columns={"ticker": "Ticker", "rmse": "RMSE", "mae": "MAE", "mape": "MAPE"}
+    ).to_csv(metrics_path, index=False, float_format="%.4f")
+
+    for linha in selecionados.itertuples(index=False):
+        print(f"✅ {linha.ticker}: RMSE={linha.rmse:.2f}, MAE={linha.mae:.2f}, MAPE={linha.mape:.4f}")
+
+        # Real x previsto do holdout, gravado pelo job do sweep ao lado do modelo
+        try:
+            df = pd.read_csv(caminho_previsao_job(linha.modelo_path))
+        except OSError as e:
+            print(f"❌ Previsão do sweep indisponível para {linha.ticker}: {e}")
+            continue
+        nome_curto = linha.ticker.replace("-", "").replace(".", "")
         df.to_csv(f"resultados_lstm/lstm_{nome_curto}.csv", index=False)
 
-        with open(metrics_path, "a") as f:
-            f.write(f"{ticker},{rmse:.2f},{mae:.2f},{mape:.4f}\n")
-
         plt.figure(figsize=(10, 5))
         plt.plot(df["Dia"], df["Real"], label="Real", marker="o")
         plt.plot(df["Dia"], df["Previsto"], label="Previsto", marker="x")
-        plt.title(f"📈 Previsão LSTM – {ticker}")
+        plt.title(f"📈 Previsão LSTM – {linha.ticker}")
         plt.legend(); plt.grid(True); plt.tight_layout()
         plt.savefig(f"resultados_lstm/lstm_{nome_curto}.png")
         plt.close()
-
-    except Exception as e:
-        print(f"❌ Falha com {ticker}: {e}")
-
-    time.sleep(10)
\ No newline at end of file
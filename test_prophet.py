@@ -2,12 +2,13 @@
 import logging
 import pandas as pd
 from prophet import Prophet
-from prophet.diagnostics import cross_validation, performance_metrics
+from prophet.diagnostics import performance_metrics
 from utils.dados_com_fallback import obter_dados_com_fallback
 from utils.dados_utils import preparar_dados_prophet
-from utils.forecast_evaluation import backtest_evaluate, cv_summary, residuals_diagnostics
-from utils.cv_utils import gerar_janelas_cv
-from prophet_forecaster import ajustar_previsao_com_bollinger
+from utils.forecast_evaluation import backtest_evaluate, residuals_diagnostics
+from utils.cv_utils import gerar_janelas_cv_intervalo
+from utils.tuning_prophet import successive_halving_prophet
+from prophet_forecaster import ajustar_previsao_com_bollinger, prever_horizonte
 from utils.indicadores import calcular_indicadores
 
 # 1) Silencia o DEBUG interno de CmdStanPy e Prophet
@@ -20,61 +21,71 @@ logging.basicConfig(
     format="%(asctime)s %(levelname)s %(message)s"
 )
 
+def _criar_modelo_intervalo(scale: float, intervalo_real: str, usar_volume: bool) -> Prophet:
+    """
+    Modelo final do pipeline (sazonalidade por intervalo + regressor de volume).
+    Usado também no tuning, para que o vencedor já saia ajustado.
+    """
+    modelo = Prophet(
+        changepoint_prior_scale=scale,
+        daily_seasonality=False,
+        weekly_seasonality=False,
+        yearly_seasonality=False
+    )
+
+    # 🔁 Sazonalidade por intervalo
+    if intervalo_real == "15min":
+        modelo.add_seasonality(name='15min_cycle', period=0.0104, fourier_order=5)
+    elif intervalo_real == "30min":
+        modelo.add_seasonality(name='30min_cycle', period=0.0208, fourier_order=5)
+    elif intervalo_real == "45min" or intervalo_real == "1h":
+        modelo.add_seasonality(name='1h_cycle', period=0.0416, fourier_order=5)
+    elif intervalo_real in ["1d", "2d", "3d", "5d"]:
+        modelo.add_seasonality(name='daily_cycle', period=1, fourier_order=10)
+
+    # 📊 Regressor opcional: volume
+    if usar_volume:
+        modelo.add_regressor('Volume')
+    return modelo
+
+def tunar_prophet(
+    df_prophet: pd.DataFrame,
+    intervalo_real: str,
+    parametros: list[float],
+    criar_modelo=None,
+    persistir_folds: bool = True
+):
+    """
+    Successive halving sobre changepoint_prior_scale, com janelas de CV adaptadas
+    à frequência real dos dados e cross-validation no backend parallel="processes".
+    Retorna (best_scale, {scale: rmse}, modelo_vencedor, df_cv_vencedor).
+    """
+    init_str, period_str, horizon_str = gerar_janelas_cv_intervalo(len(df_prophet), intervalo_real)
+    logging.info(
+        f"🧪 CV tuning (n={len(df_prophet)}, initial={init_str}, period={period_str}, horizon={horizon_str})"
+    )
+    return successive_halving_prophet(
+        df_prophet,
+        parametros,
+        initial=init_str,
+        period=period_str,
+        horizon=horizon_str,
+        criar_modelo=criar_modelo,
+        parallel="processes",
+        persistir_folds=persistir_folds
+    )
+
 def validar_parametros_prophet(
     df_prophet: pd.DataFrame,
     intervalo_real: str,
     parametros: list[float]
 ) -> dict[float, float]:
     """
-    Roda cross‐validation em df_prophet para cada changepoint_prior_scale em `parametros`,
-    adaptando initial/period/horizon à frequência real dos dados.
-    Retorna {scale: rmse-medio}.
+    Roda o tuning por successive halving em df_prophet para os changepoint_prior_scale
+    em `parametros`. Retorna {scale: rmse-medio} (candidatos eliminados cedo têm o RMSE
+    dos cutoffs em que foram avaliados; falhas ficam como NaN).
     """
-    n = len(df_prophet)
-
-    # converte intervalo_real em minutos
-    if intervalo_real.endswith("min"):
-        freq_min = int(intervalo_real.replace("min",""))
-    elif intervalo_real.endswith("h"):
-        freq_min = int(intervalo_real.replace("h","")) * 60
-    else:
-        freq_min = 24*60
-
-    # pontos
-    init_pts    = max(3, int(n * 0.6))
-    horizon_pts = max(1, int(n * 0.1))
-    period_pts  = max(1, int((n - init_pts - horizon_pts) / 3))
-
-    # minutos totais
-    init_min    = init_pts    * freq_min
-    horizon_min = horizon_pts * freq_min
-    period_min  = period_pts  * freq_min
-
-    # gera strings para Prophet
-    def to_str(m):
-        if m % 1440 == 0: return f"{m//1440} days"
-        if m %   60 == 0: return f"{m//60} hours"
-        return f"{m} minutes"
-
-    init_str    = to_str(init_min)
-    period_str  = to_str(period_min)
-    horizon_str = to_str(horizon_min)
-
-    logging.info(f"🧪 CV tuning (n={n}, initial={init_str}, period={period_str}, horizon={horizon_str})")
-
-    resultados = {}
-    for scale in parametros:
-        m = Prophet(changepoint_prior_scale=scale)
-        m.fit(df_prophet)
-        try:
-            df_cv = cross_validation(m, initial=init_str, period=period_str, horizon=horizon_str)
-            perf  = performance_metrics(df_cv, rolling_window=1)
-            resultados[scale] = perf["rmse"].mean()
-            logging.info(f"✔ scale={scale} RMSE={resultados[scale]:.2f}")
-        except Exception as e:
-            logging.warning(f"⚠ scale={scale} falhou: {e}")
-            resultados[scale] = float("nan")
-
+    _, resultados, _, _ = tunar_prophet(df_prophet, intervalo_real, parametros)
     return resultados
 
 def executar_pipeline(
@@ -96,72 +107,30 @@ def executar_pipeline(
     # 2) prepara para Prophet
     df_prophet = preparar_dados_prophet(df_raw)
     
-    # Determina unidade com base no intervalo real
-    unidade = "minutes" if intervalo_real.endswith("min") else "hours" if intervalo_real.endswith("h") else "days"
-
-    # Recalcula janelas
-    init_str, period_str, horizon_str = gerar_janelas_cv(len(df_prophet), unidade)
-
-    # 3) tuning via CV adaptado
-    scales = [0.01, 0.05, 0.1, 0.2]
-    resultados = validar_parametros_prophet(df_prophet, intervalo_real, scales)
-    validos = {s: rmse for s, rmse in resultados.items() if not pd.isna(rmse)}
-    best_scale = min(validos, key=validos.get) if validos else 0.05
-    logging.info(f"✔️ Best changepoint_prior_scale = {best_scale}")
-
-    # **Recalcula as mesmas janelas para o cv_summary**
-    n = len(df_prophet)
-    # (repete exatamente o mesmo cálculo de validar_parametros_prophet)
-    if intervalo_real.endswith("min"):
-        freq_min = int(intervalo_real.replace("min",""))
-    elif intervalo_real.endswith("h"):
-        freq_min = int(intervalo_real.replace("h","")) * 60
-    else:
-        freq_min = 24*60
-
-    init_pts    = max(3, int(n * 0.6))
-    horizon_pts = max(1, int(n * 0.1))
-    period_pts  = max(1, int((n - init_pts - horizon_pts) / 3))
-    init_min    = init_pts    * freq_min
-    horizon_min = horizon_pts * freq_min
-    period_min  = period_pts  * freq_min
-    def to_str(m):
-        if m % 1440 == 0: return f"{m//1440} days"
-        if m %   60 == 0: return f"{m//60} hours"
-        return f"{m} minutes"
-    init_str    = to_str(init_min)
-    period_str  = to_str(period_min)
-    horizon_str = to_str(horizon_min)
-
-    # 4) modelo Prophet com sazonalidade e regressors
-    modelo = Prophet(
-        changepoint_prior_scale=best_scale,
-        daily_seasonality=False,
-        weekly_seasonality=False,
-        yearly_seasonality=False
-    )
-
-    # 🔁 Sazonalidade por intervalo
-    if intervalo_real == "15min":
-        modelo.add_seasonality(name='15min_cycle', period=0.0104, fourier_order=5)
-    elif intervalo_real == "30min":
-        modelo.add_seasonality(name='30min_cycle', period=0.0208, fourier_order=5)
-    elif intervalo_real == "45min" or intervalo_real == "1h":
-        modelo.add_seasonality(name='1h_cycle', period=0.0416, fourier_order=5)
-    elif intervalo_real in ["1d", "2d", "3d", "5d"]:
-        modelo.add_seasonality(name='daily_cycle', period=1, fourier_order=10)
-
-    # 📊 Regressor opcional: volume
-    if "Volume" in df_prophet.columns:
+    # 📊 Volume sem lacunas (regressor opcional)
+    usar_volume = "Volume" in df_prophet.columns
+    if usar_volume:
         df_prophet['Volume'] = df_prophet['Volume'].fillna(method='ffill')
-        modelo.add_regressor('Volume')
 
     # ✅ Checagem de variação nos dados
     if df_prophet['y'].nunique() < 3:
         raise RuntimeError(f"⚠️ Dados de 'y' com variação insuficiente para {ticker}")
 
-    # Ajuste
-    modelo.fit(df_prophet)
+    # 3) tuning via successive halving; o vencedor já volta ajustado com a configuração final
+    scales = [0.01, 0.05, 0.1, 0.2]
+    try:
+        best_scale, resultados, modelo, df_cv = tunar_prophet(
+            df_prophet,
+            intervalo_real,
+            scales,
+            criar_modelo=lambda scale: _criar_modelo_intervalo(scale, intervalo_real, usar_volume)
+        )
+    except Exception as e:
+        logging.warning(f"⚠ Tuning falhou ({e}); usando scale=0.05")
+        best_scale, df_cv = 0.05, None
+        modelo = _criar_modelo_intervalo(best_scale, intervalo_real, usar_volume)
+        modelo.fit(df_prophet)
+    logging.info(f"✔️ Best changepoint_prior_scale = {best_scale}")
 
     # ⚙️ Frequência
     if intervalo_real.endswith("min"):
@@ -208,32 +177,18 @@ def executar_pipeline(
                 fim.strftime("%Y-%m-%d %H:%M:%S")
             ])
 
-    # 4b) CV summary no modelo final (agora sim com init_str, period_str, horizon_str definidos)
-    modelo = Prophet(changepoint_prior_scale=best_scale)
-    modelo.fit(df_prophet)
-    perf_cv = cv_summary(modelo, init_str, period_str, horizon_str)
+    # 4b) CV summary reaproveitando os folds do tuning (sem novo ajuste)
+    perf_cv = performance_metrics(df_cv, rolling_window=1) if df_cv is not None else pd.DataFrame()
+    if not perf_cv.empty:
+        logging.info(f"✔️ CV summary RMSE médio = {perf_cv['rmse'].mean():.2f}")
 
     # 4c) resíduos
     residuals_diagnostics(modelo, df_prophet)
 
     print("🧪 metrics_bt:", metrics_bt)
-    # 4d) previsões finais
-    from utils.previsao_utils import preencher_volume_futuro
-    
-    futuro = modelo.make_future_dataframe(periods=dias, freq=freq)
-    futuro = preencher_volume_futuro(df_prophet, futuro, metodo="auto")
-
-    # Se o modelo tiver 'Volume' como regressor, preenche no futuro
-    if "Volume" in df_prophet.columns:
-        try:
-            futuro["Volume"] = futuro["Volume"]  # já foi preenchido
-        except Exception:
-            futuro["Volume"] = df_prophet["Volume"].ffill().iloc[-1]
-
-        volume_futuro = df_prophet["Volume"].ffill().iloc[-1]
-        futuro["Volume"] = volume_futuro
-
-    previsao = modelo.predict(futuro)
+    # 4d) previsões finais (só o horizonte; volume futuro = último volume conhecido)
+    volume_futuro = df_prophet["Volume"].ffill().iloc[-1] if "Volume" in df_prophet.columns else 0.0
+    previsao, futuro = prever_horizonte(modelo, dias, freq, colunas={"Volume": volume_futuro})
     previsao["Volume"] = futuro["Volume"].values
     nome_arquivo = f"previsoes_prophet/prophet_{ticker.replace('-', '').replace('/', '')}.csv"
     colunas_para_salvar = ["ds", "yhat", "yhat_lower", "yhat_upper", "Volume"]
@@ -4,6 +4,7 @@ import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.models import load_model
 from model import criar_modelo
+from utils.janelas_lstm import janelas_deslizantes
 from utils.dados_com_fallback import obter_dados_com_fallback
 
 # Parâmetros
@@ -34,14 +35,8 @@ for ticker in tickers:
     scaler = MinMaxScaler()
     dados_norm = scaler.fit_transform(closes)
 
-    # Preparação das janelas de treino
-    X, y = [], []
-    for i in range(janela, len(dados_norm)):
-        X.append(dados_norm[i-janela:i, 0])
-        y.append(dados_norm[i, 0])
-
-    X, y = np.array(X), np.array(y)
-    X = np.reshape(X, (X.shape[0], janela, 1))
+    # Preparação das janelas de treino (views sobre a série, sem copiar cada janela)
+    X, y = janelas_deslizantes(dados_norm, janela)
 
     # Modelo e treinamento
     modelo = criar_modelo(janela, 1)
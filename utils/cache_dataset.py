@@ -0,0 +1,153 @@
+import os
+import glob
+import json
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from logger import uso_logger
+from utils.calendario import proximo_fechamento
+
+DIRETORIO_CACHE_DATASET = "dados/cache_lstm"
+
+
+def _base(ticker, intervalo):
+    nome = str(ticker).replace("-", "").replace("/", "").replace(".", "")
+    return os.path.join(DIRETORIO_CACHE_DATASET, f"{nome}_{intervalo}")
+
+
+def _caminho_array(base, nome, versao):
+    return f"{base}_{nome}_{versao}.npy"
+
+
+def _salvar_npy_atomico(caminho, array):
+    temporario = f"{caminho[:-4]}.tmp.npy"  # np.save acrescentaria .npy a qualquer outro sufixo
+    np.save(temporario, array)
+    os.replace(temporario, caminho)
+
+
+def _remover_versoes_antigas(base, versao):
+    """
+    Apaga arrays de versões anteriores à gravada (quem já os abriu com mmap continua lendo até fechar).
+    Temporários e arrays mais novos, de outra gravação em andamento, ficam.
+    """
+    referencia = os.path.getmtime(_caminho_array(base, "serie", versao))
+    for caminho in glob.glob(f"{glob.escape(base)}_*.npy"):
+        if caminho.endswith(f"_{versao}.npy") or caminho.endswith(".tmp.npy"):
+            continue
+        try:
+            if os.path.getmtime(caminho) < referencia:
+                os.remove(caminho)
+        except OSError:
+            pass
+
+
+def salvar_dataset(ticker, fechamentos, intervalo="1d", features=None, fonte=None):
+    """
+    Grava a série de fechamentos normalizada (min/max da própria série, float32) e, opcionalmente,
+    a matriz de features (DataFrame alinhado à série) em .npy, mais um meta JSON com a faixa e as datas.
+    Os arrays levam a versão no nome e o meta, gravado por último, aponta para ela: um leitor
+    sempre abre os arrays da mesma gravação do meta que leu (min/max e série nunca se misturam).
+    Vale até o fechamento do candle em formação (utils.calendario.proximo_fechamento).
+    """
+    fechamentos = fechamentos.dropna()
+    minimo, maximo = float(fechamentos.min()), float(fechamentos.max())
+    normalizados = ((fechamentos.values - minimo) / ((maximo - minimo) or 1.0)).astype(np.float32)
+
+    os.makedirs(DIRETORIO_CACHE_DATASET, exist_ok=True)
+    base = _base(ticker, intervalo)
+    versao = uuid.uuid4().hex[:12]
+    _salvar_npy_atomico(_caminho_array(base, "serie", versao), normalizados)
+
+    colunas = None
+    if features is not None:
+        colunas = [str(c) for c in features.columns]
+        _salvar_npy_atomico(_caminho_array(base, "features", versao),
+                            np.ascontiguousarray(features.values, dtype=np.float32))
+
+    meta = {
+        "ticker": ticker,
+        "intervalo": intervalo,
+        "fonte": fonte,
+        "min": minimo,
+        "max": maximo,
+        "pontos": len(normalizados),
+        "inicio": pd.Timestamp(fechamentos.index[0]).isoformat() if len(fechamentos) else None,
+        "ultima_data": pd.Timestamp(fechamentos.index[-1]).isoformat() if len(fechamentos) else None,
+        "colunas_features": colunas,
+        "versao": versao,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "expira_em": proximo_fechamento(intervalo, ticker).isoformat(),
+    }
+    temporario = f"{base}_meta.json.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(temporario, f"{base}_meta.json")
+    _remover_versoes_antigas(base, versao)
+    return meta
+
+
+def carregar_dataset(ticker, intervalo="1d", aceitar_vencido=False):
+    """
+    (serie, meta, features) abertos com mmap_mode='r': os processos que abrem o mesmo arquivo
+    compartilham as páginas pelo page cache do SO em vez de cada um guardar uma cópia.
+    Os arrays são somente leitura. None se o cache não existe, é de formato antigo ou já fechou
+    um candle depois dele (aceitar_vencido=True aceita qualquer idade).
+    """
+    base = _base(ticker, intervalo)
+    try:
+        with open(f"{base}_meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        versao = meta["versao"]
+        serie = np.load(_caminho_array(base, "serie", versao), mmap_mode="r")
+        features = np.load(_caminho_array(base, "features", versao), mmap_mode="r") if meta.get("colunas_features") else None
+    except (OSError, ValueError, KeyError):
+        return None  # Inexistente, de formato antigo ou regravado entre a leitura do meta e a dos arrays
+
+    if len(serie) != meta["pontos"]:
+        return None
+    if not aceitar_vencido and pd.Timestamp.now(tz="UTC") >= pd.Timestamp(meta["expira_em"]):
+        return None
+    return serie, meta, features
+
+
+def obter_dataset(ticker, intervalo="1d", periodo="1y", outputsize=365, preferencia="auto",
+                  forcar_download=False, com_features=False):
+    """
+    Dataset do cache; se faltar, estiver vencido ou forcar_download, baixa via obter_dados_com_fallback
+    e regrava. com_features inclui a matriz de indicadores (calcular_indicadores) alinhada à série.
+    """
+    em_cache = None if forcar_download else carregar_dataset(ticker, intervalo)
+    if em_cache is not None and (em_cache[2] is not None or not com_features):
+        return em_cache
+
+    from utils.dados_com_fallback import obter_dados_com_fallback
+
+    df, fonte, intervalo_usado, _ = obter_dados_com_fallback(
+        ticker, intervalo=intervalo, periodo=periodo, outputsize=outputsize, preferencia=preferencia
+    )
+    if df.empty or "Close" not in df.columns or df["Close"].dropna().empty:
+        raise ValueError(f"❌ Sem dados válidos para {ticker}")
+
+    fechamentos = df["Close"].dropna()
+    features = None
+    if com_features:
+        from utils.indicadores import calcular_indicadores
+        features = calcular_indicadores(df).reindex(fechamentos.index).select_dtypes("number").ffill().fillna(0)
+
+    salvar_dataset(ticker, fechamentos, intervalo, features=features, fonte=fonte)
+    uso_logger.info(f"💾 Dataset de {ticker} ({intervalo_usado}) gravado no cache: {len(fechamentos)} pontos")
+    return carregar_dataset(ticker, intervalo, aceitar_vencido=True)
+
+
+def scaler_do_dataset(meta):
+    """MinMaxScaler equivalente à normalização gravada no cache."""
+    return MinMaxScaler().fit(np.array([[meta["min"]], [meta["max"]]]))
+
+
+def fechamentos_reais(serie, meta):
+    """Série do cache de volta à escala de preço (cópia em float64, shape (n, 1))."""
+    return (np.asarray(serie, dtype=float) * ((meta["max"] - meta["min"]) or 1.0) + meta["min"]).reshape(-1, 1)
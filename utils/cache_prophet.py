@@ -0,0 +1,136 @@
+import os
+import json
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from prophet.serialize import model_to_json, model_from_json
+from logger import uso_logger
+
+DIRETORIO_CACHE = "modelos_prophet"
+MAX_MODELOS_MEMORIA = 32
+COLUNAS_FINGERPRINT = ("ds", "y", "Volume", "cap", "floor")
+
+
+def fingerprint_serie(df: pd.DataFrame) -> str:
+    """
+    Hash estável da série de treino (ds, y e colunas auxiliares presentes).
+    Muda sempre que chega um candle novo ou algum valor é corrigido.
+    """
+    colunas = [c for c in COLUNAS_FINGERPRINT if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[colunas], index=False).values
+    return hashlib.sha256(hashes.tobytes()).hexdigest()[:16]
+
+
+def chave_base(ticker: str, freq: str, hiperparametros: dict) -> str:
+    """
+    Identifica a configuração do modelo (ticker, frequência e hiperparâmetros), sem os dados.
+    """
+    config = json.dumps({"freq": freq, "params": hiperparametros}, sort_keys=True, default=str)
+    nome = str(ticker or "sem_ticker").replace("-", "").replace("/", "").replace(".", "")
+    return f"{nome}_{freq}_{hashlib.sha256(config.encode()).hexdigest()[:12]}"
+
+
+def chave_modelo(ticker: str, freq: str, hiperparametros: dict, fingerprint: str) -> str:
+    return f"{chave_base(ticker, freq, hiperparametros)}__{fingerprint}"
+
+
+class CacheModelosProphet:
+    """
+    Cache de modelos Prophet já ajustados: LRU em memória + JSON em disco
+    (prophet.serialize). Só a versão mais recente de cada chave base fica no disco.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_CACHE, max_memoria=MAX_MODELOS_MEMORIA):
+        self.diretorio = diretorio
+        self.max_memoria = max_memoria
+        self._memoria = OrderedDict()
+        self._ultimas = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def _guardar_memoria(self, chave, entrada):
+        with self._lock:
+            self._memoria[chave] = entrada
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.max_memoria:
+                self._memoria.popitem(last=False)
+
+    def obter(self, chave):
+        """
+        Retorna (modelo, meta) ou None se a chave não estiver em nenhuma das camadas.
+        """
+        with self._lock:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                return self._memoria[chave]
+
+        caminho = self._caminho(chave)
+        if not os.path.exists(caminho):
+            return None
+
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            entrada = (model_from_json(payload["modelo"]), payload.get("meta", {}))
+        except Exception as e:
+            uso_logger.warning(f"⚠️ Cache Prophet corrompido em {caminho}: {e}")
+            return None
+
+        self._guardar_memoria(chave, entrada)
+        return entrada
+
+    def obter_ultimo(self, chave):
+        """
+        Retorna (modelo, meta) do ajuste mais recente da mesma configuração,
+        seja qual for o fingerprint (usado como ponto de partida do warm start).
+        """
+        base = chave.split("__")[0]
+        with self._lock:
+            ultima = self._ultimas.get(base)
+        if ultima is not None:
+            entrada = self.obter(ultima)
+            if entrada is not None:
+                return entrada
+
+        arquivos = sorted(
+            glob.glob(os.path.join(self.diretorio, f"{base}__*.json")),
+            key=os.path.getmtime
+        )
+        if not arquivos:
+            return None
+        return self.obter(os.path.basename(arquivos[-1])[:-len(".json")])
+
+    def salvar(self, chave, modelo, meta=None):
+        meta = meta or {}
+        payload = {"modelo": model_to_json(modelo), "meta": meta}
+
+        caminho = self._caminho(chave)
+        # Temporário próprio de cada escritor: threads/processos salvando a mesma chave não se misturam
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(payload, f, default=float)
+            os.replace(temporario, caminho)
+
+            # Remove versões antigas da mesma configuração (outros fingerprints)
+            base = chave.split("__")[0]
+            for antigo in glob.glob(os.path.join(self.diretorio, f"{base}__*.json")):
+                if antigo != caminho:
+                    os.remove(antigo)
+        except Exception as e:
+            uso_logger.warning(f"⚠️ Falha ao persistir modelo Prophet {chave}: {e}")
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+        self._guardar_memoria(chave, (modelo, meta))
+        with self._lock:
+            self._ultimas[chave.split("__")[0]] = chave
+
+
+cache_modelos = CacheModelosProphet()
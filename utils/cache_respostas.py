@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+
+from config import MAX_RESPOSTAS_CACHE, WORKERS_ATUALIZACAO_RESPOSTAS
+from logger import uso_logger, erro_logger
+from utils.calendario import proximo_fechamento, duracao_candle
+
+
+class CacheRespostas:
+    """
+    Resultados das rotas de análise (dados, indicadores, previsão, GPT, gráfico) por
+    (rota, ticker, período), válidos até o fechamento do candle do intervalo:
+    - dentro da validade: devolve o resultado guardado;
+    - vencido há menos de um candle: devolve o resultado guardado e reconstrói em segundo plano;
+    - mais antigo ou ausente: constrói na hora; pedidos iguais simultâneos esperam o mesmo cálculo.
+    Guarda só o resultado (contexto dos templates + avisos da sessão): sessão, usuário e render
+    continuam por requisição, então o construtor não pode depender de request/session.
+    """
+
+    def __init__(self, max_entradas=MAX_RESPOSTAS_CACHE, workers=WORKERS_ATUALIZACAO_RESPOSTAS):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # chave -> (valor, expira_em, limite_obsoleto, ticker)
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cache-respostas")
+
+    def obter(self, chave, construir, freq, ticker=None, cacheavel=None):
+        """
+        Resultado de `construir()` para a chave. `cacheavel(valor)` decide se um resultado
+        (ex.: uma resposta de erro) pode ser guardado; exceções nunca são guardadas.
+        """
+        agora = pd.Timestamp.now(tz="UTC")
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                valor, expira_em, limite_obsoleto, _ = entrada
+                if agora < expira_em:
+                    self._entradas.move_to_end(chave)
+                    return valor
+                if agora < limite_obsoleto:
+                    self._agendar(chave, construir, freq, ticker, cacheavel)
+                    return valor
+
+            futuro = self._em_andamento.get(chave)
+            dono = futuro is None
+            if dono:
+                futuro = Future()
+                self._em_andamento[chave] = futuro
+
+        if dono:
+            self._executar(chave, construir, freq, ticker, cacheavel, futuro)
+        return futuro.result()
+
+    def _agendar(self, chave, construir, freq, ticker, cacheavel):
+        # Chamado com o lock: no máximo uma reconstrução em segundo plano por chave
+        if chave in self._em_andamento:
+            return
+        futuro = Future()
+        self._em_andamento[chave] = futuro
+        self._pool.submit(self._executar, chave, construir, freq, ticker, cacheavel, futuro)
+        uso_logger.info(f"🔄 Resposta {chave} vencida: reconstruindo em segundo plano")
+
+    def _executar(self, chave, construir, freq, ticker, cacheavel, futuro):
+        try:
+            valor = construir()
+        except Exception as e:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            if futuro.set_running_or_notify_cancel():
+                futuro.set_exception(e)
+            erro_logger.error(f"Erro ao montar a resposta {chave}: {e}")
+            return
+
+        with self._lock:
+            if cacheavel is None or cacheavel(valor):
+                expira_em = proximo_fechamento(freq, ticker).tz_convert("UTC")
+                self._entradas[chave] = (valor, expira_em, expira_em + duracao_candle(freq), ticker)
+                self._entradas.move_to_end(chave)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+            self._em_andamento.pop(chave, None)
+        if futuro.set_running_or_notify_cancel():
+            futuro.set_result(valor)
+
+    def invalidar(self, ticker=None):
+        """
+        Descarta as respostas de um ticker (ou todas). Compara com o ticker passado a obter(),
+        guardado junto da entrada, e não com os elementos da chave.
+        """
+        with self._lock:
+            for chave in [c for c, e in self._entradas.items() if ticker is None or e[3] == ticker]:
+                del self._entradas[chave]
+
+
+cache_respostas = CacheRespostas()
@@ -0,0 +1,167 @@
+# utils/calendario.py
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+FUSO_B3 = "America/Sao_Paulo"
+ABERTURA_B3 = (10, 0)    # Pregão regular (sem leilões de abertura/fechamento)
+FECHAMENTO_B3 = (18, 0)  # Último candle intradiário começa antes deste horário
+
+# Feriados nacionais com data fixa (mês, dia) + dias sem pregão da B3
+FERIADOS_FIXOS_B3 = [
+    (1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (12, 24), (12, 25), (12, 31)
+]
+
+
+def eh_cripto(ticker) -> bool:
+    """
+    Criptoativos negociam 24/7 (mesma convenção '-USD' / 'USDT' das rotas).
+    """
+    ticker = str(ticker or "").upper()
+    return ticker.endswith("-USD") or ticker.endswith("USDT")
+
+
+def usa_calendario_b3(ticker) -> bool:
+    return bool(ticker) and not eh_cripto(ticker)
+
+
+def _pascoa(ano: int) -> date:
+    """
+    Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano).
+    """
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(ano, mes, dia)
+
+
+@lru_cache(maxsize=None)
+def feriados_b3(ano: int) -> frozenset:
+    """
+    Dias sem pregão na B3: feriados fixos, Carnaval, Sexta-feira Santa e Corpus Christi.
+    """
+    pascoa = _pascoa(ano)
+    moveis = [pascoa - timedelta(days=48), pascoa - timedelta(days=47),
+              pascoa - timedelta(days=2), pascoa + timedelta(days=60)]
+    fixos = [date(ano, mes, dia) for mes, dia in FERIADOS_FIXOS_B3]
+    if ano >= 2024:
+        fixos.append(date(ano, 11, 20))  # Consciência Negra (feriado nacional desde 2024)
+    return frozenset(fixos + moveis)
+
+
+def _duracao(freq):
+    try:
+        return pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+    except (ValueError, TypeError):
+        return None  # Frequências de calendário ('B', 'M'...) não têm duração fixa
+
+
+def _eh_intradiario(freq) -> bool:
+    duracao = _duracao(freq)
+    return duracao is not None and duracao < pd.Timedelta("1D")
+
+
+def usa_calendario(freq) -> bool:
+    """
+    O calendário só vale para candles intradiários e diários (semanal/mensal seguem o asfreq).
+    """
+    duracao = _duracao(freq)
+    return duracao is not None and duracao <= pd.Timedelta("1D")
+
+
+def em_pregao(indice, ticker, freq) -> np.ndarray:
+    """
+    Máscara booleana dos horários de `indice` com mercado aberto para o ticker.
+    Índices com fuso são convertidos para o horário de Brasília; sem fuso, já são tratados como locais.
+    """
+    indice = pd.DatetimeIndex(indice)
+    if not usa_calendario_b3(ticker) or not usa_calendario(freq):
+        return np.ones(len(indice), dtype=bool)
+
+    local = indice.tz_convert(FUSO_B3).tz_localize(None) if indice.tz is not None else indice
+    anos = range(local.year.min(), local.year.max() + 1) if len(local) else []
+    feriados = [d for ano in anos for d in feriados_b3(ano)]
+    mascara = (local.dayofweek < 5) & ~local.normalize().isin(pd.DatetimeIndex(feriados))
+
+    if _eh_intradiario(freq):
+        minutos = local.hour * 60 + local.minute
+        mascara &= (minutos >= ABERTURA_B3[0] * 60 + ABERTURA_B3[1]) & (minutos < FECHAMENTO_B3[0] * 60 + FECHAMENTO_B3[1])
+
+    return np.asarray(mascara)
+
+
+def horarios_negociacao(inicio, fim, freq, ticker=None) -> pd.DatetimeIndex:
+    """
+    Grade regular entre inicio e fim (inclusive) só com os horários de negociação.
+    """
+    grade = pd.date_range(start=inicio, end=fim, freq=freq)
+    return grade[em_pregao(grade, ticker, freq)]
+
+
+def proximos_horarios(ultimo, periodos, freq, ticker=None) -> pd.DatetimeIndex:
+    """
+    Os `periodos` próximos horários de negociação depois de `ultimo`
+    (equivale ao date_range do make_future_dataframe quando o mercado é 24/7).
+    """
+    if not usa_calendario_b3(ticker) or not usa_calendario(freq):
+        return pd.date_range(start=ultimo, periods=periodos + 1, freq=freq)[1:]
+
+    horarios = []
+    inicio = pd.Timestamp(ultimo)
+    while len(horarios) < periodos:
+        candidatos = pd.date_range(start=inicio, periods=periodos * 4 + 100, freq=freq)[1:]
+        horarios.extend(candidatos[em_pregao(candidatos, ticker, freq)])
+        inicio = candidatos[-1]
+    return pd.DatetimeIndex(horarios[:periodos])
+
+
+# Intervalos das APIs de dados (Twelve Data / rotas) que o pandas não reconhece
+APELIDOS_INTERVALO = {"1day": "1D", "1week": "7D", "1month": "30D"}
+
+
+def duracao_candle(freq) -> pd.Timedelta:
+    """Duração do candle do intervalo (1 dia para intervalos desconhecidos ou de calendário)."""
+    return _duracao(APELIDOS_INTERVALO.get(str(freq).lower(), freq)) or pd.Timedelta("1D")
+
+
+def proximo_fechamento(freq, ticker=None, agora=None) -> pd.Timestamp:
+    """
+    Quando fecha o candle em formação (Timestamp com fuso): até lá, um resultado calculado agora
+    continua atual. Intradiário: fim do candle corrente (limitado ao fechamento do pregão na B3) ou,
+    fora do pregão, fim do primeiro candle da próxima sessão. Diário: fechamento do pregão (18h)
+    na B3 e 00:00 UTC para cripto.
+    """
+    freq = APELIDOS_INTERVALO.get(str(freq).lower(), freq)
+    fuso = FUSO_B3 if usa_calendario_b3(ticker) else "UTC"
+    agora = pd.Timestamp.now(tz=fuso) if agora is None else pd.Timestamp(agora).tz_convert(fuso)
+    local = agora.tz_localize(None)
+    duracao = duracao_candle(freq)
+    fechamento = pd.Timedelta(hours=FECHAMENTO_B3[0], minutes=FECHAMENTO_B3[1])
+
+    if _eh_intradiario(freq):
+        inicio = local.floor(duracao)
+        if not em_pregao([inicio], ticker, freq)[0]:
+            inicio = proximos_horarios(inicio, 1, freq, ticker)[0]
+        fim = inicio + duracao
+        if usa_calendario_b3(ticker):
+            fim = min(fim, inicio.normalize() + fechamento)
+        return fim.tz_localize(fuso)
+
+    if duracao == pd.Timedelta("1D"):
+        if not usa_calendario_b3(ticker):
+            return (local.normalize() + duracao).tz_localize(fuso)
+        hoje = local.normalize()
+        if em_pregao([hoje], ticker, freq)[0] and local < hoje + fechamento:
+            return (hoje + fechamento).tz_localize(fuso)
+        return (proximos_horarios(hoje, 1, freq, ticker)[0] + fechamento).tz_localize(fuso)
+
+    return agora + duracao
@@ -20,4 +20,34 @@ def gerar_janelas_cv(n: int, freq: str) -> tuple[str, str, str]:
     period_str  = f"{period * f} {unidade}"
     horizon_str = f"{horizon * f} {unidade}"
 
-    return init_str, period_str, horizon_str
\ No newline at end of file
+    return init_str, period_str, horizon_str
+
+def minutos_por_intervalo(intervalo: str) -> int:
+    """
+    Converte o intervalo dos candles ("15min", "1h", "1day", "1d"...) em minutos.
+    """
+    intervalo = (intervalo or "1d").lower()
+    if intervalo.endswith("min"):
+        return int(intervalo.replace("min", ""))
+    if intervalo.endswith("h"):
+        return int(intervalo.replace("h", "")) * 60
+    return 24 * 60
+
+
+def gerar_janelas_cv_intervalo(n: int, intervalo: str) -> tuple[str, str, str]:
+    """
+    Mesmas proporções de gerar_janelas_cv (60% / 10% / 3 cortes), mas convertendo
+    pontos em tempo conforme o intervalo real dos candles.
+    """
+    freq_min = minutos_por_intervalo(intervalo)
+
+    initial = max(3, int(n * 0.6))
+    horizon = max(1, int(n * 0.1))
+    period  = max(1, int((n - initial - horizon) / 3))
+
+    def to_str(m):
+        if m % 1440 == 0: return f"{m // 1440} days"
+        if m % 60 == 0: return f"{m // 60} hours"
+        return f"{m} minutes"
+
+    return to_str(initial * freq_min), to_str(period * freq_min), to_str(horizon * freq_min)
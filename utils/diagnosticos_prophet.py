@@ -0,0 +1,121 @@
+import os
+import queue
+import threading
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')  # Worker em servidor sem interface gráfica
+import numpy as np
+
+from logger import uso_logger, erro_logger
+from db import criar_tabela, salvar_diagnostico_prophet
+from utils.cv_utils import gerar_janelas_cv_intervalo
+from utils.forecast_evaluation import backtest_evaluate, cv_summary, residuals_diagnostics
+
+DIRETORIO_GRAFICOS = "diagnosticos_prophet"
+NUM_WORKERS_DIAGNOSTICO = 1
+
+_fila = queue.Queue()
+_pendentes = set()
+_lock = threading.Lock()
+_workers = []
+
+
+def enfileirar_diagnostico(ticker, freq, modelo, df_prophet, escala, metricas_holdout=None,
+                           previsao_inicio=None, previsao_fim=None):
+    """
+    Agenda backtest, cross-validation e análise de resíduos de um modelo já ajustado.
+    Retorna imediatamente; um job pendente para o mesmo ticker/frequência não é duplicado.
+    """
+    chave = (ticker, freq)
+    with _lock:
+        if chave in _pendentes:
+            return False
+        _pendentes.add(chave)
+        _iniciar_workers()
+
+    _fila.put({
+        "ticker": ticker,
+        "freq": freq,
+        "modelo": modelo,
+        "df_prophet": df_prophet.copy(),
+        "escala": escala,
+        "metricas_holdout": metricas_holdout,
+        "previsao_inicio": previsao_inicio,
+        "previsao_fim": previsao_fim,
+    })
+    return True
+
+
+def _iniciar_workers():
+    while len(_workers) < NUM_WORKERS_DIAGNOSTICO:
+        worker = threading.Thread(target=_loop_worker, name=f"diagnostico-prophet-{len(_workers)}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+
+def _loop_worker():
+    criar_tabela()
+    while True:
+        job = _fila.get()
+        try:
+            executar_diagnostico(job)
+        except Exception as e:
+            erro_logger.error(f"Erro no diagnóstico Prophet de {job['ticker']}: {e}")
+        finally:
+            with _lock:
+                _pendentes.discard((job["ticker"], job["freq"]))
+            _fila.task_done()
+
+
+def executar_diagnostico(job):
+    """
+    Calcula RMSE/MAPE, métricas de CV e estatísticas de resíduos e grava no banco de métricas.
+    """
+    from prophet_forecaster import salvar_metrica
+
+    ticker, freq = job["ticker"], job["freq"]
+    modelo, df_prophet, escala = job["modelo"], job["df_prophet"], job["escala"]
+
+    carimbo = datetime.now().strftime("%Y%m%d_%H%M%S")
+    prefixo = os.path.join(DIRETORIO_GRAFICOS, f"{str(ticker).replace('/', '')}_{freq}_{carimbo}")
+    graficos = []
+
+    metricas = dict(job["metricas_holdout"] or {})
+    if not metricas:
+        try:
+            metricas, _ = backtest_evaluate(df_prophet, escala, test_frac=0.2, freq=freq,
+                                            caminho_grafico=f"{prefixo}_backtest.png")
+            graficos.append(f"{prefixo}_backtest.png")
+        except Exception as e:
+            uso_logger.warning(f"⚠️ Backtest Prophet falhou para {ticker}: {e}")
+
+    try:
+        initial, period, horizon = gerar_janelas_cv_intervalo(len(df_prophet), freq)
+        perf = cv_summary(modelo, initial, period, horizon, caminho_grafico=f"{prefixo}_cv_mape.png")
+        if not perf.empty:
+            metricas["CV_RMSE"] = float(perf["rmse"].mean())
+            if "mape" in perf.columns:
+                metricas["CV_MAPE"] = float(perf["mape"].mean())
+            graficos.append(f"{prefixo}_cv_mape.png")
+    except Exception as e:
+        uso_logger.warning(f"⚠️ CV Prophet falhou para {ticker}: {e}")
+
+    try:
+        residuos = residuals_diagnostics(modelo, df_prophet, caminho_grafico=f"{prefixo}_residuos")
+        metricas["residuo_media"] = float(np.mean(residuos))
+        metricas["residuo_desvio"] = float(np.std(residuos))
+        if len(residuos) > 2:
+            metricas["residuo_autocorr"] = float(np.corrcoef(residuos[:-1], residuos[1:])[0, 1])
+        graficos += [f"{prefixo}_residuos_hist.png", f"{prefixo}_residuos_tempo.png"]
+    except Exception as e:
+        uso_logger.warning(f"⚠️ Diagnóstico de resíduos falhou para {ticker}: {e}")
+
+    salvar_diagnostico_prophet(ticker, freq, escala, metricas, graficos)
+
+    if job["previsao_inicio"] is not None and "RMSE" in metricas:
+        salvar_metrica(ticker, metricas["RMSE"], metricas["MAPE"], escala,
+                       job["previsao_inicio"], job["previsao_fim"])
+
+    uso_logger.info(f"🧪 Diagnóstico Prophet concluído para {ticker} ({freq}): {metricas}")
+    return metricas
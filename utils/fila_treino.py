@@ -0,0 +1,185 @@
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+
+from config import ORCAMENTO_TREINO_LSTM_S, ESPERA_APOS_FALHA_TREINO_LSTM_S
+from logger import uso_logger, erro_logger
+
+NUM_WORKERS_TREINO = 1  # Cada treino já usa todos os núcleos via TensorFlow
+STATUS_NA_FILA = "na_fila"
+STATUS_TREINANDO = "treinando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_FALHOU = "falhou"
+CHAVE_MODELO_GLOBAL = "__global__"  # Status do treino do modelo global (lstm_global.py)
+
+_fila = queue.Queue()
+_status = {}
+_lock = threading.Lock()
+_workers = []
+
+
+def enfileirar_treino(ticker, janela=60, epochs=50, incremental=False, tickers=None):
+    """
+    Agenda o treino do LSTM do ticker fora da requisição.
+    incremental=True faz fine-tuning do modelo salvo (CriptoForecaster.atualizar) quando ele existe.
+    Com ticker=CHAVE_MODELO_GLOBAL, treina o modelo global com a lista `tickers`.
+    Retorna False se já houver um treino do mesmo ticker na fila ou em andamento, ou se o último
+    falhou há menos de ESPERA_APOS_FALHA_TREINO_LSTM_S.
+    """
+    with _lock:
+        atual = _status.get(ticker)
+        if atual and atual["status"] in (STATUS_NA_FILA, STATUS_TREINANDO):
+            return False
+        if atual and atual["status"] == STATUS_FALHOU and _em_espera(atual):
+            return False
+        _status[ticker] = {
+            "status": STATUS_NA_FILA,
+            "enfileirado_em": datetime.now().isoformat(timespec="seconds"),
+            "inicio": None,
+            "fim": None,
+            "erro": None,
+        }
+        _iniciar_workers()
+
+    _fila.put({"ticker": ticker, "janela": janela, "epochs": epochs, "incremental": incremental, "tickers": tickers})
+    uso_logger.info(f"🧵 Treino LSTM de {ticker} enfileirado ({epochs} epochs{', incremental' if incremental else ''})")
+    return True
+
+
+def status_treino(ticker=None):
+    """
+    Situação dos treinos: de um ticker (dict ou None) ou de todos ({ticker: dict}).
+    """
+    with _lock:
+        if ticker is not None:
+            return dict(_status[ticker]) if ticker in _status else None
+        return {t: dict(s) for t, s in _status.items()}
+
+
+def _em_espera(status):
+    """True enquanto a falha registrada em `status` ainda está dentro da espera para um novo treino."""
+    try:
+        fim = datetime.fromisoformat(status["fim"])
+    except (TypeError, ValueError):
+        return False
+    return datetime.now() < fim + timedelta(seconds=ESPERA_APOS_FALHA_TREINO_LSTM_S)
+
+
+def _atualizar(ticker, **campos):
+    with _lock:
+        _status[ticker].update(campos)
+
+
+def _iniciar_workers():
+    while len(_workers) < NUM_WORKERS_TREINO:
+        worker = threading.Thread(target=_loop_worker, name=f"treino-lstm-{len(_workers)}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+
+def _loop_worker():
+    while True:
+        job = _fila.get()
+        ticker = job["ticker"]
+        _atualizar(ticker, status=STATUS_TREINANDO, inicio=datetime.now().isoformat(timespec="seconds"))
+        try:
+            executar_treino(job)
+            _atualizar(ticker, status=STATUS_CONCLUIDO, fim=datetime.now().isoformat(timespec="seconds"))
+            uso_logger.info(f"✅ Treino LSTM de {ticker} concluído")
+        except Exception as e:
+            _atualizar(ticker, status=STATUS_FALHOU, fim=datetime.now().isoformat(timespec="seconds"), erro=str(e))
+            erro_logger.error(f"Erro no treino LSTM de {ticker}: {e}")
+        finally:
+            _fila.task_done()
+
+
+def executar_treino(job):
+    """
+    Treina e salva o modelo; o arquivo novo (mtime diferente) é pego pelo registro de modelos
+    na próxima requisição, sem reiniciar o servidor.
+    """
+    if job["ticker"] == CHAVE_MODELO_GLOBAL:
+        from lstm_global import treinar_modelo_global
+        treinar_modelo_global(job["tickers"], janela=job["janela"], epochs=job["epochs"])
+        return
+
+    from lstm_forecaster import CriptoForecaster
+
+    forecaster = CriptoForecaster(job["ticker"], janela=job["janela"], epochs=job["epochs"])
+    if job.get("incremental"):
+        forecaster.atualizar(epochs=job["epochs"])
+        return
+    forecaster.carregar_dados()
+    # Orçamento fixo: o treino agendado cabe na janela de manutenção mesmo com muitos tickers na fila
+    forecaster.treinar(orcamento_s=ORCAMENTO_TREINO_LSTM_S)
+
+
+def tickers_com_modelo(diretorio="modelos_lstm"):
+    """Tickers com modelo LSTM próprio salvo (<ticker>_modelo.keras), fora o modelo global."""
+    from lstm_global import MODELO_GLOBAL_PATH
+
+    sufixo = "_modelo.keras"
+    if not os.path.isdir(diretorio):
+        return []
+    return sorted(
+        nome[:-len(sufixo)] for nome in os.listdir(diretorio)
+        if nome.endswith(sufixo) and os.path.join(diretorio, nome) != os.path.normpath(MODELO_GLOBAL_PATH)
+    )
+
+
+def atualizar_universo(tickers=None, janela=60, epochs=None):
+    """
+    Retreino noturno: fine-tuning incremental de cada ticker; quem ainda não tem modelo entra no treino completo.
+    Sem tickers, atualiza todos os que já têm modelo próprio salvo (tickers_com_modelo).
+    Retorna os tickers efetivamente enfileirados.
+    """
+    from config import EPOCHS_FINE_TUNE_LSTM
+    from lstm_forecaster import CriptoForecaster
+
+    if tickers is None:
+        tickers = tickers_com_modelo()
+    enfileirados = []
+    for ticker in tickers:
+        if CriptoForecaster(ticker, janela=janela).modelo_existente():
+            ok = enfileirar_treino(ticker, janela=janela, epochs=epochs or EPOCHS_FINE_TUNE_LSTM, incremental=True)
+        else:
+            ok = enfileirar_treino(ticker, janela=janela)
+        if ok:
+            enfileirados.append(ticker)
+    return enfileirados
+
+
+def enfileirar_treino_global(tickers, epochs=50):
+    """Retreino noturno do modelo global com todo o universo (um único job)."""
+    from config import JANELA_LSTM_GLOBAL
+    return enfileirar_treino(CHAVE_MODELO_GLOBAL, janela=JANELA_LSTM_GLOBAL, epochs=epochs, tickers=list(tickers))
+
+
+def prever_lstm_sem_bloquear(ticker, dias=5, janela=60, epochs=50):
+    """
+    Previsão LSTM para as rotas sem treinar dentro da requisição.
+    Usa o modelo global quando ele cobre o ticker (USAR_LSTM_GLOBAL); senão, o último modelo
+    salvo do ticker e, se não existir, agenda o treino e devolve (None, status).
+    Retorna (previsoes [{"valor": float}], status do treino ou None).
+    """
+    from config import USAR_LSTM_GLOBAL
+    from lstm_forecaster import CriptoForecaster
+
+    if USAR_LSTM_GLOBAL:
+        from lstm_global import prever_global
+        try:
+            previsoes = prever_global(ticker, dias=dias)
+            if previsoes is not None:
+                return previsoes, status_treino(CHAVE_MODELO_GLOBAL)
+        except Exception as e:
+            erro_logger.error(f"Erro no LSTM global para {ticker}, usando o modelo do ticker: {e}")
+
+    forecaster = CriptoForecaster(ticker, janela=janela, epochs=epochs)
+    if not forecaster.modelo_existente():
+        enfileirar_treino(ticker, janela=janela, epochs=epochs)
+        return None, status_treino(ticker)
+
+    forecaster.carregar_modelo_treinado()
+    previsoes = [{"valor": float(p["valor"])} for p in forecaster.prever(dias=dias)]
+    return previsoes, status_treino(ticker)
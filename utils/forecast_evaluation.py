@@ -1,4 +1,6 @@
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import pandas as pd
 from sklearn.metrics import mean_squared_error, mean_absolute_error, mean_absolute_percentage_error
 from prophet.diagnostics import cross_validation, performance_metrics
@@ -8,7 +10,30 @@ import os
 
 logger = logging.getLogger(__name__)
 
-def backtest_evaluate(df_prophet, changepoint_prior_scale, test_frac=0.2, freq="D"):
+def _nova_figura(caminho_grafico=None):
+    """
+    Figura para salvar em disco criada fora do pyplot (Figure + canvas Agg próprios): o worker de
+    diagnóstico roda em thread, em paralelo aos gráficos das rotas, e o estado global do pyplot
+    não é thread-safe. Só o uso interativo (sem caminho) passa pelo pyplot.
+    """
+    if caminho_grafico is None:
+        return plt.figure()
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig
+
+def _finalizar_figura(fig, caminho_grafico=None):
+    """
+    Mostra a figura (uso interativo) ou, se houver caminho, salva em disco.
+    """
+    if caminho_grafico is None:
+        plt.show()
+        return None
+    os.makedirs(os.path.dirname(caminho_grafico) or ".", exist_ok=True)
+    fig.savefig(caminho_grafico)
+    return caminho_grafico
+
+def backtest_evaluate(df_prophet, changepoint_prior_scale, test_frac=0.2, freq="D", caminho_grafico=None):
     """
     Separa os últimos test_frac% dos pontos para teste.
     Retorna (metrics_dict, df_preds_vs_true).
@@ -44,12 +69,13 @@ def backtest_evaluate(df_prophet, changepoint_prior_scale, test_frac=0.2, freq="
     logger.info(f"Backtest metrics: {metrics}")
 
     # plot
-    plt.figure()
-    plt.plot(df.index, df['y'], label='true')
-    plt.plot(df.index, df['yhat'], label='pred')
-    plt.title("Backtest: true vs pred")
-    plt.legend()
-    plt.show()
+    fig = _nova_figura(caminho_grafico)
+    ax = fig.subplots()
+    ax.plot(df.index, df['y'], label='true')
+    ax.plot(df.index, df['yhat'], label='pred')
+    ax.set_title("Backtest: true vs pred")
+    ax.legend()
+    _finalizar_figura(fig, caminho_grafico)
 
     return metrics, df
 
@@ -58,7 +84,8 @@ def cv_summary(
     model,
     initial: str,
     period: str,
-    horizon: str
+    horizon: str,
+    caminho_grafico: str | None = None
 ) -> pd.DataFrame:
     """
     Roda cross-validation no modelo completo usando janelas parametrizadas.
@@ -74,29 +101,36 @@ def cv_summary(
         )
         perf = performance_metrics(df_cv, rolling_window=1)
         logger.info(f"✔️ CV summary RMSE médio = {perf['rmse'].mean():.2f}")
-        plot_cross_validation_metric(df_cv, metric='mape')
+        fig = _nova_figura(caminho_grafico)
+        plot_cross_validation_metric(df_cv, metric='mape', ax=fig.subplots())
+        _finalizar_figura(fig, caminho_grafico)
         return perf
     except ValueError as e:
         logger.warning(f"⚠ CV summary pulado: {e}")
         return pd.DataFrame()
 
 
-def residuals_diagnostics(model, df_prophet):
+def residuals_diagnostics(model, df_prophet, caminho_grafico=None):
     """
     Plota resíduos (y − yhat) no treino para checar autocorrelação / distribution.
+    Com caminho_grafico, salva '<caminho>_hist.png' e '<caminho>_tempo.png' em vez de exibir.
     """
     hist = model.predict(df_prophet)
     res  = df_prophet['y'].values - hist['yhat'].values
 
-    plt.figure()
-    plt.hist(res, bins=30)
-    plt.title("Histogram of residuals")
-    plt.show()
-
-    plt.figure()
-    plt.plot(df_prophet['ds'], res)
-    plt.title("Residuals over time")
-    plt.show()
+    caminho_hist = f"{caminho_grafico}_hist.png" if caminho_grafico else None
+    fig = _nova_figura(caminho_hist)
+    ax = fig.subplots()
+    ax.hist(res, bins=30)
+    ax.set_title("Histogram of residuals")
+    _finalizar_figura(fig, caminho_hist)
+
+    caminho_tempo = f"{caminho_grafico}_tempo.png" if caminho_grafico else None
+    fig = _nova_figura(caminho_tempo)
+    ax = fig.subplots()
+    ax.plot(df_prophet['ds'], res)
+    ax.set_title("Residuals over time")
+    _finalizar_figura(fig, caminho_tempo)
 
     return res
 
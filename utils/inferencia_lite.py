@@ -0,0 +1,168 @@
+import os
+import sys
+import glob
+import threading
+
+import numpy as np
+from logger import uso_logger
+
+TOLERANCIA_VALIDACAO_LITE = 1e-3  # Diferença máxima (escala normalizada) entre Keras e TFLite
+AMOSTRAS_VALIDACAO_LITE = 32
+
+
+def _classe_interpretador():
+    """
+    Runtime mais leve disponível: LiteRT (ai-edge-litert, do requirements.txt) / tflite_runtime;
+    TensorFlow completo só em último caso, com aviso, já que é justamente o import que se quer evitar.
+    """
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            uso_logger.warning("⚠️ ai-edge-litert não instalado: servindo TFLite pelo TensorFlow completo")
+            from tensorflow.lite import Interpreter
+    return Interpreter
+
+
+def caminho_tflite(modelo_path):
+    return f"{os.path.splitext(modelo_path)[0]}.tflite"
+
+
+class ModeloLite:
+    """
+    Modelo TFLite com a mesma chamada dos modelos Keras usados na previsão:
+    entrada (n, janela, 1) float32 → saída (n, largura_saida) em numpy.
+    O Interpreter não é thread-safe, então cada chamada é serializada.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._interpretador = _classe_interpretador()(model_path=caminho)
+        self._interpretador.allocate_tensors()
+        self._entrada = self._interpretador.get_input_details()[0]
+        self._saida = self._interpretador.get_output_details()[0]
+        self.largura_saida = int(self._saida["shape"][-1])
+        self._lote_atual = int(self._entrada["shape"][0])
+        self._lock = threading.Lock()
+
+    def __call__(self, entrada):
+        entrada = np.ascontiguousarray(entrada, dtype=np.float32)
+        with self._lock:
+            if entrada.shape[0] != self._lote_atual:
+                self._interpretador.resize_tensor_input(self._entrada["index"], list(entrada.shape))
+                self._interpretador.allocate_tensors()
+                self._lote_atual = entrada.shape[0]
+            self._interpretador.set_tensor(self._entrada["index"], entrada)
+            self._interpretador.invoke()
+            return self._interpretador.get_tensor(self._saida["index"]).copy()
+
+
+def inferir(modelo, entrada):
+    """
+    Forward pass em numpy para ModeloLite ou modelo Keras.
+    """
+    if isinstance(modelo, ModeloLite):
+        return modelo(entrada)
+    return np.asarray(modelo(np.asarray(entrada, dtype=np.float32), training=False))
+
+
+def lite_atualizado(modelo_path):
+    """O .tflite existe e foi gerado a partir da versão atual do modelo Keras."""
+    lite = caminho_tflite(modelo_path)
+    return os.path.exists(lite) and (
+        not os.path.exists(modelo_path) or os.path.getmtime(lite) >= os.path.getmtime(modelo_path)
+    )
+
+
+def carregar_modelo_inferencia(modelo_path):
+    """
+    ModeloLite quando o artefato exportado está em dia (sem importar TensorFlow);
+    caso contrário, o modelo Keras do registro.
+    """
+    from utils.registro_modelos import registro_modelos
+
+    if lite_atualizado(modelo_path):
+        try:
+            return registro_modelos.obter_modelo_lite(caminho_tflite(modelo_path))
+        except Exception as e:
+            uso_logger.warning(f"⚠️ Falha ao abrir {caminho_tflite(modelo_path)}, usando Keras: {e}")
+    return registro_modelos.obter_modelo(modelo_path)
+
+
+def converter_tflite(modelo, quantizacao=None, representativos=None):
+    """
+    Bytes TFLite do modelo Keras, só com operações nativas.
+    quantizacao: None (float32), "float16" (pesos em meia precisão) ou "int8" (pesos int8;
+    com `representativos`, janelas (n, janela, 1) normalizadas, calibra também as ativações).
+    """
+    import tensorflow as tf
+
+    conversor = tf.lite.TFLiteConverter.from_keras_model(modelo)
+    conversor.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+    if quantizacao == "float16":
+        conversor.optimizations = [tf.lite.Optimize.DEFAULT]
+        conversor.target_spec.supported_types = [tf.float16]
+    elif quantizacao == "int8":
+        conversor.optimizations = [tf.lite.Optimize.DEFAULT]
+        if representativos is not None:
+            amostras = np.asarray(representativos, dtype=np.float32)
+
+            def dataset_representativo():
+                for amostra in amostras:
+                    yield [amostra[np.newaxis]]
+
+            conversor.representative_dataset = dataset_representativo
+    elif quantizacao is not None:
+        raise ValueError(f"Quantização desconhecida: {quantizacao}")
+    return conversor.convert()
+
+
+def exportar_tflite(modelo_path, modelo=None, tolerancia=TOLERANCIA_VALIDACAO_LITE, amostras=AMOSTRAS_VALIDACAO_LITE):
+    """
+    Converte o modelo Keras para TFLite (só operações nativas, para rodar sem TensorFlow),
+    valida contra as saídas do Keras em janelas normalizadas aleatórias e grava ao lado do modelo.
+    Retorna True se o artefato foi gravado; se a validação falhar, nada é gravado.
+    """
+    import tensorflow as tf
+
+    if modelo is None:
+        modelo = tf.keras.models.load_model(modelo_path)
+    try:
+        conteudo = converter_tflite(modelo)
+    except Exception as e:
+        uso_logger.warning(f"⚠️ {modelo_path} não converte para TFLite nativo: {e}")
+        return False
+
+    destino = caminho_tflite(modelo_path)
+    temporario = f"{destino}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(conteudo)
+
+    janela = int(modelo.input_shape[1])
+    entrada = np.random.default_rng(0).uniform(0, 1, size=(amostras, janela, 1)).astype(np.float32)
+    try:
+        esperado = np.asarray(modelo(entrada, training=False))
+        obtido = ModeloLite(temporario)(entrada)
+        diferenca = float(np.max(np.abs(esperado - obtido)))
+    except Exception as e:
+        os.remove(temporario)
+        uso_logger.warning(f"⚠️ Validação TFLite de {modelo_path} falhou: {e}")
+        return False
+
+    if diferenca > tolerancia:
+        os.remove(temporario)
+        uso_logger.warning(f"⚠️ TFLite de {modelo_path} diverge do Keras (máx {diferenca:.2e}); artefato descartado")
+        return False
+
+    os.replace(temporario, destino)
+    uso_logger.info(f"✅ TFLite exportado: {destino} (diferença máx {diferenca:.2e})")
+    return True
+
+
+if __name__ == "__main__":
+    # python -m utils.inferencia_lite [modelos...]  (padrão: todos os modelos LSTM do projeto)
+    caminhos = sys.argv[1:] or glob.glob("models/*.h5") + glob.glob("modelos_lstm/*.keras")
+    for caminho in caminhos:
+        print(f"{'✅' if exportar_tflite(caminho) else '❌'} {caminho}")
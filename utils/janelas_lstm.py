@@ -0,0 +1,43 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Acima disso o treino usa tf.data em lotes em vez de materializar X inteiro no TensorFlow
+MAX_JANELAS_EM_MEMORIA = 200_000
+
+
+def janelas_deslizantes(dados, janela, horizonte=1):
+    """
+    Janelas de treino sem copiar cada janela: X (n, janela, 1) e y (n, horizonte) são views
+    somente leitura sobre a mesma série (uma única conversão para float32).
+    """
+    serie = np.ascontiguousarray(dados, dtype=np.float32).reshape(-1)
+    if len(serie) < janela + horizonte:
+        raise ValueError(f"Série curta demais para janela={janela} e horizonte={horizonte} (len={len(serie)})")
+
+    blocos = sliding_window_view(serie, janela + horizonte)
+    X = blocos[:, :janela, np.newaxis]
+    y = blocos[:, janela:]
+    return X, y
+
+
+def dataset_janelas(dados, janela, horizonte=1, batch_size=32, embaralhar=True, semente=None):
+    """
+    tf.data.Dataset em streaming: cada lote é copiado das views só quando o TensorFlow o pede,
+    então históricos intradiários longos não precisam caber inteiros como tensor.
+    Com embaralhar, a ordem dos lotes muda a cada época.
+    """
+    import tensorflow as tf
+
+    X, y = janelas_deslizantes(dados, janela, horizonte)
+    inicios = np.arange(0, len(X), batch_size)
+    rng = np.random.default_rng(semente)
+
+    def gerar():
+        for inicio in (rng.permutation(inicios) if embaralhar else inicios):
+            yield X[inicio:inicio + batch_size], y[inicio:inicio + batch_size]
+
+    assinatura = (
+        tf.TensorSpec(shape=(None, janela, 1), dtype=tf.float32),
+        tf.TensorSpec(shape=(None, horizonte), dtype=tf.float32),
+    )
+    return tf.data.Dataset.from_generator(gerar, output_signature=assinatura).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+from config import ORCAMENTO_MEMORIA_MODELOS_MB
+from logger import uso_logger
+
+
+def _carregar_keras(caminho):
+    from tensorflow.keras.models import load_model
+    return load_model(caminho)
+
+
+def _tamanho_estimado(objeto, caminho):
+    """
+    Bytes ocupados em memória: pesos do modelo Keras ou, para outros objetos, o tamanho do arquivo.
+    """
+    try:
+        return int(sum(peso.nbytes for peso in objeto.get_weights()))
+    except Exception:
+        return os.path.getsize(caminho)
+
+
+class RegistroModelos:
+    """
+    Modelos Keras e scalers carregados uma única vez por processo.
+    Chave: caminho absoluto + mtime (um retreino salva arquivo novo e invalida a entrada antiga).
+    Eviction LRU quando a soma estimada passa do orçamento de memória. Thread-safe para os workers do Flask.
+    """
+
+    def __init__(self, orcamento_mb=ORCAMENTO_MEMORIA_MODELOS_MB):
+        self.orcamento_bytes = int(orcamento_mb * 1024 * 1024)
+        self._entradas = OrderedDict()  # (caminho, mtime) -> (objeto, bytes)
+        self._uso_bytes = 0
+        self._lock = threading.Lock()
+        self._locks_carga = {}
+
+    def _remover(self, chave):
+        _, tamanho = self._entradas.pop(chave)
+        self._uso_bytes -= tamanho
+
+    def _obter(self, caminho, carregador):
+        caminho = os.path.abspath(caminho)
+        chave = (caminho, os.path.getmtime(caminho))
+
+        with self._lock:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                return self._entradas[chave][0]
+            lock_carga = self._locks_carga.setdefault(caminho, threading.Lock())
+
+        # Um carregamento por arquivo; quem chegar depois espera e reaproveita
+        with lock_carga:
+            with self._lock:
+                if chave in self._entradas:
+                    self._entradas.move_to_end(chave)
+                    return self._entradas[chave][0]
+
+            objeto = carregador(caminho)
+            tamanho = _tamanho_estimado(objeto, caminho)
+
+            with self._lock:
+                for antiga in [c for c in self._entradas if c[0] == caminho]:
+                    self._remover(antiga)
+                self._entradas[chave] = (objeto, tamanho)
+                self._uso_bytes += tamanho
+                while self._uso_bytes > self.orcamento_bytes and len(self._entradas) > 1:
+                    removida = next(iter(self._entradas))
+                    self._remover(removida)
+                    uso_logger.info(f"♻️ Modelo descarregado da memória: {os.path.basename(removida[0])}")
+
+        uso_logger.info(f"📦 Modelo carregado: {os.path.basename(caminho)} ({tamanho / 1024 / 1024:.1f} MB)")
+        return objeto
+
+    def obter_modelo(self, caminho):
+        """Modelo Keras (.h5/.keras) compartilhado entre as requisições."""
+        return self._obter(caminho, _carregar_keras)
+
+    def obter_modelo_lite(self, caminho):
+        """Modelo TFLite (.tflite) exportado por utils.inferencia_lite."""
+        from utils.inferencia_lite import ModeloLite
+        return self._obter(caminho, ModeloLite)
+
+    def obter_scaler(self, caminho):
+        """Scaler salvo com joblib. É compartilhado: quem precisar reajustá-lo deve copiar antes."""
+        return self._obter(caminho, joblib.load)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._uso_bytes = 0
+
+
+registro_modelos = RegistroModelos()
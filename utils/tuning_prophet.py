@@ -0,0 +1,230 @@
+import os
+import glob
+import math
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+from prophet.diagnostics import generate_cutoffs, single_cutoff_forecast
+
+from utils.cache_prophet import DIRETORIO_CACHE, fingerprint_serie
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_FOLDS = os.path.join(DIRETORIO_CACHE, "folds_cv")
+MAX_ARQUIVOS_FOLDS = 64
+# Configuração que, junto com série, cutoff e horizonte, determina o resultado de um fold
+ATRIBUTOS_ASSINATURA = (
+    "growth", "n_changepoints", "changepoint_range", "changepoint_prior_scale", "seasonality_prior_scale",
+    "holidays_prior_scale", "seasonality_mode", "yearly_seasonality", "weekly_seasonality",
+    "daily_seasonality", "interval_width", "mcmc_samples", "uncertainty_samples",
+)
+
+
+def gerar_cortes(df_prophet, initial: str, period: str, horizon: str) -> list:
+    """
+    Cutoffs da cross-validation (mesma regra do Prophet), do mais recente para o mais antigo.
+    """
+    cortes = generate_cutoffs(
+        df_prophet,
+        pd.Timedelta(horizon),
+        pd.Timedelta(initial),
+        pd.Timedelta(period)
+    )
+    return sorted(cortes, reverse=True)
+
+
+def _rmse(df_cv):
+    if df_cv is None or df_cv.empty:
+        return float("inf")
+    return float(np.sqrt(np.mean((df_cv["y"] - df_cv["yhat"]) ** 2)))
+
+
+def _modelo_padrao(escala):
+    return Prophet(changepoint_prior_scale=escala)
+
+
+def assinatura_modelo(modelo) -> str:
+    """
+    Hash da configuração de um modelo ainda não ajustado (hiperparâmetros, sazonalidades
+    customizadas e regressores): dois modelos com a mesma assinatura geram os mesmos folds.
+    """
+    config = {nome: getattr(modelo, nome, None) for nome in ATRIBUTOS_ASSINATURA}
+    config["sazonalidades"] = sorted(modelo.seasonalities)
+    config["regressores"] = sorted(modelo.extra_regressors)
+    config["feriados"] = None if modelo.holidays is None else len(modelo.holidays)
+    return hashlib.sha256(repr(sorted(config.items())).encode()).hexdigest()[:16]
+
+
+def _caminho_folds(df_prophet, horizon):
+    nome_horizonte = str(horizon).replace(" ", "")
+    return os.path.join(DIRETORIO_FOLDS, f"{fingerprint_serie(df_prophet)}_{nome_horizonte}.pkl")
+
+
+def carregar_folds(df_prophet, horizon) -> dict:
+    """Folds já calculados para esta série e horizonte: {(assinatura, cutoff): df_fold}."""
+    try:
+        return joblib.load(_caminho_folds(df_prophet, horizon))
+    except (OSError, EOFError, ValueError):
+        return {}
+    except Exception as e:
+        logger.warning(f"⚠ Cache de folds ilegível, recalculando: {e}")
+        return {}
+
+
+def salvar_folds(df_prophet, horizon, folds):
+    """
+    Grava os folds (temporário + os.replace) e mantém só os MAX_ARQUIVOS_FOLDS arquivos mais recentes:
+    cada candle novo muda o fingerprint da série e deixa o arquivo anterior sem uso.
+    """
+    os.makedirs(DIRETORIO_FOLDS, exist_ok=True)
+    caminho = _caminho_folds(df_prophet, horizon)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        joblib.dump(folds, temporario)
+        os.replace(temporario, caminho)
+        arquivos = sorted(glob.glob(os.path.join(DIRETORIO_FOLDS, "*.pkl")), key=os.path.getmtime)
+        for antigo in arquivos[:-MAX_ARQUIVOS_FOLDS]:
+            os.remove(antigo)
+    except OSError as e:
+        logger.warning(f"⚠ Falha ao gravar o cache de folds: {e}")
+
+
+def _abrir_pool(parallel):
+    if parallel == "processes":
+        return ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    if parallel == "threads":
+        return ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+    return None
+
+
+def _calcular_folds(pool, pares, modelos, horizon):
+    """
+    Calcula os folds (escala, cutoff) pedidos: com pool, todos de uma vez no mesmo pool
+    (o paralelismo é entre pares, não dentro de uma cross_validation de 1-2 cutoffs).
+    Retorna {(escala, cutoff): df_fold ou a exceção do fold}.
+    """
+    horizonte = pd.Timedelta(horizon)
+
+    def argumentos(esc, corte):
+        # Mesmos argumentos que prophet.diagnostics.cross_validation passa para cada cutoff
+        modelo = modelos[esc]
+        colunas = ["ds", "yhat"] + (["yhat_lower", "yhat_upper"] if modelo.uncertainty_samples else [])
+        return modelo.history.copy().reset_index(drop=True), modelo, corte, horizonte, colunas
+
+    if pool is None:
+        resultados = {}
+        for esc, corte in pares:
+            try:
+                resultados[(esc, corte)] = single_cutoff_forecast(*argumentos(esc, corte))
+            except Exception as e:
+                resultados[(esc, corte)] = e
+        return resultados
+
+    futuros = {(esc, corte): pool.submit(single_cutoff_forecast, *argumentos(esc, corte)) for esc, corte in pares}
+    resultados = {}
+    for par, futuro in futuros.items():
+        try:
+            resultados[par] = futuro.result()
+        except Exception as e:
+            resultados[par] = e
+    return resultados
+
+
+def successive_halving_prophet(
+    df_prophet,
+    escalas,
+    initial: str,
+    period: str,
+    horizon: str,
+    criar_modelo=None,
+    cortes_iniciais: int = 1,
+    fator: int = 2,
+    parallel: str | None = "processes",
+    persistir_folds: bool = True
+):
+    """
+    Tuning de changepoint_prior_scale por successive halving:
+    todos os candidatos são avaliados nos cutoffs mais recentes, a pior metade sai e
+    os sobreviventes ganham mais cutoffs até o vencedor cobrir todos.
+    Em cada rodada, os pares (escala, cutoff) que faltam vão juntos para um único pool
+    ("processes" ou "threads", aberto uma vez por chamada; None roda em série).
+    Com persistir_folds, os folds ficam em disco por (série, horizonte, assinatura do modelo) e
+    são reaproveitados entre execuções sobre a mesma série.
+
+    Retorna (melhor_escala, {escala: rmse}, modelo_vencedor_ajustado, df_cv_vencedor).
+    """
+    criar_modelo = criar_modelo or _modelo_padrao
+    cortes = gerar_cortes(df_prophet, initial, period, horizon)
+    if not cortes:
+        raise ValueError("Histórico curto demais para gerar cutoffs de cross-validation.")
+
+    folds = carregar_folds(df_prophet, horizon) if persistir_folds else {}
+    tamanho_inicial = len(folds)
+    modelos = {}
+    assinaturas = {esc: assinatura_modelo(criar_modelo(esc)) for esc in escalas}
+    resultados = {}
+    sobreviventes = list(escalas)
+    n_cortes = min(max(1, cortes_iniciais), len(cortes))
+    pool = None
+
+    try:
+        while True:
+            usados = cortes[:n_cortes]
+            pares = [(esc, c) for esc in sobreviventes for c in usados if (assinaturas[esc], c) not in folds]
+
+            # Só quem tem fold a calcular precisa do modelo ajustado (template de cada cutoff)
+            for esc in sorted({esc for esc, _ in pares} - set(modelos)):
+                try:
+                    modelo = criar_modelo(esc)
+                    modelo.fit(df_prophet)
+                    modelos[esc] = modelo
+                except Exception as e:
+                    logger.warning(f"⚠ scale={esc} falhou: {e}")
+                    resultados[esc] = float("nan")
+                    sobreviventes.remove(esc)
+            pares = [(esc, c) for esc, c in pares if esc in sobreviventes]
+
+            if pares:
+                if pool is None:
+                    pool = _abrir_pool(parallel)
+                for (esc, corte), fold in _calcular_folds(pool, pares, modelos, horizon).items():
+                    if isinstance(fold, Exception):
+                        if esc in sobreviventes:
+                            logger.warning(f"⚠ scale={esc} falhou no cutoff {corte}: {fold}")
+                            resultados[esc] = float("nan")
+                            sobreviventes.remove(esc)
+                        continue
+                    folds[(assinaturas[esc], corte)] = fold
+
+            for esc in sobreviventes:
+                resultados[esc] = _rmse(pd.concat([folds[(assinaturas[esc], c)] for c in usados]))
+                logger.info(f"✔ scale={esc} RMSE={resultados[esc]:.4f} ({len(usados)}/{len(cortes)} cutoffs)")
+
+            if not sobreviventes:
+                raise RuntimeError("Nenhuma escala válida no tuning do Prophet.")
+            if n_cortes >= len(cortes):
+                sobreviventes = [min(sobreviventes, key=resultados.get)]
+                break
+
+            manter = max(1, math.ceil(len(sobreviventes) / fator))
+            sobreviventes = sorted(sobreviventes, key=resultados.get)[:manter]
+            n_cortes = min(len(cortes), n_cortes * fator)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    if persistir_folds and len(folds) > tamanho_inicial:
+        salvar_folds(df_prophet, horizon, folds)
+
+    melhor = sobreviventes[0]
+    if melhor not in modelos:
+        # Todos os folds do vencedor vieram do disco: só falta o ajuste na série completa
+        modelos[melhor] = criar_modelo(melhor)
+        modelos[melhor].fit(df_prophet)
+    df_cv_melhor = pd.concat([folds[(assinaturas[melhor], c)] for c in cortes])
+    return melhor, resultados, modelos[melhor], df_cv_melhor